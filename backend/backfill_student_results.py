@@ -23,6 +23,7 @@ from exam.models.result import StudentResult
 from exam.models.response import StudentResponse
 from exam.models.analysis import QuestionAnalysis
 from exam.models.student import Student
+from exam.utils.topic_stats import write_topic_stats
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -75,6 +76,7 @@ def backfill_student_results(class_id=None, test_num=None, dry_run=False):
             class_id=cls_id,
             test_num=tst_num
         )
+        new_rows = []
         
         for response in student_responses:
             try:
@@ -111,19 +113,18 @@ def backfill_student_results(class_id=None, test_num=None, dry_run=False):
                     opted = qa.__dict__.get(f"option_{idx}")
                     is_correct = (qa.correct_answer == opted)
                 
-                # Create StudentResult record
-                if not dry_run:
-                    StudentResult.objects.create(
-                        student_id=student_id,
-                        class_id=cls_id,
-                        test_num=tst_num,
-                        question_number=response.question_number,
-                        is_correct=is_correct,
-                        was_attempted=was_attempted,
-                        subject=qa.subject,
-                        chapter=qa.chapter,
-                        topic=qa.topic
-                    )
+                # Queue StudentResult record
+                new_rows.append(StudentResult(
+                    student_id=student_id,
+                    class_id=cls_id,
+                    test_num=tst_num,
+                    question_number=response.question_number,
+                    is_correct=is_correct,
+                    was_attempted=was_attempted,
+                    subject=qa.subject,
+                    chapter=qa.chapter,
+                    topic=qa.topic
+                ))
                 
                 processed_count += 1
                 
@@ -134,6 +135,16 @@ def backfill_student_results(class_id=None, test_num=None, dry_run=False):
                 logger.error(f"Error processing Q{response.question_number}: {e}")
                 error_count += 1
                 continue
+        
+        # Save the new rows, then re-aggregate StudentTopicStats over all rows of the student-test
+        if new_rows and not dry_run:
+            with transaction.atomic():
+                StudentResult.objects.bulk_create(new_rows, batch_size=1000, ignore_conflicts=True)
+                write_topic_stats(StudentResult.objects.filter(
+                    student_id=student_id,
+                    class_id=cls_id,
+                    test_num=tst_num
+                ))
     
     logger.info(f"""
 ╔═══════════════════════════════════════╗
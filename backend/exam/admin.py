@@ -1,5 +1,5 @@
 from django.contrib import admin
-from exam.models import Educator, Manager, TestProcessingStatus, Test, Student, Result, StudentResponse, Gemini_ApiCallLog, Gemini_ApiKeyModelMinuteStats, Gemini_ApiKeyModelDayStats, SWOT, TestMetadata, NotificationLog, Institution
+from exam.models import Educator, Manager, TestProcessingStatus, Test, Student, Result, StudentResponse, Gemini_ApiCallLog, Gemini_ApiKeyModelMinuteStats, Gemini_ApiKeyModelDayStats, Gemini_CacheDayStats, SWOT, TestMetadata, NotificationLog, Institution
 from django.contrib import admin
 
 
@@ -167,6 +167,17 @@ class ApiKeyModelDayStatsAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return False
 
+@admin.register(Gemini_CacheDayStats)
+class CacheDayStatsAdmin(admin.ModelAdmin):
+    list_display = ("function_name", "timestamp_day", "hits", "misses", "calls_saved", "updated_at")
+    search_fields = ("function_name",)
+    date_hierarchy = "timestamp_day"
+    readonly_fields = ("timestamp_day", "updated_at")
+    ordering = ("-timestamp_day", "function_name")
+    list_per_page = 25
+    def has_add_permission(self, request):
+        return False
+
 @admin.register(SWOT)
 class SWOTAdmin(admin.ModelAdmin):
     list_display = ('user_id', 'class_id', 'test_num', 'swot_parameter', 'swot_value')
@@ -3,9 +3,13 @@
 from exam.graph_utils.knowledge_graph_manager import KnowledgeGraphManager
 from exam.models.response import StudentResponse
 from exam.models.analysis import QuestionAnalysis
-from exam.models.result import StudentResult
+from exam.models.result import StudentTopicStats
 from exam.models.test import Test
-from django.db.models import Count, Q, Sum, Case, When, IntegerField, FloatField
+from exam.utils.topic_stats import STAT_SUMS, student_topic_stats
+from django.db.models import FloatField
+from collections import defaultdict
+from operator import itemgetter
+import itertools
 import pandas as pd
 import numpy as np
 
@@ -13,109 +17,51 @@ import numpy as np
 # POSTGRES-BASED IMPLEMENTATIONS (New)
 # ============================================================================
 
-def calculate_overall_performance_pg(student_id, class_id):
+# Every PG metric below is derived from per-(test, subject, topic) counts
+METRIC_GROUP_FIELDS = ('test_num', 'subject', 'topic')
+
+
+def fetch_metric_counts_pg(student_id, class_id):
     """
-    Calculate overall performance from PostgreSQL tables.
-    Returns: overall performance percentage
+    Load the raw counts behind OP/TT/IR/CS with a single query.
+    Returns: list of dicts with test_num, subject, topic and
+             total_questions / attempted_questions / correct_questions
     """
-    # Get all student results for this student and class
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).aggregate(
-        total_questions=Count('question_number'),
-        correct_questions=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        incorrect_questions=Sum(
-            Case(
-                When(Q(is_correct=False) & Q(was_attempted=True), then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        skipped_questions=Sum(
-            Case(
-                When(Q(is_correct=False) & Q(was_attempted=False), then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    return list(
+        student_topic_stats(student_id, class_id).values(*METRIC_GROUP_FIELDS).annotate(
+            **STAT_SUMS
+        ).order_by(*METRIC_GROUP_FIELDS)
     )
-    
-    total = results['total_questions'] or 0
-    correct = results['correct_questions'] or 0
-    incorrect = results['incorrect_questions'] or 0
-    skipped = results['skipped_questions'] or 0
-    
+
+
+def _score(correct, attempted):
+    # Score: +4 correct, -1 incorrect, 0 skipped
+    return (correct * 4) - (attempted - correct)
+
+
+def overall_performance_from_counts(rows):
+    """Overall performance percentage from fetch_metric_counts_pg rows."""
+    total = sum(r['total_questions'] for r in rows)
     if total == 0:
         return 0.0
-    
-    # Calculate score: +4 for correct, -1 for incorrect, 0 for skipped
-    total_score = (correct * 4) - (incorrect * 1) + (skipped * 0)
+    correct = sum(r['correct_questions'] for r in rows)
+    attempted = sum(r['attempted_questions'] for r in rows)
     max_possible_score = total * 4
-    
-    return round((total_score / max_possible_score) * 100, 2)
+    return round((_score(correct, attempted) / max_possible_score) * 100, 2)
 
 
-def fetch_tests_taken_count_pg(student_id, class_id):
-    """
-    Count total tests taken by student from PostgreSQL.
-    Returns: count of tests
-    """
-    count = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('test_num').distinct().count()
-    
-    return count
+def tests_taken_from_counts(rows):
+    """Number of distinct tests in fetch_metric_counts_pg rows."""
+    return len({r['test_num'] for r in rows})
 
 
-def calculate_improvement_rate_pg(student_id, class_id):
-    """
-    Calculate improvement rate across tests from PostgreSQL.
-    Returns: improvement rate percentage
-    """
-    # Get scores per test
-    test_scores = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('test_num').annotate(
-        correct=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        incorrect=Sum(
-            Case(
-                When(Q(is_correct=False) & Q(was_attempted=True), then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        skipped=Sum(
-            Case(
-                When(Q(is_correct=False) & Q(was_attempted=False), then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        total=Count('question_number')
-    ).order_by('test_num')
-    
-    scores = []
-    for test in test_scores:
-        correct = test['correct']
-        incorrect = test['incorrect']
-        # Score: +4 correct, -1 incorrect, 0 skipped
-        score = (correct * 4) - (incorrect * 1)
-        scores.append(score)
+def improvement_rate_from_counts(rows):
+    """Average test-over-test score change (%) from fetch_metric_counts_pg rows."""
+    per_test = defaultdict(lambda: [0, 0])  # test_num -> [correct, attempted]
+    for r in rows:
+        per_test[r['test_num']][0] += r['correct_questions']
+        per_test[r['test_num']][1] += r['attempted_questions']
+    scores = [_score(correct, attempted) for _, (correct, attempted) in sorted(per_test.items())]
     
     if len(scores) < 2:
         return 0.0
@@ -130,63 +76,101 @@ def calculate_improvement_rate_pg(student_id, class_id):
     return round(sum(deltas) / len(deltas), 2) if deltas else 0.0
 
 
-def calculate_consistency_score_pg(student_id, class_id):
-    """
-    Calculate consistency score across topics from PostgreSQL.
-    Returns: consistency score (0-1)
-    """
-    # Get topic-wise accuracy per test
-    topic_data = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('test_num', 'subject', 'topic').annotate(
-        total=Count('question_number'),
-        correct=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
-    ).order_by('test_num', 'subject', 'topic')
-    
-    if not topic_data:
-        return 0.0
-    
-    # Convert to DataFrame for easier groupby operations
-    df = pd.DataFrame(list(topic_data))
-    df['accuracy'] = df['correct'] / df['total']
+def consistency_score_from_counts(rows):
+    """Topic consistency score (0-1) from fetch_metric_counts_pg rows."""
+    accuracies = defaultdict(list)  # (subject, topic) -> accuracy per test, oldest first
+    for r in sorted(rows, key=itemgetter('test_num')):
+        if r['total_questions']:
+            accuracies[(r['subject'], r['topic'])].append(r['correct_questions'] / r['total_questions'])
     
     topic_scores = []
-    for (subject, topic), group in df.groupby(['subject', 'topic']):
-        accuracies = group['accuracy'].tolist()
-        if len(accuracies) < 2:
+    for topic_accuracies in accuracies.values():
+        if len(topic_accuracies) < 2:
             continue
-        avg = np.mean(accuracies)
-        std = np.std(accuracies)
+        avg = np.mean(topic_accuracies)
+        std = np.std(topic_accuracies)
         topic_scores.append(avg / (1 + std))
     
-    return round(np.mean(topic_scores), 4) if topic_scores else 0.0
+    return round(float(np.mean(topic_scores)), 4) if topic_scores else 0.0
 
 
-def calculate_metrics_pg(student_id, class_id):
+def metrics_from_counts(rows):
     """
-    PostgreSQL-based metrics calculation.
+    Derive the overview metrics from fetch_metric_counts_pg rows.
     Returns: (op, tt, ir, cv) tuple
     """
-    op = calculate_overall_performance_pg(student_id, class_id)
-    tt = fetch_tests_taken_count_pg(student_id, class_id)
+    op = overall_performance_from_counts(rows)
+    tt = tests_taken_from_counts(rows)
     
     # Normalize by test count
     if tt > 0:
         op = op / tt
     
-    ir = calculate_improvement_rate_pg(student_id, class_id)
-    cv = calculate_consistency_score_pg(student_id, class_id)
+    ir = improvement_rate_from_counts(rows)
+    cv = consistency_score_from_counts(rows)
     
     return (op, tt, ir, cv)
 
 
+def calculate_overall_performance_pg(student_id, class_id):
+    """
+    Calculate overall performance from PostgreSQL tables.
+    Returns: overall performance percentage
+    """
+    return overall_performance_from_counts(fetch_metric_counts_pg(student_id, class_id))
+
+
+def fetch_tests_taken_count_pg(student_id, class_id):
+    """
+    Count total tests taken by student from PostgreSQL.
+    Returns: count of tests
+    """
+    return tests_taken_from_counts(fetch_metric_counts_pg(student_id, class_id))
+
+
+def calculate_improvement_rate_pg(student_id, class_id):
+    """
+    Calculate improvement rate across tests from PostgreSQL.
+    Returns: improvement rate percentage
+    """
+    return improvement_rate_from_counts(fetch_metric_counts_pg(student_id, class_id))
+
+
+def calculate_consistency_score_pg(student_id, class_id):
+    """
+    Calculate consistency score across topics from PostgreSQL.
+    Returns: consistency score (0-1)
+    """
+    return consistency_score_from_counts(fetch_metric_counts_pg(student_id, class_id))
+
+
+def calculate_metrics_pg(student_id, class_id):
+    """
+    PostgreSQL-based metrics calculation (one query).
+    Returns: (op, tt, ir, cv) tuple
+    """
+    return metrics_from_counts(fetch_metric_counts_pg(student_id, class_id))
+
+
+def calculate_class_metrics_pg(class_id, student_ids=None):
+    """
+    Metrics for every student of a class (or the given students) in one query,
+    for batch dashboard builds.
+    Returns: {student_id: (op, tt, ir, cv)}; students without results are absent
+    """
+    stats = StudentTopicStats.objects.filter(class_id=class_id)
+    if student_ids is not None:
+        stats = stats.filter(student_id__in=list(student_ids))
+    rows = stats.values('student_id', *METRIC_GROUP_FIELDS).annotate(
+        **STAT_SUMS
+    ).order_by('student_id', *METRIC_GROUP_FIELDS)
+    
+    return {
+        student_id: metrics_from_counts(list(student_rows))
+        for student_id, student_rows in itertools.groupby(rows.iterator(), key=itemgetter('student_id'))
+    }
+
+
 # ============================================================================
 # NEO4J-BASED IMPLEMENTATIONS (Legacy - kept for backward compatibility)
 # ============================================================================
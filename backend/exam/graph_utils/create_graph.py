@@ -1,99 +1,169 @@
 # create_graph.py
 
-from exam.graph_utils.knowledge_graph_manager import KnowledgeGraphManager
+from neo4j.exceptions import ClientError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows sent per UNWIND statement; all chunks of a student-test share one transaction
+GRAPH_WRITE_BATCH_SIZE = 500
 
-def create_graph(student_id, db_name, student_analysis, test_name):
-    test_name = f"Test{test_name}"
-    
-    kg_manager = KnowledgeGraphManager(database_name=db_name, create_if_missing=True)
+# Node labels written below, each keyed by test_name (Test itself is keyed by name)
+TEST_SCOPED_LABELS = ["Subject", "CHAPTER", "Topic", "Subtopic", "Question", "Misconception", "Feedback"]
 
+# Trailing properties of each label's composite index (see graph_schema_statements).
+# Neo4j only seeks a composite index when every indexed property has a predicate.
+INDEX_TAIL = {"Question": "number", "Subject": "name", "CHAPTER": "name", "Topic": "name", "Subtopic": "name"}
 
-    # did not work
-    """if not kg_manager.check_db:
-        kg_manager.create_db
-        time.sleep(2)"""
-    
-    test_data = student_analysis.to_dict(orient="records")
+# In the shared graph every MERGE key is extended with the tenant properties
+TENANT_TOKEN = "__TENANT__"
+TENANT_PROPERTIES = ", student_id: $student_id, class_id: $class_id"
 
+WRITE_TEST_NODE_QUERY = """
+MERGE (test:Test {name: $test_name, date: $test_date__TENANT__})
+"""
+
+WRITE_QUESTIONS_QUERY = """
+MATCH (test:Test {name: $test_name, date: $test_date__TENANT__})
+UNWIND $rows AS row
+MERGE (subject:Subject {name: row.subject, test_name: $test_name__TENANT__})
+MERGE (test)-[:CONTAINS]->(subject)
+MERGE (chapter:CHAPTER {name: row.chapter, test_name: $test_name, subname: row.subject__TENANT__})
+MERGE (subject)-[:CONTAINS]->(chapter)
+MERGE (topic:Topic {name: row.topic, test_name: $test_name, chapname: row.chapter, subname: row.subject__TENANT__})
+MERGE (chapter)-[:CONTAINS]->(topic)
+MERGE (subtopic:Subtopic {name: row.subtopic, test_name: $test_name, topicname: row.topic, subname: row.subject, chapname: row.chapter__TENANT__})
+MERGE (topic)-[:CONTAINS]->(subtopic)
+MERGE (question:Question {number: row.number, test_name: $test_name__TENANT__})
+ON CREATE SET
+    question.correctAnswer = row.correct_answer,
+    question.optedAnswer = row.opted_answer,
+    question.isCorrect = row.is_correct,
+    question.type = row.question_type,
+    question.imdesp = row.im_desp,
+    question.text = row.text
+ON MATCH SET
+    question.optedAnswer = row.opted_answer,
+    question.isCorrect = row.is_correct,
+    question.correctAnswer = row.correct_answer,
+    question.type = row.question_type
+MERGE (subtopic)-[:CONTAINS]->(question)
+FOREACH (m IN row.misconceptions |
+    MERGE (misconception:Misconception {type: m.type, description: m.description, test_name: $test_name__TENANT__})
+    MERGE (question)-[:HAS_MISCONCEPTION]->(misconception)
+)
+FOREACH (text IN row.feedbacks |
+    MERGE (feedback:Feedback {text: text, test_name: $test_name__TENANT__})
+    MERGE (question)-[:HAS_FEEDBACK]->(feedback)
+)
+"""
+
+DELETE_TEST_QUERY = """
+MATCH (test:Test {name: $test_name})
+OPTIONAL MATCH (test)-[*]->(n)
+DETACH DELETE test, n
+"""
+
+# Databases whose schema has already been ensured by this process
+_schema_ready = set()
+
+
+def _scoped(query, tenant):
+    return query.replace(TENANT_TOKEN, TENANT_PROPERTIES if tenant else "")
+
+
+def graph_schema_statements(shared=False):
+    """
+    Constraints/indexes backing the MERGE keys. Without them every MERGE is a label
+    scan, which degrades linearly as a student's graph accumulates tests.
+
+    Returns:
+        tuple: (question_constraint, question_index_fallback, other_indexes)
+    """
+    tenant = "n.student_id, n.class_id, " if shared else ""
+    question_key = f"({tenant}n.number, n.test_name)"
+    question_constraint = f"CREATE CONSTRAINT question_number_test IF NOT EXISTS FOR (n:Question) REQUIRE {question_key} IS UNIQUE"
+    question_index = f"CREATE INDEX question_number_test IF NOT EXISTS FOR (n:Question) ON {question_key}"
+
+    indexes = [f"CREATE INDEX test_name IF NOT EXISTS FOR (n:Test) ON ({tenant}n.name)"]
+    for label in ("Subject", "CHAPTER", "Topic", "Subtopic"):
+        indexes.append(f"CREATE INDEX {label.lower()}_name_test IF NOT EXISTS FOR (n:{label}) ON ({tenant}n.test_name, n.name)")
+    for label in ("Misconception", "Feedback"):
+        indexes.append(f"CREATE INDEX {label.lower()}_test IF NOT EXISTS FOR (n:{label}) ON ({tenant}n.test_name)")
+    return question_constraint, question_index, indexes
+
+
+def ensure_graph_schema(session, db_name, shared=False):
+    """Creates the constraints/indexes backing the MERGE keys, once per database per process."""
+    if db_name in _schema_ready:
+        return
+    question_constraint, question_index, indexes = graph_schema_statements(shared)
+    try:
+        session.run(question_constraint).consume()
+    except ClientError as e:
+        # Legacy graphs may hold duplicate questions; an index still backs the MERGE
+        logger.warning(f"⚠️ Could not create Question uniqueness constraint on '{db_name}': {e}. Using an index instead.")
+        session.run(question_index).consume()
+    for statement in indexes:
+        try:
+            session.run(statement).consume()
+        except ClientError as e:
+            logger.warning(f"⚠️ Could not create schema on '{db_name}' ({statement}): {e}")
+    _schema_ready.add(db_name)
+
+
+def shared_scope_delete_queries(one_test=True):
+    """
+    DETACH DELETE statements for a student's nodes in the shared graph ($student_id,
+    $class_id), limited to $test_name when one_test. Runs one index-backed delete per
+    label instead of a label-less scan.
+    """
+    test_filter = "n.test_name = $test_name" if one_test else "n.test_name IS NOT NULL"
+    name_filter = "n.name = $test_name" if one_test else "n.name IS NOT NULL"
+    queries = [
+        f"MATCH (n:Test) WHERE n.student_id = $student_id AND n.class_id = $class_id AND {name_filter} DETACH DELETE n"
+    ]
+    for label in TEST_SCOPED_LABELS:
+        tail = f" AND n.{INDEX_TAIL[label]} IS NOT NULL" if label in INDEX_TAIL else ""
+        queries.append(
+            f"MATCH (n:{label}) WHERE n.student_id = $student_id AND n.class_id = $class_id AND {test_filter}{tail} DETACH DELETE n"
+        )
+    return queries
+
+
+def delete_test_queries(tenant=None):
+    """Statements deleting one test's subgraph ($test_name, plus the tenant in the shared graph)."""
+    return shared_scope_delete_queries() if tenant else [DELETE_TEST_QUERY]
+
+
+def _write_test_graph(tx, test_name, test_date, rows, tenant, replace=False):
+    params = dict(tenant or {}, test_name=test_name, test_date=test_date)
+    if replace:
+        for query in delete_test_queries(tenant):
+            tx.run(query, **params).consume()
+    tx.run(_scoped(WRITE_TEST_NODE_QUERY, tenant), **params).consume()
+    question_query = _scoped(WRITE_QUESTIONS_QUERY, tenant)
+    for start in range(0, len(rows), GRAPH_WRITE_BATCH_SIZE):
+        tx.run(question_query, rows=rows[start:start + GRAPH_WRITE_BATCH_SIZE], **params).consume()
+
+
+def write_test_graph(kg_manager, test_name, test_date, rows, tenant=None, replace=False):
+    """
+    Writes one student-test as batched UNWIND statements in a single explicit transaction.
+
+    Args:
+        kg_manager (KnowledgeGraphManager): Manager bound to the target database
+        test_name (str): e.g. "Test3"
+        test_date: Test date stored on the Test node
+        rows (list[dict]): One dict per question with subject, chapter, topic, subtopic,
+            text, correct_answer, opted_answer, is_correct, question_type, number, im_desp,
+            misconceptions ([{"type", "description"}]) and feedbacks ([str]); MERGE keys
+            must be non-null
+        tenant (dict, optional): {"student_id", "class_id"} when writing to the shared graph
+        replace (bool): Delete the existing subgraph of the test in the same transaction
+            first, so a failed write leaves the previous graph in place
+    """
     with kg_manager.get_session() as session:
-        logger.info(f"Adding {test_name} for student {student_id}...")
-        #print(f"Adding {test_name} for student {student_id}...")
-        for question_data in test_data:
-            subject = question_data.get("Subject", "Unknown Subject")
-            chapter = question_data.get("Chapter", "Unknown Chapter")
-            topic = question_data.get("Topic", "Unknown Topic")
-            subtopic = question_data.get("Subtopic", "Unknown Subtopic")
-            text = question_data.get("QuestionText", "No Text Provided")
-            correct_answer = question_data.get("CorrectAnswer", "No Correct Answer")
-            opted_answer = question_data.get("OptedAnswer", "Not Attempted")
-            is_correct = question_data.get("IsCorrect", False)
-            question_type = question_data.get("TypeOfQuestion", "Unknown Type")
-            feedback = question_data.get("Feedback", "No Feedback Available")
-            error_type = question_data.get("Error_Type", None)
-            error_Desp = question_data.get("Error_Desp", None)
-            number = question_data.get("QuestionNumber", 0)
-            im_desp = question_data.get("im_desp", "")
-            test_date = question_data.get("TestDate")
-
-            session.run(
-                """
-                MERGE (test:Test {name: $test_name, date: $test_date })
-                MERGE (subject:Subject {name: $subject, test_name: $test_name})
-                MERGE (test)-[:CONTAINS]->(subject)
-                MERGE (chapter:CHAPTER {name: $chapter, test_name: $test_name, subname: $subject})
-                MERGE (subject)-[:CONTAINS]->(chapter)
-                MERGE (topic:Topic {name: $topic, test_name: $test_name, chapname: $chapter, subname: $subject})
-                MERGE (chapter)-[:CONTAINS]->(topic)
-                MERGE (subtopic:Subtopic {name: $subtopic, test_name: $test_name, topicname: $topic, subname: $subject, chapname: $chapter})
-                MERGE (topic)-[:CONTAINS]->(subtopic)
-                MERGE (question:Question {
-                    number: $number, test_name: $test_name
-                })
-                ON CREATE SET 
-                    question.correctAnswer = $correct_answer,
-                    question.optedAnswer = $opted_answer,
-                    question.isCorrect = $is_correct,
-                    question.type = $question_type,
-                    question.imdesp = $im_desp,
-                    question.text = $text
-                ON MATCH SET
-                    question.optedAnswer = $opted_answer,
-                    question.isCorrect = $is_correct,
-                    question.correctAnswer = $correct_answer,
-                    question.type = $question_type
-                MERGE (subtopic)-[:CONTAINS]->(question)
-                """,
-                test_name=test_name, subject=subject, chapter=chapter, topic=topic,
-                subtopic=subtopic, text=text, correct_answer=correct_answer,
-                opted_answer=opted_answer, is_correct=is_correct,
-                question_type=question_type, number=number, im_desp=im_desp, test_date=test_date
-            )
-
-            if not is_correct and opted_answer:
-                session.run(
-                    """
-                    MERGE (misconception:Misconception {type: $error_type, description: $error_desc, test_name: $test_name})
-                    MERGE (question:Question {text: $text, test_name: $test_name})
-                    MERGE (question)-[:HAS_MISCONCEPTION]->(misconception)
-                    """,
-                    error_type=error_type,
-                    error_desc=error_Desp,
-                    text=text, test_name=test_name
-                )
-
-            if opted_answer:
-                session.run(
-                    """
-                    MERGE (feedback:Feedback {text: $feedback, test_name: $test_name})
-                    MERGE (question:Question {text: $text, test_name: $test_name})
-                    MERGE (question)-[:HAS_FEEDBACK]->(feedback)
-                    """,
-                    feedback=feedback,
-                    text=text, test_name=test_name
-                )
-
-    kg_manager.close()
+        ensure_graph_schema(session, kg_manager.database_name, shared=bool(tenant))
+        # Retried by the driver on transient errors
+        session.execute_write(_write_test_graph, test_name, test_date, rows, tenant, replace)
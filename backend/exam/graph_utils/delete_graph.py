@@ -1,43 +1,75 @@
 from exam.graph_utils.knowledge_graph_manager import KnowledgeGraphManager
+from exam.graph_utils.graph_tenancy import is_shared_graph, graph_target
+from exam.graph_utils.create_graph import delete_test_queries, shared_scope_delete_queries
 import logging
 
 logger = logging.getLogger(__name__)
 
-def delete_test_graph(db_name, test_num):
+
+def _delete_shared_scope(kg_manager, tenant, test_name=None):
+    """Deletes a student's nodes from the shared graph, optionally limited to one test."""
+    for query in shared_scope_delete_queries(one_test=bool(test_name)):
+        kg_manager.run_query(query, test_name=test_name, **tenant)
+
+
+def clear_test_graph(kg_manager, test_name, tenant=None):
+    """
+    Deletes one test's subgraph through an open manager.
+    With a tenant only that student's nodes of the shared graph are deleted.
+    """
+    for query in delete_test_queries(tenant):
+        kg_manager.run_query(query, test_name=test_name, **(tenant or {}))
+
+
+def delete_test_graph(db_name, test_num, student_id=None, class_id=None):
     """
     Deletes all nodes and relationships for a given test from a specific Neo4j database
     after verifying that the database exists.
+    In shared-graph mode only the student's nodes for that test are deleted.
     """
     test_name = f"Test{test_num}"
-    kg_manager = KnowledgeGraphManager(database_name=db_name)
+    database, tenant = graph_target(db_name, student_id, class_id)
+    kg_manager = KnowledgeGraphManager(database_name=database)
 
     # ✅ Check if database exists
     if not kg_manager.check_db():
-        logger.warning(f"[ABORTED] Database '{db_name}' does not exist.")
+        logger.warning(f"[ABORTED] Database '{database}' does not exist.")
         #print(f"[ABORTED] Database '{db_name}' does not exist.")
         kg_manager.close()
         return
-    
+
+    if tenant:
+        logger.info(f"[INFO] Deleting {test_name} of student {tenant['student_id']} from shared graph '{database}'...")
+        clear_test_graph(kg_manager, test_name, tenant)
+        logger.info(f"[SUCCESS] Deleted knowledge graph data for {test_name} of student {tenant['student_id']}")
+        kg_manager.close()
+        return
+
     logger.info(f"[INFO] Database '{db_name}' found. Deleting all nodes for {test_name}...")
     #print(f"[INFO] Database '{db_name}' found. Deleting all nodes for {test_name}...")
 
-    query = """
-MATCH (test:Test {name: $test_name})
-OPTIONAL MATCH (test)-[*]->(n)
-DETACH DELETE test, n
-    """
-
-    kg_manager.run_query(query, test_name=test_name)
+    clear_test_graph(kg_manager, test_name)
     logger.info(f"[SUCCESS] Deleted knowledge graph data for {test_name} from '{db_name}'")
     #print(f"[SUCCESS] Deleted knowledge graph data for {test_name} from '{db_name}'")
     kg_manager.close()
 
 
-def delete_db(db_name):
+def delete_db(db_name, student_id=None, class_id=None):
     """
     Deletes all nodes and relationships for a given test from a specific Neo4j database
     after verifying that the database exists.
+    In shared-graph mode this is a scoped delete of the student's nodes; the shared
+    database itself is never dropped.
     """
+    if is_shared_graph():
+        database, tenant = graph_target(db_name, student_id, class_id)
+        kg_manager = KnowledgeGraphManager(database_name=database)
+        if kg_manager.check_db():
+            logger.info(f"[INFO] Deleting graph of student {tenant['student_id']} from shared graph '{database}'...")
+            _delete_shared_scope(kg_manager, tenant)
+        kg_manager.close()
+        return
+
     kg_manager = KnowledgeGraphManager(database_name=db_name)
 
     # ✅ Check if database exists
@@ -0,0 +1,55 @@
+from dotenv import load_dotenv
+import os
+import logging
+
+load_dotenv()  # Load env vars from .env file
+logger = logging.getLogger(__name__)
+
+# "per_student" (legacy): one Neo4j database per student, named by Student.neo4j_db.
+# "shared": every student lives in NEO4J_SHARED_DATABASE and nodes carry indexed
+# student_id / class_id properties.
+GRAPH_MODE_PER_STUDENT = "per_student"
+GRAPH_MODE_SHARED = "shared"
+
+
+def get_graph_mode():
+    return os.getenv("NEO4J_GRAPH_MODE", GRAPH_MODE_PER_STUDENT).strip().lower()
+
+
+def is_shared_graph():
+    return get_graph_mode() == GRAPH_MODE_SHARED
+
+
+def shared_database_name():
+    return os.getenv("NEO4J_SHARED_DATABASE", "inzighted").strip().lower()
+
+
+def resolve_graph_tenant(db_name, student_id=None, class_id=None):
+    """
+    Returns the (student_id, class_id) that scope a student's nodes in the shared graph.
+
+    Callers that only know the legacy per-student database name are resolved
+    through Student.neo4j_db.
+    """
+    if student_id and class_id:
+        return str(student_id), str(class_id)
+
+    from exam.models.student import Student
+    student = Student.objects.filter(neo4j_db__iexact=db_name).only("student_id", "class_id").first()
+    if not student:
+        raise ValueError(f"No student owns graph '{db_name}'; cannot scope it in the shared graph.")
+    return student.student_id, student.class_id
+
+
+def graph_target(db_name, student_id=None, class_id=None):
+    """
+    Resolves where a student's graph lives.
+
+    Returns:
+        tuple: (database_name, tenant) where tenant is None in per-student mode and
+            {"student_id": ..., "class_id": ...} in shared mode
+    """
+    if not is_shared_graph():
+        return db_name.lower(), None
+    sid, cid = resolve_graph_tenant(db_name, student_id, class_id)
+    return shared_database_name(), {"student_id": sid, "class_id": cid}
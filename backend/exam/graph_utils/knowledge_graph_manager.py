@@ -3,48 +3,110 @@ from neo4j.exceptions import DriverError, ServiceUnavailable, TransientError
 from dotenv import load_dotenv
 import os
 import time
+import threading
 import logging
 
 load_dotenv()  # Load env vars from .env file
 logger = logging.getLogger(__name__)
 
+# Process-wide driver registry. Drivers own a connection pool and are thread-safe,
+# so one per (process, uri, user) is shared by every KnowledgeGraphManager. Keying on
+# the pid keeps Celery prefork children from reusing a driver inherited from the parent.
+_drivers = {}
+_drivers_lock = threading.Lock()
+
+# Database names known to exist on the server, per process (skips SHOW DATABASES)
+_known_databases = set()
+
+
+def _pool_settings():
+    return {
+        "max_connection_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", "50")),
+        "connection_acquisition_timeout": float(os.getenv("NEO4J_POOL_ACQUIRE_TIMEOUT", "60")),
+        "max_connection_lifetime": int(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600")),
+    }
+
+
+def get_shared_driver(uri, username, password, failed_driver=None):
+    """
+    Returns the pooled driver for this process, creating it lazily.
+
+    Args:
+        failed_driver: Driver that just raised a connection error. It is closed and
+            replaced only if it is still the registered one; when another thread has
+            already replaced it, that newer driver is returned untouched.
+    """
+    key = (os.getpid(), uri, username)
+    with _drivers_lock:
+        driver = _drivers.get(key)
+        if driver is not None and failed_driver is not None and driver is failed_driver:
+            try:
+                driver.close()
+            except Exception:
+                pass
+            driver = None
+        if driver is None:
+            driver = GraphDatabase.driver(uri, auth=(username, password), **_pool_settings())
+            _drivers[key] = driver
+        return driver
+
+
+def close_shared_drivers():
+    """Closes every pooled driver of this process (e.g. on worker shutdown)."""
+    with _drivers_lock:
+        for key, driver in list(_drivers.items()):
+            if key[0] == os.getpid():
+                driver.close()
+                del _drivers[key]
+
+
 class KnowledgeGraphManager:
     def __init__(self, database_name, create_if_missing=False):
         self.uri = os.getenv("NEO4J_URI")
         self.username = os.getenv("NEO4J_USERNAME")
         self.password = os.getenv("NEO4J_PASSWORD")
         self.database_name = database_name.lower()
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.username, self.password))
+        self.driver = get_shared_driver(self.uri, self.username, self.password)
 
-        if create_if_missing:
+        if create_if_missing and self.database_name not in _known_databases:
             with self.driver.session(database="system") as session:
                 result = session.run("SHOW DATABASES")
-                db_names = [record["name"] for record in result]
-                if self.database_name not in db_names:
-                    print(f"Database `{self.database_name}` not found. Creating it...")
-                    session.run(f"CREATE DATABASE `{self.database_name}`")
-                    time.sleep(2)
+                _known_databases.update(record["name"] for record in result)
+                if self.database_name not in _known_databases:
+                    logger.info(f"Database `{self.database_name}` not found. Creating it...")
+                    # WAIT blocks until the database is online, replacing a fixed sleep
+                    session.run(f"CREATE DATABASE `{self.database_name}` IF NOT EXISTS WAIT").consume()
+                    _known_databases.add(self.database_name)
+
+    def _refresh_driver(self):
+        self.driver = get_shared_driver(self.uri, self.username, self.password, failed_driver=self.driver)
 
     def get_session(self):
         try:
             return self.driver.session(database=self.database_name)
         except DriverError:
             # Driver was closed or unusable; recreate and return a new session.
-            self.driver = GraphDatabase.driver(self.uri, auth=(self.username, self.password))
+            self._refresh_driver()
             return self.driver.session(database=self.database_name)
 
     def close(self):
-        self.driver.close()
+        # The pooled driver outlives this manager; connections return to the pool
+        # when sessions close, so there is nothing to release here.
+        pass
 
     def check_db(self):
+        if self.database_name in _known_databases:
+            return True
         with self.driver.session(database="system") as session:
             result = session.run("SHOW DATABASES")
             db_names = [record["name"] for record in result]
+            _known_databases.update(db_names)
             return self.database_name in db_names
 
     def delete_db(self):
         with self.driver.session(database="system") as session:
             session.run(f"DROP DATABASE `{self.database_name}` IF EXISTS")
+        _known_databases.discard(self.database_name)
 
     def run_query(self, query, **params):
         """
@@ -77,12 +139,12 @@ class KnowledgeGraphManager:
                     time.sleep(delay)
                     delay *= 2  # Exponential backoff
                     
-                    # Try to recreate driver on connection errors
-                    try:
-                        self.driver.close()
-                        self.driver = GraphDatabase.driver(self.uri, auth=(self.username, self.password))
-                    except Exception as driver_error:
-                        logger.error(f"❌ Failed to recreate driver: {driver_error}")
+                    # Try to recreate driver on connection errors (a transient server error leaves it usable)
+                    if not isinstance(e, TransientError):
+                        try:
+                            self._refresh_driver()
+                        except Exception as driver_error:
+                            logger.error(f"❌ Failed to recreate driver: {driver_error}")
                 else:
                     logger.error(
                         f"❌ Neo4j query failed after {max_attempts} attempts on db '{self.database_name}': {last_exception}"
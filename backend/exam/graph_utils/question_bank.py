@@ -0,0 +1,125 @@
+"""
+Per-task question bank for the PostgreSQL retrieval modules.
+
+The retrieval fetchers walk StudentResult rows and need, for each question, its
+QuestionAnalysis row and the student's selected option. Looking those up one
+question at a time turns a dashboard update into thousands of queries; a
+QuestionBank loads both sides with two queries and serves dict lookups.
+
+Usage:
+    with question_bank_scope(student_id, class_id):
+        ...  # every get_question_bank(student_id, class_id) call shares one bank
+
+Outside a scope get_question_bank() builds a fresh bank per call, which is
+still two queries per fetcher instead of two per question.
+"""
+import threading
+from contextlib import contextmanager
+from exam.models.analysis import QuestionAnalysis
+from exam.models.response import StudentResponse
+from exam.models.result import StudentResult
+
+# Selected answers are stored as 1-4 but older uploads used letters
+OPTION_MAP = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
+
+_lock = threading.Lock()
+# (student_id, class_id) -> [open scope count, QuestionBank or None]
+_scoped_banks = {}
+
+
+class QuestionBank:
+    """
+    QuestionAnalysis rows and a student's responses, keyed by (test_num, question_number).
+
+    Args:
+        student_id (str): Student identifier
+        class_id (str): Class identifier
+        test_nums (iterable, optional): Tests to load; defaults to every test the
+            student has results for
+    """
+
+    def __init__(self, student_id, class_id, test_nums=None):
+        self.student_id = student_id
+        self.class_id = class_id
+
+        questions = QuestionAnalysis.objects.filter(class_id=class_id)
+        responses = StudentResponse.objects.filter(student_id=student_id, class_id=class_id)
+        if test_nums is None:
+            student_tests = StudentResult.objects.filter(
+                student_id=student_id, class_id=class_id
+            ).values('test_num')
+            questions = questions.filter(test_num__in=student_tests)
+        else:
+            test_nums = list(test_nums)
+            questions = questions.filter(test_num__in=test_nums)
+            responses = responses.filter(test_num__in=test_nums)
+
+        self._questions = {(qa.test_num, qa.question_number): qa for qa in questions}
+        self._responses = {
+            (test_num, q_num): selected
+            for test_num, q_num, selected in responses.values_list('test_num', 'question_number', 'selected_answer')
+        }
+
+    def question(self, test_num, question_number):
+        """
+        Returns the QuestionAnalysis row of a question.
+
+        Raises:
+            QuestionAnalysis.DoesNotExist: Same contract as QuestionAnalysis.objects.get
+        """
+        try:
+            return self._questions[(int(test_num), int(question_number))]
+        except KeyError:
+            raise QuestionAnalysis.DoesNotExist(
+                f"No QuestionAnalysis for class {self.class_id}, test {test_num}, Q{question_number}"
+            )
+
+    def selected_answer(self, test_num, question_number):
+        """Returns the student's raw selected answer, or None when there is no response."""
+        return self._responses.get((int(test_num), int(question_number)))
+
+
+def get_question_bank(student_id, class_id, test_num=None):
+    """
+    Returns the scoped bank for the student, or a fresh one when no scope is open.
+
+    Args:
+        test_num (int, optional): Narrows a fresh (unscoped) bank to one test
+    """
+    key = (student_id, class_id)
+    with _lock:
+        scope = _scoped_banks.get(key)
+        if scope is None:
+            scoped = False
+        else:
+            scoped = True
+            if scope[1] is not None:
+                return scope[1]
+
+    if not scoped:
+        return QuestionBank(student_id, class_id, [test_num] if test_num is not None else None)
+
+    bank = QuestionBank(student_id, class_id)
+    with _lock:
+        scope = _scoped_banks.get(key)
+        if scope is not None:
+            if scope[1] is None:
+                scope[1] = bank
+            return scope[1]
+    return bank
+
+
+@contextmanager
+def question_bank_scope(student_id, class_id):
+    """Shares one lazily built QuestionBank per student across the enclosed fetchers."""
+    key = (student_id, class_id)
+    with _lock:
+        _scoped_banks.setdefault(key, [0, None])[0] += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            scope = _scoped_banks[key]
+            scope[0] -= 1
+            if scope[0] == 0:
+                del _scoped_banks[key]
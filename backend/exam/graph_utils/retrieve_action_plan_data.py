@@ -1,11 +1,13 @@
 """
 Retrieve data for Action Plan metric from PostgreSQL tables.
-Uses QuestionAnalysis and StudentResponse tables.
+Uses QuestionAnalysis and StudentResponse tables, plus StudentTopicStats for topic history.
 """
 
+from django.db.models import Sum
 from exam.models.analysis import QuestionAnalysis
 from exam.models.response import StudentResponse
 from exam.models.test import Test
+from exam.utils.topic_stats import student_topic_stats
 from collections import defaultdict
 import math
 import logging
@@ -115,6 +117,7 @@ def get_action_plan_data(student_id, class_id, test_num):
         
         # Calculate weighted accuracy and improvement rate per topic
         topic_metrics = []
+        topic_history = _topic_correct_history(student_id, class_id, test_num)
         
         for topic, data in topic_data.items():
             if data['total'] == 0:
@@ -124,9 +127,7 @@ def get_action_plan_data(student_id, class_id, test_num):
             weighted_acc = calculate_weighted_accuracy(data['correct'], data['total'])
             
             # Calculate improvement rate using historical data
-            improvement_rate = _calculate_topic_improvement_rate(
-                student_id, class_id, topic, all_tests, test_num
-            )
+            improvement_rate = calculate_improvement_rate(topic_history.get(topic, []))
             
             topic_metrics.append({
                 'topic': topic,
@@ -224,56 +225,24 @@ def _extract_wrong_question_data(question, selected_answer):
     }
 
 
-def _calculate_topic_improvement_rate(student_id, class_id, topic, all_tests, current_test_num):
-    """Calculate improvement rate for a topic across previous tests"""
+def _topic_correct_history(student_id, class_id, current_test_num):
+    """Correct answers per topic for each attempted test up to the current one, oldest first"""
+    history = defaultdict(list)
     try:
-        # Get topic scores for previous tests
-        scores = []
-        
-        for tnum in all_tests:
-            if tnum > current_test_num:
-                break
-            
-            # Get questions for this topic in this test
-            questions = QuestionAnalysis.objects.filter(
-                class_id=class_id,
-                test_num=tnum,
-                topic=topic
-            ).values('question_number', 'correct_answer')
-            
-            if not questions:
-                continue
-            
-            # Get responses
-            responses = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=tnum,
-                question_number__in=[q['question_number'] for q in questions]
-            ).values('question_number', 'selected_answer')
-            
-            response_map = {r['question_number']: r['selected_answer'] for r in responses}
-            
-            # Calculate correct count
-            correct = 0
-            total = 0
-            for q in questions:
-                qnum = q['question_number']
-                if qnum in response_map and response_map[qnum]:
-                    total += 1
-                    selected = str(response_map[qnum]).strip().upper()
-                    correct_ans = str(q['correct_answer']).strip().upper()
-                    if selected == correct_ans or selected in correct_ans or correct_ans in selected:
-                        correct += 1
-            
-            if total > 0:
-                scores.append(correct)
-        
-        return calculate_improvement_rate(scores)
+        rows = student_topic_stats(student_id, class_id).filter(
+            test_num__lte=current_test_num
+        ).values('topic', 'test_num').annotate(
+            attempted_questions=Sum('attempted'),
+            correct_questions=Sum('correct')
+        ).order_by('topic', 'test_num')
         
+        for row in rows:
+            if row['attempted_questions']:
+                history[row['topic']].append(row['correct_questions'])
     except Exception as e:
-        logger.warning(f"Error calculating improvement rate for topic {topic}: {e}")
-        return 0.0
+        logger.warning(f"Error loading topic history for student {student_id}: {e}")
+    
+    return history
 
 
 def _select_weak_topics(topic_metrics, threshold=0.7, max_topics=6):
@@ -5,6 +5,8 @@ Groups wrong questions by topic and test for pattern analysis.
 
 from exam.models.result import StudentResult
 from exam.models.analysis import QuestionAnalysis
+from exam.utils.topic_stats import student_topic_stats
+from django.db.models import Sum
 from collections import defaultdict
 import json
 import logging
@@ -151,31 +153,23 @@ def get_cumulative_checkpoints_data(student_id, class_id):
             })
         
         # Second pass: calculate total attempted and correct per topic across all tests
-        for topic in topic_groups.keys():
-            # Get all StudentResult records for this topic (correct + wrong)
-            all_topic_results = StudentResult.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                topic=topic,
-                was_attempted=True
-            ).values('test_num', 'is_correct')
-            
-            # Group by test for improvement rate calculation
-            test_stats = defaultdict(lambda: {'total': 0, 'correct': 0})
-            for res in all_topic_results:
-                test_stats[res['test_num']]['total'] += 1
-                if res['is_correct']:
-                    test_stats[res['test_num']]['correct'] += 1
-            
-            # Calculate total and accuracy per test
-            topic_groups[topic]['total_attempted'] = sum(s['total'] for s in test_stats.values())
-            topic_groups[topic]['total_correct'] = sum(s['correct'] for s in test_stats.values())
+        topic_test_stats = student_topic_stats(student_id, class_id).filter(
+            topic__in=list(topic_groups.keys())
+        ).values('topic', 'test_num').annotate(
+            total_questions=Sum('attempted'),
+            correct_questions=Sum('correct')
+        ).order_by('topic', 'test_num')
+        
+        for stats in topic_test_stats:
+            topic = stats['topic']
+            total = stats['total_questions'] or 0
+            correct = stats['correct_questions'] or 0
+            topic_groups[topic]['total_attempted'] += total
+            topic_groups[topic]['total_correct'] += correct
             
             # Build test accuracies for improvement rate
-            for test_num, stats in test_stats.items():
-                if stats['total'] > 0:
-                    acc = stats['correct'] / stats['total']
-                    topic_groups[topic]['test_accuracies'].append((test_num, acc))
+            if total > 0:
+                topic_groups[topic]['test_accuracies'].append((stats['test_num'], correct / total))
         
         # Build final structure
         topics_output = []
@@ -5,10 +5,11 @@ Replaces Neo4j graph queries with PostgreSQL table queries.
 
 import pandas as pd
 import numpy as np
-from django.db.models import Count, Sum, Case, When, IntegerField, FloatField, F, Q
+from django.db.models import Sum, FloatField, F
 from exam.models.result import StudentResult
 from exam.models.analysis import QuestionAnalysis
-from exam.models.response import StudentResponse
+from exam.graph_utils.question_bank import get_question_bank, OPTION_MAP
+from exam.utils.topic_stats import student_topic_stats
 
 
 def get_overview_data_pg(student_id, class_id):
@@ -38,18 +39,9 @@ def get_key_strength_data_pg(student_id, class_id):
     Returns top 5 chapters per subject based on weighted score.
     """
     # Calculate weighted scores for chapters
-    chapter_results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('subject', 'chapter').annotate(
-        total_questions=Count('question_number'),
-        correct_questions=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    chapter_results = student_topic_stats(student_id, class_id).values('subject', 'chapter').annotate(
+        total_questions=Sum('total'),
+        correct_questions=Sum('correct')
     )
     
     # Calculate weighted scores and organize by subject
@@ -84,6 +76,8 @@ def get_key_strength_data_pg(student_id, class_id):
     # Get question metadata for top chapters
     result = {"subjects": []}
     
+    bank = get_question_bank(student_id, class_id)
+
     for subject, chapters in subject_to_top_chapters.items():
         chapter_names = [ch['chapter'] for ch in chapters]
         
@@ -100,27 +94,15 @@ def get_key_strength_data_pg(student_id, class_id):
         structured = {}
         for test_num, q_num in correct_questions:
             try:
-                qa = QuestionAnalysis.objects.get(
-                    class_id=class_id,
-                    test_num=test_num,
-                    question_number=q_num
-                )
-                
-                response = StudentResponse.objects.filter(
-                    student_id=student_id,
-                    class_id=class_id,
-                    test_num=test_num,
-                    question_number=q_num
-                ).first()
+                qa = bank.question(test_num, q_num)
                 
-                selected_answer = response.selected_answer if response else None
+                selected_answer = bank.selected_answer(test_num, q_num)
                 
                 # Get feedback and actual option text
                 feedback = ""
                 actual_option_text = ""
                 if selected_answer:
-                    option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                    option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                    option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                     feedback = getattr(qa, f'option_{option_num}_feedback', '')
                     actual_option_text = getattr(qa, f'option_{option_num}', '')
                 
@@ -155,20 +137,10 @@ def get_area_for_improvement_data_pg(student_id, class_id):
     """
     # Calculate weighted scores for chapters
     # Match Neo4j: WHERE q.optedAnswer IS NOT NULL means was_attempted=True
-    chapter_results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id,
-        was_attempted=True  # Only attempted questions like Neo4j
-    ).values('subject', 'chapter').annotate(
-        total_questions=Count('question_number'),
-        correct_questions=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
-    )
+    chapter_results = student_topic_stats(student_id, class_id).values('subject', 'chapter').annotate(
+        total_questions=Sum('attempted'),  # Only attempted questions like Neo4j
+        correct_questions=Sum('correct')
+    ).filter(total_questions__gt=0)
     
     # Calculate weighted scores and organize by subject
     subject_to_chapters = {}
@@ -209,6 +181,8 @@ def get_area_for_improvement_data_pg(student_id, class_id):
     # Get question metadata for improvement chapters
     response = {"subjects": []}
     
+    bank = get_question_bank(student_id, class_id)
+
     for subject, chapter_names in subject_to_chapters.items():
         # Get correct questions for these chapters (for practice)
         correct_questions = StudentResult.objects.filter(
@@ -223,27 +197,15 @@ def get_area_for_improvement_data_pg(student_id, class_id):
         structured = {}
         for test_num, q_num in correct_questions:
             try:
-                qa = QuestionAnalysis.objects.get(
-                    class_id=class_id,
-                    test_num=test_num,
-                    question_number=q_num
-                )
-                
-                response_obj = StudentResponse.objects.filter(
-                    student_id=student_id,
-                    class_id=class_id,
-                    test_num=test_num,
-                    question_number=q_num
-                ).first()
+                qa = bank.question(test_num, q_num)
                 
-                selected_answer = response_obj.selected_answer if response_obj else None
+                selected_answer = bank.selected_answer(test_num, q_num)
                 
                 # Get feedback and actual option text
                 feedback = ""
                 actual_option_text = ""
                 if selected_answer:
-                    option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                    option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                    option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                     feedback = getattr(qa, f'option_{option_num}_feedback', '')
                     actual_option_text = getattr(qa, f'option_{option_num}', '')
                 
@@ -278,19 +240,9 @@ def get_consistency_vulnerability_data_pg(student_id, class_id):
     """
     # Get test-wise chapter accuracy
     # Match Neo4j: WHERE q.optedAnswer IS NOT NULL means was_attempted=True  
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id,
-        was_attempted=True  # Only attempted questions like Neo4j
-    ).values('test_num', 'subject', 'chapter').annotate(
-        total_questions=Count('question_number'),
-        correct_questions=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    results = student_topic_stats(student_id, class_id).values('test_num', 'subject', 'chapter').annotate(
+        total_questions=Sum('attempted'),  # Only attempted questions like Neo4j
+        correct_questions=Sum('correct')
     ).order_by('subject', 'chapter', 'test_num')
     
     # Build DataFrame for easier processing
@@ -317,30 +269,20 @@ def get_consistency_vulnerability_data_pg(student_id, class_id):
     ).values_list('test_num', 'subject', 'chapter', 'question_number', 'is_correct', 'was_attempted')
     
     questions_dict = {}
+    bank = get_question_bank(student_id, class_id)
+
     for test_num, subject, chapter, q_num, is_correct, was_attempted in question_results:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
+            qa = bank.question(test_num, q_num)
             
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
-            
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             # Get feedback, misconception, and actual option text
             feedback = ""
             err = ""
             actual_option_text = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
                 actual_option_text = getattr(qa, f'option_{option_num}', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
@@ -432,18 +374,8 @@ def get_performance_trend_graph_pg(student_id, class_id):
     """
     # Match Neo4j query exactly: WHERE q.optedAnswer IS NOT NULL filters to attempted
     # Scoring: isCorrect=true -> 4, isCorrect=false -> -1, else 0
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('test_num', 'subject').annotate(
-        score=Sum(
-            Case(
-                When(is_correct=True, was_attempted=True, then=4),
-                When(is_correct=False, was_attempted=True, then=-1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    results = student_topic_stats(student_id, class_id).values('test_num', 'subject').annotate(
+        score=Sum(F('correct') * 5 - F('attempted'))  # 4 * correct - 1 * (attempted - correct)
     ).order_by('subject', 'test_num')
     
     # Organize by subject
@@ -471,40 +403,11 @@ def get_test_wise_subject_score_pg(student_id, class_id):
     Returns test-wise subject score matrix with counts.
     Rows: Test Names, Columns: Subjects + count columns
     """
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('test_num', 'subject').annotate(
-        score=Sum(
-            Case(
-                When(is_correct=True, then=4),
-                When(Q(is_correct=False) & Q(was_attempted=True), then=-1),
-                When(Q(is_correct=False) & Q(was_attempted=False), then=0),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        correct_count=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        incorrect_count=Sum(
-            Case(
-                When(Q(is_correct=False) & Q(was_attempted=True), then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        ),
-        skipped_count=Sum(
-            Case(
-                When(Q(is_correct=False) & Q(was_attempted=False), then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    results = student_topic_stats(student_id, class_id).values('test_num', 'subject').annotate(
+        score=Sum(F('correct') * 5 - F('attempted')),
+        correct_count=Sum('correct'),
+        incorrect_count=Sum(F('attempted') - F('correct')),
+        skipped_count=Sum(F('total') - F('attempted'))
     ).order_by('test_num', 'subject')
     
     # Build records - use was_attempted=False count as unattempted
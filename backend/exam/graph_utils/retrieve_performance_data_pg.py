@@ -3,9 +3,10 @@ PostgreSQL-based performance data retrieval
 Replaces Neo4j graph queries with PostgreSQL table queries.
 """
 
-from django.db.models import Count, Sum, Case, When, IntegerField, F, Q
+from django.db.models import Sum, F, Q
 from exam.models.result import StudentResult
 from exam.models.analysis import QuestionAnalysis
+from exam.utils.topic_stats import student_topic_stats
 
 
 def get_overview_data_pg(student_id, class_id):
@@ -44,19 +45,9 @@ def fetch_chapter_topic_graph_pg(student_id, class_id):
     """
     # Step 1: Chapter-level accuracy
     # Match Neo4j: WHERE q.optedAnswer IS NOT NULL means was_attempted=True
-    chapter_results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id,
-        was_attempted=True  # Only count attempted questions like Neo4j
-    ).values('test_num', 'subject', 'chapter').annotate(
-        total_questions=Count('question_number'),
-        correct_answers=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    chapter_results = student_topic_stats(student_id, class_id).values('test_num', 'subject', 'chapter').annotate(
+        total_questions=Sum('attempted'),  # Only count attempted questions like Neo4j
+        correct_answers=Sum('correct')
     ).order_by('subject', 'chapter', 'test_num')
     
     hierarchy = {}
@@ -80,19 +71,9 @@ def fetch_chapter_topic_graph_pg(student_id, class_id):
     
     # Step 2: Topic-level accuracy
     # Match Neo4j: WHERE q.optedAnswer IS NOT NULL means was_attempted=True
-    topic_results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id,
-        was_attempted=True  # Only count attempted questions like Neo4j
-    ).values('test_num', 'subject', 'chapter', 'topic').annotate(
-        total_questions=Count('question_number'),
-        correct_answers=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    topic_results = student_topic_stats(student_id, class_id).values('test_num', 'subject', 'chapter', 'topic').annotate(
+        total_questions=Sum('attempted'),  # Only count attempted questions like Neo4j
+        correct_answers=Sum('correct')
     ).order_by('subject', 'chapter', 'topic', 'test_num')
     
     for record in topic_results:
@@ -7,9 +7,8 @@ and mistake patterns.
 """
 
 import logging
-from django.db.models import Q, Count, Case, When, IntegerField
-from exam.models.analysis import QuestionAnalysis
-from exam.models.response import StudentResponse
+from django.db.models import Sum
+from exam.utils.topic_stats import student_topic_stats
 import math
 
 logger = logging.getLogger(__name__)
@@ -59,35 +58,16 @@ def get_study_tips_data(student_id, class_id, test_num):
     try:
         logger.info(f"Fetching study tips data for student {student_id}, class {class_id}, test {test_num}")
         
-        # Fetch student responses for the test
-        responses = StudentResponse.objects.filter(
-            student_id=student_id,
-            class_id=class_id,
-            test_num=test_num
+        # Per-topic, per-question-type counts for the test (see exam.utils.topic_stats)
+        stats_rows = student_topic_stats(student_id, class_id, test_num).values(
+            'subject', 'topic', 'question_type'
+        ).annotate(
+            total_questions=Sum('total'),
+            correct_questions=Sum('correct')
         )
 
-        if not responses.exists():
-            logger.warning(f"No responses found for student {student_id}, test {test_num}")
-            return {
-                'strong_topics': [],
-                'weak_topics': [],
-                'moderate_topics': [],
-                'question_type_analysis': []
-            }
-
-        # Build a map of question_number -> selected_answer for quick lookup
-        response_map = {r.question_number: (r.selected_answer or '').strip() for r in responses}
-
-        # Fetch the question metadata for only those questions student answered
-        question_numbers = list(response_map.keys())
-        analyses = QuestionAnalysis.objects.filter(
-            class_id=class_id,
-            test_num=test_num,
-            question_number__in=question_numbers
-        )
-
-        if not analyses.exists():
-            logger.warning(f"No question analysis records found for class {class_id}, test {test_num}")
+        if not stats_rows:
+            logger.warning(f"No topic stats found for student {student_id}, test {test_num}")
             return {
                 'strong_topics': [],
                 'weak_topics': [],
@@ -99,15 +79,12 @@ def get_study_tips_data(student_id, class_id, test_num):
         topic_stats = {}
         question_type_stats = {}
 
-        for analysis in analyses:
-            subject = analysis.subject or 'Unknown'
-            topic = analysis.topic or 'Unknown'
-            # model field is 'typeOfquestion'
-            question_type = getattr(analysis, 'typeOfquestion', None) or 'Unknown'
-            qnum = analysis.question_number
-            selected = response_map.get(qnum, '')
-            correct_answer = (analysis.correct_answer or '').strip()
-            is_correct = (selected != '' and selected == correct_answer)
+        for row in stats_rows:
+            subject = row['subject'] or 'Unknown'
+            topic = row['topic'] or 'Unknown'
+            question_type = row['question_type'] or 'Unknown'
+            total = row['total_questions'] or 0
+            correct = row['correct_questions'] or 0
             
             # Build topic key
             topic_key = (subject, topic)
@@ -120,9 +97,8 @@ def get_study_tips_data(student_id, class_id, test_num):
                     'total': 0
                 }
             
-            topic_stats[topic_key]['total'] += 1
-            if is_correct:
-                topic_stats[topic_key]['correct'] += 1
+            topic_stats[topic_key]['total'] += total
+            topic_stats[topic_key]['correct'] += correct
             
             # Build question type stats
             if question_type not in question_type_stats:
@@ -132,10 +108,8 @@ def get_study_tips_data(student_id, class_id, test_num):
                     'incorrect': 0
                 }
 
-            if is_correct:
-                question_type_stats[question_type]['correct'] += 1
-            else:
-                question_type_stats[question_type]['incorrect'] += 1
+            question_type_stats[question_type]['correct'] += correct
+            question_type_stats[question_type]['incorrect'] += total - correct
         
         # Calculate weighted accuracy and categorize topics
         strong_topics = []
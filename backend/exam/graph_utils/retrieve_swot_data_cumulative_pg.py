@@ -5,8 +5,9 @@ Replaces Neo4j graph queries with PostgreSQL table queries.
 
 import pandas as pd
 import math
-from django.db.models import Count, Q, Sum, Case, When, IntegerField, FloatField, F
-from exam.models.response import StudentResponse
+from django.db.models import Q, Sum, FloatField, F
+from exam.graph_utils.question_bank import get_question_bank, OPTION_MAP
+from exam.utils.topic_stats import student_topic_stats
 from exam.models.analysis import QuestionAnalysis
 from exam.models.result import StudentResult
 from exam.models.test import Test
@@ -45,18 +46,9 @@ def fetch_topic_scores_pg(student_id, class_id):
     Returns: DataFrame with columns [TestName, Subject, Topic, Total, Correct]
     """
     # Get all test results for the student
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('test_num', 'subject', 'topic').annotate(
-        total=Count('question_number'),
-        correct=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
+    results = student_topic_stats(student_id, class_id).values('test_num', 'subject', 'topic').annotate(
+        total_questions=Sum('total'),
+        correct_questions=Sum('correct')
     ).order_by('test_num', 'subject', 'topic')
     
     records = []
@@ -65,8 +57,8 @@ def fetch_topic_scores_pg(student_id, class_id):
             'TestName': f"Test{r['test_num']}",
             'Subject': r['subject'],
             'Topic': r['topic'],
-            'Total': r['total'],
-            'Correct': r['correct']
+            'Total': r['total_questions'],
+            'Correct': r['correct_questions']
         })
     
     return pd.DataFrame(records)
@@ -94,30 +86,19 @@ def fetch_correct_questions_pg(student_id, class_id, subject, topics):
     
     # Fetch question details from QuestionAnalysis
     records = []
+    bank = get_question_bank(student_id, class_id)
+
     for test_num, q_num in correct_pairs:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
-            
-            # Get student response
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
+            qa = bank.question(test_num, q_num)
             
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             # Get actual option text for better LLM understanding
             option_text = ""
             feedback = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 option_text = getattr(qa, f'option_{option_num}', '')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
             
@@ -159,29 +140,19 @@ def fetch_all_questions_pg(student_id, class_id, subject, topics):
         return pd.DataFrame()
     
     records = []
+    bank = get_question_bank(student_id, class_id)
+
     for test_num, q_num, is_correct in attempted_list:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
-            
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
+            qa = bank.question(test_num, q_num)
             
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             feedback = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
@@ -227,30 +198,20 @@ def fetch_wrong_questions_pg(student_id, class_id, subject, topics):
         return pd.DataFrame()
     
     records = []
+    bank = get_question_bank(student_id, class_id)
+
     for test_num, q_num in wrong_pairs:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
-            
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
+            qa = bank.question(test_num, q_num)
             
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             # Get actual option text for better LLM understanding
             option_text = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 option_text = getattr(qa, f'option_{option_num}', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
@@ -279,56 +240,25 @@ def fetch_question_type_scores_pg(student_id, class_id):
     Fetch question type performance across all tests.
     Returns: DataFrame with columns [Subject, Type, Total, Correct]
     """
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id
-    ).values('test_num', 'subject', 'question_number')
-    
-    # Get question types from QuestionAnalysis
-    records = []
-    processed = set()
-    
-    for r in results:
-        key = (r['test_num'], r['question_number'])
-        if key in processed:
-            continue
-        processed.add(key)
-        
-        try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=r['test_num'],
-                question_number=r['question_number']
-            )
-            
-            student_result = StudentResult.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=r['test_num'],
-                question_number=r['question_number']
-            ).first()
-            
-            is_correct = student_result.is_correct if student_result else False
-            
-            records.append({
-                'Subject': r['subject'],
-                'Type': qa.typeOfquestion,
-                'IsCorrect': is_correct
-            })
-        except QuestionAnalysis.DoesNotExist:
-            continue
-    
-    # Aggregate by subject and type
-    df = pd.DataFrame(records)
-    if df.empty:
-        return df
-    
-    grouped = df.groupby(['Subject', 'Type']).agg(
-        Total=('IsCorrect', 'count'),
-        Correct=('IsCorrect', 'sum')
-    ).reset_index()
+    # Question types without a QuestionAnalysis row are stored as '' and skipped
+    results = student_topic_stats(student_id, class_id).exclude(
+        question_type=''
+    ).values('subject', 'question_type').annotate(
+        total_questions=Sum('total'),
+        correct_questions=Sum('correct')
+    ).order_by('subject', 'question_type')
+    
+    records = [
+        {
+            'Subject': r['subject'],
+            'Type': r['question_type'],
+            'Total': r['total_questions'],
+            'Correct': r['correct_questions']
+        }
+        for r in results
+    ]
     
-    return grouped
+    return pd.DataFrame(records)
 
 
 def fetch_wrong_questions_by_qtype_pg(student_id, class_id, subject, types):
@@ -343,32 +273,22 @@ def fetch_wrong_questions_by_qtype_pg(student_id, class_id, subject, types):
     ).values_list('test_num', 'question_number')
     
     records = []
+    bank = get_question_bank(student_id, class_id)
+
     for test_num, q_num in wrong_results:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
+            qa = bank.question(test_num, q_num)
             
             if qa.typeOfquestion not in types:
                 continue
             
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
-            
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             feedback = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
@@ -404,32 +324,22 @@ def fetch_correct_questions_by_qtype_pg(student_id, class_id, subject, types):
     ).values_list('test_num', 'question_number')
     
     records = []
+    bank = get_question_bank(student_id, class_id)
+
     for test_num, q_num in correct_results:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
+            qa = bank.question(test_num, q_num)
             
             if qa.typeOfquestion not in types:
                 continue
             
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
-            
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             feedback = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
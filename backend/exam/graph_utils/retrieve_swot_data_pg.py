@@ -5,8 +5,9 @@ Replaces Neo4j graph queries with PostgreSQL table queries for specific test.
 
 import pandas as pd
 import math
-from django.db.models import Count, Q, Sum, Case, When, IntegerField, FloatField, F
-from exam.models.response import StudentResponse
+from django.db.models import Q, Sum, FloatField, F
+from exam.graph_utils.question_bank import get_question_bank, OPTION_MAP
+from exam.utils.topic_stats import student_topic_stats
 from exam.models.analysis import QuestionAnalysis
 from exam.models.result import StudentResult
 from exam.models.test import Test
@@ -31,21 +32,10 @@ def fetch_topic_scores_analysis_pg(student_id, class_id, test_num):
     Match Neo4j: WHERE q.optedAnswer IS NOT NULL means was_attempted=True
     Returns: DataFrame with columns [TestName, Subject, Topic, Total, Correct]
     """
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id,
-        test_num=test_num,
-        was_attempted=True  # Only attempted questions like Neo4j
-    ).values('test_num', 'subject', 'topic').annotate(
-        total=Count('question_number'),
-        correct=Sum(
-            Case(
-                When(is_correct=True, then=1),
-                default=0,
-                output_field=IntegerField()
-            )
-        )
-    ).order_by('subject', 'topic')
+    results = student_topic_stats(student_id, class_id, test_num).values('test_num', 'subject', 'topic').annotate(
+        total_questions=Sum('attempted'),  # Only attempted questions like Neo4j
+        correct_questions=Sum('correct')
+    ).filter(total_questions__gt=0).order_by('subject', 'topic')
     
     records = []
     for r in results:
@@ -53,8 +43,8 @@ def fetch_topic_scores_analysis_pg(student_id, class_id, test_num):
             'TestName': f"Test{r['test_num']}",
             'Subject': r['subject'],
             'Topic': r['topic'],
-            'Total': r['total'],
-            'Correct': r['correct']
+            'Total': r['total_questions'],
+            'Correct': r['correct_questions']
         })
     
     return pd.DataFrame(records)
@@ -80,29 +70,19 @@ def fetch_correct_questions_analysis_pg(student_id, class_id, test_num, subject,
         return pd.DataFrame()
     
     records = []
+    bank = get_question_bank(student_id, class_id, test_num)
+
     for q_num in question_numbers:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
-            
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
+            qa = bank.question(test_num, q_num)
             
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             # Get actual option text for better LLM understanding
             option_text = ""
             feedback = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 option_text = getattr(qa, f'option_{option_num}', '')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
             
@@ -144,29 +124,19 @@ def fetch_all_questions_analysis_pg(student_id, class_id, test_num, subject, top
         return pd.DataFrame()
     
     records = []
+    bank = get_question_bank(student_id, class_id, test_num)
+
     for q_num, is_correct in attempted_list:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
-            
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
+            qa = bank.question(test_num, q_num)
             
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             feedback = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
@@ -212,30 +182,20 @@ def fetch_wrong_questions_analysis_pg(student_id, class_id, test_num, subject, t
         return pd.DataFrame()
     
     records = []
+    bank = get_question_bank(student_id, class_id, test_num)
+
     for q_num in question_numbers:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
-            
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
+            qa = bank.question(test_num, q_num)
             
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             # Get actual option text for better LLM understanding
             option_text = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 option_text = getattr(qa, f'option_{option_num}', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
@@ -265,56 +225,25 @@ def fetch_question_type_scores_analysis_pg(student_id, class_id, test_num):
     Match Neo4j: WHERE q.optedAnswer IS NOT NULL means was_attempted=True
     Returns: DataFrame with columns [Subject, Type, Total, Correct]
     """
-    results = StudentResult.objects.filter(
-        student_id=student_id,
-        class_id=class_id,
-        test_num=test_num,
-        was_attempted=True  # Only attempted questions like Neo4j
-    ).values('subject', 'question_number')
-    
-    records = []
-    processed = set()
-    
-    for r in results:
-        key = (test_num, r['question_number'])
-        if key in processed:
-            continue
-        processed.add(key)
-        
-        try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=r['question_number']
-            )
-            
-            student_result = StudentResult.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=r['question_number']
-            ).first()
-            
-            is_correct = student_result.is_correct if student_result else False
-            
-            records.append({
-                'Subject': r['subject'],
-                'Type': qa.typeOfquestion,
-                'IsCorrect': is_correct
-            })
-        except QuestionAnalysis.DoesNotExist:
-            continue
-    
-    df = pd.DataFrame(records)
-    if df.empty:
-        return df
-    
-    grouped = df.groupby(['Subject', 'Type']).agg(
-        Total=('IsCorrect', 'count'),
-        Correct=('IsCorrect', 'sum')
-    ).reset_index()
+    # Question types without a QuestionAnalysis row are stored as '' and skipped
+    results = student_topic_stats(student_id, class_id, test_num).exclude(
+        question_type=''
+    ).values('subject', 'question_type').annotate(
+        total_questions=Sum('attempted'),  # Only attempted questions like Neo4j
+        correct_questions=Sum('correct')
+    ).filter(total_questions__gt=0).order_by('subject', 'question_type')
+    
+    records = [
+        {
+            'Subject': r['subject'],
+            'Type': r['question_type'],
+            'Total': r['total_questions'],
+            'Correct': r['correct_questions']
+        }
+        for r in results
+    ]
     
-    return grouped
+    return pd.DataFrame(records)
 
 
 def fetch_wrong_questions_by_qtype_analysis_pg(student_id, class_id, test_num, subject, types):
@@ -330,32 +259,22 @@ def fetch_wrong_questions_by_qtype_analysis_pg(student_id, class_id, test_num, s
     ).values_list('question_number')
     
     records = []
+    bank = get_question_bank(student_id, class_id, test_num)
+
     for (q_num,) in wrong_results:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
+            qa = bank.question(test_num, q_num)
             
             if qa.typeOfquestion not in types:
                 continue
             
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
-            
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             feedback = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
@@ -392,32 +311,22 @@ def fetch_correct_questions_by_qtype_analysis_pg(student_id, class_id, test_num,
     ).values_list('question_number')
     
     records = []
+    bank = get_question_bank(student_id, class_id, test_num)
+
     for (q_num,) in correct_results:
         try:
-            qa = QuestionAnalysis.objects.get(
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            )
+            qa = bank.question(test_num, q_num)
             
             if qa.typeOfquestion not in types:
                 continue
             
-            response = StudentResponse.objects.filter(
-                student_id=student_id,
-                class_id=class_id,
-                test_num=test_num,
-                question_number=q_num
-            ).first()
-            
-            selected_answer = response.selected_answer if response else None
+            selected_answer = bank.selected_answer(test_num, q_num)
             
             feedback = ""
             mis_type = ""
             mis_desc = ""
             if selected_answer:
-                option_map = {'A': '1', 'B': '2', 'C': '3', 'D': '4', '1': '1', '2': '2', '3': '3', '4': '4'}
-                option_num = option_map.get(str(selected_answer).strip().upper(), '1')
+                option_num = OPTION_MAP.get(str(selected_answer).strip().upper(), '1')
                 feedback = getattr(qa, f'option_{option_num}_feedback', '')
                 mis_type = getattr(qa, f'option_{option_num}_type', '')
                 mis_desc = getattr(qa, f'option_{option_num}_misconception', '')
@@ -1,5 +1,6 @@
 from exam.models.analysis import QuestionAnalysis
 from django.db import transaction
+from exam.utils.question_cache import invalidate_question_set
 
 
 def save_analysis(result, class_id, test_num ):
@@ -35,4 +36,6 @@ def save_analysis(result, class_id, test_num ):
                         "option_3_misconception": question_data.get("Error_Desp3", ""),
                         "option_4_misconception": question_data.get("Error_Desp4", ""),
                     }
-                )
\ No newline at end of file
+                )
+    # Cached question sets of this test are now stale
+    invalidate_question_set(class_id, test_num)
@@ -5,6 +5,9 @@ from exam.graph_utils.retrieve_action_plan_data import get_action_plan_data
 from exam.graph_utils.retrieve_study_tips_data import get_study_tips_data
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
 from exam.models.educator import Educator
 from collections import defaultdict
 from exam.models.overview import Overview
@@ -50,10 +53,173 @@ output format:
     return insights[:3]  # Return top 3 insights only
 
 
+# Insight LLM calls from every dashboard update in this worker process share one pool;
+# Gemini concurrency is further capped by the global LLM limiter.
+OVERVIEW_INSIGHT_WORKERS = getattr(settings, 'OVERVIEW_INSIGHT_WORKERS', 6)
+_insight_executor = ThreadPoolExecutor(max_workers=OVERVIEW_INSIGHT_WORKERS, thread_name_prefix="overview-insights")
+
+
+def _run_insight_task(func, *args):
+    """Runs func on a pooled thread, honouring CONN_MAX_AGE for the thread's DB connection."""
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def _valid_insight_section(lines):
+    """A section is usable when it is a non-empty list of non-blank strings."""
+    return isinstance(lines, list) and bool(lines) and all(isinstance(line, str) and line.strip() for line in lines)
+
+
+def _build_combined_prompt(categories):
+    """
+    Builds one prompt for several insight categories, sending each distinct data block once.
+
+    Args:
+        categories (dict): {category: (data, prompt)}
+    """
+    blocks = {}  # fingerprint -> (label, data)
+    tasks = []
+    for key, (data, prompt) in categories.items():
+        fingerprint = json.dumps(data, sort_keys=True, default=str)
+        if fingerprint not in blocks:
+            blocks[fingerprint] = (f"DATA_{len(blocks) + 1}", data)
+        label = blocks[fingerprint][0]
+        tasks.append(f"### Task \"{key}\" (use {label})\n{prompt}")
+
+    data_section = "\n\n".join(f"### {label}\n{data}" for label, data in blocks.values())
+    keys_format = ",\n    ".join(f'"{key}": ["string1", "string2", "string3"]' for key in categories)
+    return f"""You will complete {len(categories)} independent tasks.
+Follow each task's instructions separately and only use the data block it names.
+
+{chr(10).join(tasks)}
+
+output format (JSON):
+{{
+    {keys_format}
+}}
+
+- Return only the JSON object with exactly these keys.
+- Each list holds exactly 3 strings.
+- Do not return NULL.
+
+{data_section}"""
+
+
 @traceable()
-def Generate_overview_data(db_name, student_id=None, class_id=None, test_num=None):
-    # Fetch base metrics using PostgreSQL
-    if student_id and class_id:
+def extract_insights_combined(categories, max_reasks=2):
+    """
+    Generates several insight categories with one Gemini call.
+
+    The response must be a JSON object keyed by category. Each section is
+    validated on its own; only the sections that fail are asked for again.
+
+    Args:
+        categories (dict): {category: (data, prompt)}
+        max_reasks (int): Follow-up calls allowed for failed sections
+
+    Returns:
+        dict: {category: list of up to 3 insights}; [] for a section that never validated
+    """
+    insights = {}
+    pending = dict(categories)
+    for attempt in range(max_reasks + 1):
+        # Re-asks bypass the response cache, which may hold the rejected answer
+        result = call_gemini_api_with_rotation(_build_combined_prompt(pending), "gemini-2.5-flash",
+                                               return_structured=True, cache=False if attempt else None)
+
+        if isinstance(result, dict):
+            if result.get("ok"):
+                response = result.get("response", "") or ""
+            else:
+                logger.warning(f"Gemini structured error: code={result.get('code')} reason={result.get('reason')} model={result.get('model')} attempt={result.get('attempt')}")
+                response = ""
+        else:
+            response = result or ""
+
+        parsed = {}
+        start, end = response.find("{"), response.rfind("}") + 1
+        if start != -1 and end > start:
+            try:
+                parsed = json.loads(response[start:end])
+            except (ValueError, TypeError):
+                logger.warning(f"⚠️ Combined insight response was not valid JSON (attempt {attempt + 1})")
+        if not isinstance(parsed, dict):
+            parsed = {}
+
+        for key in list(pending):
+            lines = parsed.get(key)
+            if _valid_insight_section(lines):
+                insights[key] = [line.strip().strip('"').strip("'") for line in lines][:3]
+                del pending[key]
+
+        if not pending:
+            break
+        logger.warning(f"⚠️ Insight sections {list(pending)} failed validation (attempt {attempt + 1}), re-asking")
+
+    for key in pending:
+        logger.error(f"❌ No valid insights for {key} after {max_reasks + 1} attempts")
+        insights[key] = []
+    return {key: insights[key] for key in categories}
+
+
+def submit_insight_tasks(categories, combined=False):
+    """
+    Dispatches insight prompts to the shared pool, sending identical data once.
+
+    Args:
+        categories (dict): {category: (data, prompt)}
+        combined (bool): Ask for every category in a single structured call
+
+    Returns:
+        list: (categories, future) pairs; each future yields {category: insights}
+    """
+    if combined:
+        future = _insight_executor.submit(_run_insight_task, extract_insights_combined, dict(categories))
+        return [(list(categories), future)]
+
+    groups = {}
+    for key, (data, prompt) in categories.items():
+        fingerprint = json.dumps(data, sort_keys=True, default=str)
+        groups.setdefault(fingerprint, (data, {}))[1][key] = prompt
+
+    futures = []
+    for data, prompts_by_key in groups.values():
+        if len(prompts_by_key) == 1:
+            (key, prompt), = prompts_by_key.items()
+            future = _insight_executor.submit(
+                _run_insight_task, lambda d=data, k=key, p=prompt: {k: extract_insights(d, p)}
+            )
+        else:
+            future = _insight_executor.submit(
+                _run_insight_task, extract_insights_combined,
+                {key: (data, prompt) for key, prompt in prompts_by_key.items()}
+            )
+        futures.append((list(prompts_by_key), future))
+    return futures
+
+
+def collect_insights(futures, order=("KS", "AI", "QR", "CV")):
+    """Waits for submit_insight_tasks futures and returns insights in a fixed key order."""
+    gathered = {}
+    for keys, future in futures:
+        try:
+            gathered.update(future.result())
+        except Exception as e:
+            logger.error(f"Error generating insights {keys}: {e}", exc_info=True)
+            gathered.update({key: [] for key in keys})
+    ordered = [key for key in order if key in gathered] + [key for key in gathered if key not in order]
+    return {key: gathered[key] for key in ordered}
+
+
+@traceable()
+def Generate_overview_data(db_name, student_id=None, class_id=None, test_num=None, metrics=None):
+    # Fetch base metrics using PostgreSQL, unless a batch build already computed them
+    if metrics is not None:
+        op, tt, ir, cv = metrics
+    elif student_id and class_id:
         op, tt, ir, cv = calculate_metrics_pg(student_id, class_id)
     else:
         # Fallback to default values if student/class not provided
@@ -77,39 +243,36 @@ def Generate_overview_data(db_name, student_id=None, class_id=None, test_num=Non
         PT = {"subjects": []}
         SA = []
 
-    # Define prompts
-    
+    # Generate insights, action plan, checklist and study tips concurrently
+    insight_futures = submit_insight_tasks({
+        "KS": (KS_data, prompts["KS"]),
+        "AI": (AI_data, prompts["AI"]),
+        "QR": (QR_data, prompts["QR"]),
+        "CV": (CV_data, prompts["CV"]),
+    }, combined=getattr(settings, 'OVERVIEW_COMBINED_INSIGHTS', False))
 
-    # Generate insights
-    insights = {
-        "KS": extract_insights(KS_data, prompts["KS"]),
-        "AI": extract_insights(AI_data, prompts["AI"]),
-        "QR": extract_insights(QR_data, prompts["QR"]),
-        "CV": extract_insights(CV_data, prompts["CV"]),
-    }
-
-    # Generate Action Plan if student/class/test info provided
-    action_plan = []
-    checklist = []
-    study_tips = []
+    # Generate Action Plan, Checklist and Study Tips if student/class/test info provided
+    plan_futures = {}
     if student_id and class_id and test_num:
+        plan_futures = {
+            "action plan": _insight_executor.submit(_run_insight_task, generate_action_plan, student_id, class_id, test_num),
+            "checklist": _insight_executor.submit(_run_insight_task, generate_checklist, student_id, class_id, test_num),
+            "study tips": _insight_executor.submit(_run_insight_task, generate_study_tips, student_id, class_id, test_num),
+        }
+
+    # Assemble in a fixed order regardless of which call finished first
+    insights = collect_insights(insight_futures)
+
+    plans = {}
+    for label, future in plan_futures.items():
         try:
-            action_plan = generate_action_plan(student_id, class_id, test_num)
-        except Exception as e:
-            logger.error(f"Error generating action plan: {e}", exc_info=True)
-            action_plan = []
-        
-        try:
-            checklist = generate_checklist(student_id, class_id, test_num)
-        except Exception as e:
-            logger.error(f"Error generating checklist: {e}", exc_info=True)
-            checklist = []
-        
-        try:
-            study_tips = generate_study_tips(student_id, class_id, test_num)
+            plans[label] = future.result()
         except Exception as e:
-            logger.error(f"Error generating study tips: {e}", exc_info=True)
-            study_tips = []
+            logger.error(f"Error generating {label}: {e}", exc_info=True)
+            plans[label] = []
+    action_plan = plans.get("action plan", [])
+    checklist = plans.get("checklist", [])
+    study_tips = plans.get("study tips", [])
 
     return metrics, insights, PT, SA, action_plan, checklist, study_tips
 
@@ -227,7 +390,7 @@ Insights:
 
             if not cleaned or not isinstance(cleaned, list) or len(cleaned) < 1:
                 logger.warning(f"⚠️ Gemini response invalid for {label}, retrying...")
-                result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True, cache=False)
                 if isinstance(result, dict) and result.get("ok"):
                     retry_response = result.get("response", "") or ""
                 else:
@@ -300,7 +463,7 @@ def generate_action_plan(student_id, class_id, test_num):
         # Call Gemini with retry (structured)
         for attempt in range(3):
             try:
-                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True, cache=False if attempt else None)
 
                 if isinstance(result, dict):
                     if result.get("ok"):
@@ -448,7 +611,7 @@ def generate_checklist(student_id, class_id, test_num):
         # Call Gemini with retry (structured)
         for attempt in range(3):
             try:
-                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True, cache=False if attempt else None)
 
                 if isinstance(result, dict):
                     if result.get("ok"):
@@ -599,7 +762,7 @@ def generate_study_tips(student_id, class_id, test_num):
         # Call Gemini with retry (structured)
         for attempt in range(3):
             try:
-                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True, cache=False if attempt else None)
 
                 if isinstance(result, dict):
                     if result.get("ok"):
@@ -47,8 +47,8 @@ def generate_perfomance_data(student_id, class_id):
         try:
             subject_prompt = base_prompt + "\n\n" + json.dumps(data, indent=2)
 
-            for _ in range(10):  # Retry max 10 times
-                result = call_gemini_api_with_rotation(subject_prompt, return_structured=True)
+            for attempt in range(10):  # Retry max 10 times
+                result = call_gemini_api_with_rotation(subject_prompt, return_structured=True, cache=False if attempt else None)
 
                 # Normalize result to plain text
                 if isinstance(result, dict):
@@ -16,6 +16,8 @@ from exam.graph_utils.knowledge_graph_manager import KnowledgeGraphManager
 import logging
 import sentry_sdk
 from exam.llm_call.decorators import traceable
+from exam.llm_call.response_cache import record_calls_saved
+from django.conf import settings
 
 
 logger = logging.getLogger(__name__)
@@ -76,7 +78,7 @@ output format (JSON):
 - Each Insights word count should be strictly between 8 to 12.
 """ + str(data)
     for attempt in range(1, max_retries + 1):
-        result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True)
+        result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True, cache=False if attempt > 1 else None)
 
         # Normalize to response text for backward compatibility
         if isinstance(result, dict):
@@ -106,7 +108,137 @@ output format (JSON):
             #print(f"Attempt {attempt} failed: {e}")
 
 
+def _is_empty_metric(metric_data):
+    """True when a metric has no subjects or every subject's data is empty (list or DataFrame)."""
+    def is_empty_value(v):
+        if isinstance(v, pd.DataFrame):
+            return v.empty
+        elif isinstance(v, list):
+            return len(v) == 0
+        else:
+            return not v
+
+    return not metric_data or all(is_empty_value(v) for v in metric_data.values())
+
+
+def _valid_metric_insights(insights, subjects):
+    """A metric section is valid when every subject maps to a non-empty list of non-blank strings."""
+    if not isinstance(insights, dict):
+        return False
+    for subject in subjects:
+        lines = insights.get(subject)
+        if not (isinstance(lines, list) and lines and all(isinstance(line, str) and line.strip() for line in lines)):
+            return False
+    return True
+
+
+@traceable()
+def extract_metric_insights_combined(metric_inputs):
+    """
+    Asks for every SWOT metric of a student-test in one Gemini request.
+
+    Args:
+        metric_inputs (dict): {metric_key: (metric_data, prompt)}, non-empty metrics only
+
+    Returns:
+        dict: {metric_key: {subject: [insights]}} for the metrics that validated
+    """
+    tasks = []
+    format_lines = []
+    for metric_key, (metric_data, prompt) in metric_inputs.items():
+        subjects = list(metric_data.keys())
+        subject_format = ", ".join(f'"{subject}": [<insight 1>, <insight 2>]' for subject in subjects)
+        format_lines.append(f'"{metric_key}": {{{subject_format}}}')
+        tasks.append(f"### Metric \"{metric_key}\"\n{prompt}\nData:\n{metric_data}")
+
+    metrics_format = ",\n    ".join(format_lines)
+    full_prompt = f"""You will analyse {len(metric_inputs)} independent metrics.
+Follow each metric's instructions separately and only use that metric's data.
+
+""" + "\n\n".join(tasks) + f"""
+
+output format (JSON):
+{{
+    {metrics_format}
+}}
+
+- Return only the JSON object, one key per metric.
+- Stick to the output format.
+- Never return NULL.
+- Ensure that every subject listed for a metric is included.
+- Don't mention Insight1 and Insight2, just give it as strings
+- Each Insights word count should be strictly between 8 to 12.
+"""
+
+    result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True)
+
+    if isinstance(result, dict):
+        if result.get("ok"):
+            response = result.get("response", "") or ""
+        else:
+            logger.warning(f"Gemini structured error: code={result.get('code')} reason={result.get('reason')} model={result.get('model')} attempt={result.get('attempt')}")
+            response = ""
+    else:
+        response = result or ""
+
+    parsed = {}
+    start, end = response.find("{"), response.rfind("}") + 1
+    if start != -1 and end > start:
+        try:
+            parsed = json.loads(response[start:end])
+        except (ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Combined SWOT response was not valid JSON: {e}")
+    if not isinstance(parsed, dict):
+        parsed = {}
+
+    return {
+        metric_key: parsed[metric_key]
+        for metric_key, (metric_data, _) in metric_inputs.items()
+        if _valid_metric_insights(parsed.get(metric_key), metric_data.keys())
+    }
+
+
+def generate_metric_insights(metric_inputs):
+    """
+    Generates insights for the non-empty SWOT metrics of one student-test.
 
+    With SWOT_COMBINED_INSIGHTS every metric is requested in one call and only
+    metrics that fail validation are retried with their own extract_insights call.
+
+    Args:
+        metric_inputs (dict): {metric_key: (metric_data, prompt)}
+
+    Returns:
+        tuple: ({metric_key: insights}, {metric_key: exception})
+    """
+    insights_by_metric, errors = {}, {}
+    pending = dict(metric_inputs)
+
+    if getattr(settings, 'SWOT_COMBINED_INSIGHTS', False) and len(pending) > 1:
+        try:
+            insights_by_metric.update(extract_metric_insights_combined(pending))
+        except Exception as e:
+            logger.exception(f"Combined SWOT request failed, falling back per metric: {e}")
+        pending = {key: value for key, value in pending.items() if key not in insights_by_metric}
+        saved = len(metric_inputs) - 1 - len(pending)
+        logger.info(
+            f"📦 Combined SWOT request: {len(insights_by_metric)}/{len(metric_inputs)} metrics, "
+            f"{len(pending)} per-metric fallback(s), {saved} call(s) saved"
+        )
+        record_calls_saved(f"{__name__}.extract_metric_insights_combined", saved)
+
+    with ThreadPoolExecutor() as executor:
+        future_to_metric = {
+            executor.submit(extract_insights, metric_data, prompt): metric_key
+            for metric_key, (metric_data, prompt) in pending.items()
+        }
+        for future in as_completed(future_to_metric):
+            metric_key = future_to_metric[future]
+            try:
+                insights_by_metric[metric_key] = future.result()
+            except Exception as e:
+                errors[metric_key] = e
+    return insights_by_metric, errors
 
 
 # --------------------- Main Execution ---------------------
@@ -144,36 +276,22 @@ def generate_all_test_swot_with_AI(student_id, class_id):
         }
         
         insights_by_metric = {}
-        with ThreadPoolExecutor() as executor:
-            future_to_metric = {}
-            for metric_key, metric_data in all_metric_results.items():
-                # Check if metric_data is empty or all subjects have empty data
-                # Handle both list and DataFrame values
-                def is_empty_value(v):
-                    if isinstance(v, pd.DataFrame):
-                        return v.empty
-                    elif isinstance(v, list):
-                        return len(v) == 0
-                    else:
-                        return not v
-                
-                if not metric_data or all(is_empty_value(v) for v in metric_data.values()):
-                    # Use fallback message for empty data
-                    logger.info(f"📭 No qualifying topics for {metric_key} - using fallback message")
-                    insights_by_metric[metric_key] = {}
-                    for subject in metric_data.keys() if metric_data else []:
-                        insights_by_metric[metric_key][subject] = get_fallback_message(metric_key)
-                else:
-                    # Submit LLM task for non-empty data
-                    future_to_metric[executor.submit(extract_insights, metric_data, prompts[metric_key])] = metric_key
-            
-            for future in as_completed(future_to_metric):
-                metric_key = future_to_metric[future]
-                try:
-                    # Now each metric returns a dictionary of insights for all subjects
-                    insights_by_metric[metric_key] = future.result()
-                except Exception as e:
-                    insights_by_metric[metric_key] = f"Error: {e}"
+        metric_inputs = {}
+        for metric_key, metric_data in all_metric_results.items():
+            if _is_empty_metric(metric_data):
+                # Use fallback message for empty data
+                logger.info(f"📭 No qualifying topics for {metric_key} - using fallback message")
+                insights_by_metric[metric_key] = {}
+                for subject in metric_data.keys() if metric_data else []:
+                    insights_by_metric[metric_key][subject] = get_fallback_message(metric_key)
+            else:
+                metric_inputs[metric_key] = (metric_data, prompts[metric_key])
+
+        # Each metric returns a dictionary of insights for all subjects
+        generated, errors = generate_metric_insights(metric_inputs)
+        insights_by_metric.update(generated)
+        for metric_key, e in errors.items():
+            insights_by_metric[metric_key] = f"Error: {e}"
         return insights_by_metric
         
     except Exception as e:
@@ -230,38 +348,23 @@ def generate_swot_data_with_AI(student_id, class_id, test_num):
         }
         
         insights_by_metric = {}
-        with ThreadPoolExecutor() as executor:
-            future_to_metric = {}
-            for metric_key, (analysis_key, prompt) in metric_prompt_mapping.items():
-                metric_data = results[analysis_key]
-                # Check if metric_data is empty or all subjects have empty data
-                # Handle both list and DataFrame values
-                def is_empty_value(v):
-                    if isinstance(v, pd.DataFrame):
-                        return v.empty
-                    elif isinstance(v, list):
-                        return len(v) == 0
-                    else:
-                        return not v
-                
-                if not metric_data or all(is_empty_value(v) for v in metric_data.values()):
-                    # Use fallback message for empty data
-                    logger.info(f"📭 No qualifying topics for {metric_key} (test {test_num}) - using fallback message")
-                    insights_by_metric[metric_key] = {}
-                    for subject in metric_data.keys() if metric_data else []:
-                        insights_by_metric[metric_key][subject] = get_fallback_message(metric_key)
-                else:
-                    # Submit LLM task for non-empty data
-                    future_to_metric[executor.submit(extract_insights, metric_data, prompt)] = metric_key
-            
-            for future in as_completed(future_to_metric):
-                metric_key = future_to_metric[future]
-                try:
-                    insights_by_metric[metric_key] = future.result()
-                except Exception as e:
-                    logger.exception(f"Error for swot data: {e}")
-                    #print(f"Error for swot data: {e}")
-        
+        metric_inputs = {}
+        for metric_key, (analysis_key, prompt) in metric_prompt_mapping.items():
+            metric_data = results[analysis_key]
+            if _is_empty_metric(metric_data):
+                # Use fallback message for empty data
+                logger.info(f"📭 No qualifying topics for {metric_key} (test {test_num}) - using fallback message")
+                insights_by_metric[metric_key] = {}
+                for subject in metric_data.keys() if metric_data else []:
+                    insights_by_metric[metric_key][subject] = get_fallback_message(metric_key)
+            else:
+                metric_inputs[metric_key] = (metric_data, prompt)
+
+        generated, errors = generate_metric_insights(metric_inputs)
+        insights_by_metric.update(generated)
+        for metric_key, e in errors.items():
+            logger.error(f"Error for swot data {metric_key}: {e}")
+
         # For example, print the insight for subject 'Botany' from the SW_LRT metric
         return insights_by_metric
         
@@ -419,7 +522,7 @@ Insights:
                 response = result or ""
 
             while not response:
-                result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True, cache=False)
                 if isinstance(result, dict):
                     if result.get("ok"):
                         response = result.get("response", "") or ""
@@ -431,7 +534,7 @@ Insights:
 
             cleaned = clean_gemini_json_block(response)
             if not cleaned or not isinstance(cleaned, list):
-                result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True, cache=False)
                 if isinstance(result, dict) and result.get("ok"):
                     retry_response = result.get("response", "") or ""
                 else:
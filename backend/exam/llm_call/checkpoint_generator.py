@@ -173,7 +173,7 @@ def generate_checkpoints_testwise(student_id, class_id, test_num, weak_topics_da
         # Call Gemini with retry (structured)
         for attempt in range(3):
             try:
-                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True, cache=False if attempt else None)
 
                 if isinstance(result, dict):
                     if result.get("ok"):
@@ -529,7 +529,7 @@ def generate_cumulative_checkpoints(student_id, class_id, topics_data):
         # Call Gemini with retry (structured)
         for attempt in range(3):
             try:
-                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True)
+                result = call_gemini_api_with_rotation(full_prompt, "gemini-2.5-flash", return_structured=True, cache=False if attempt else None)
 
                 if isinstance(result, dict):
                     if result.get("ok"):
@@ -2,10 +2,14 @@ import google.generativeai as genai
 import time
 import os
 import base64
+import threading
+import weakref
 from requests.exceptions import RequestException
 import logging
 from exam.llm_call.decorators import trace_api_call
-from exam.llm_call.decorators import get_trace_context
+from exam.llm_call.decorators import get_trace_context, set_trace_context, clear_trace_context
+from exam.llm_call import response_cache
+import sys
 
 # Modern LangSmith tracing via @traceable decorator.
 # LangSmith tracing is auto-enabled when LANGCHAIN_TRACING_V2=true is set.
@@ -52,10 +56,36 @@ if not API_KEYS:
 current_key_index = 0  # Tracks which API key is being used
 
 
+# Page images are sent with every extraction chunk call; each is base64-encoded once.
+# Entries go away with the BytesIO they belong to.
+_encoded_images = weakref.WeakKeyDictionary()
+_encoded_images_lock = threading.Lock()
+
+
+def image_mime_type(data: bytes) -> str:
+    """MIME type of PNG/JPEG/WebP image bytes (PNG when unrecognised)."""
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def encode_image_part(image_io):
+    """Returns the {"data", "mime_type"} request part of an image, encoding it once."""
+    with _encoded_images_lock:
+        part = _encoded_images.get(image_io)
+    if part is None:
+        data = image_io.getvalue()
+        part = {"data": base64.b64encode(data).decode('utf-8'), "mime_type": image_mime_type(data)}
+        with _encoded_images_lock:
+            _encoded_images[image_io] = part
+    return part
+
+
 def encode_image(image_io):
     """Encode an image for API processing"""
-    image_io.seek(0)
-    return base64.b64encode(image_io.read()).decode('utf-8')
+    return encode_image_part(image_io)["data"]
 
 def get_next_key():
     """Returns the next API key in a round-robin manner."""
@@ -81,7 +111,7 @@ def call_gemini_api(prompt: str,
     if not images:
         response = model.generate_content(prompt)
     elif images:
-        encoded_images = [{"data": encode_image(img), "mime_type": "image/png"} for img in images]
+        encoded_images = [encode_image_part(img) for img in images]
         response = model.generate_content([*encoded_images, prompt])
     if hasattr(response, 'text'):
         return response.text.strip(), getattr(response, 'usage_metadata', None)
@@ -96,12 +126,12 @@ except ImportError:
     import threading
     _llm_semaphore = threading.Semaphore(6)  # Fallback if not yet defined
 
-@trace_api_call(user_id="user1", user_type="student")
 def call_gemini_api_with_rotation(prompt: str,
                     model_name: str = "gemini-2.5-flash", 
                     images = None,
                     fallback_models: list = None,
-                    return_structured: bool = False) -> object:
+                    return_structured: bool = False,
+                    cache: bool = None) -> object:
     """
     Attempts up to RETRIES * len(API_KEYS) calls with API key rotation and model fallback.
     
@@ -113,10 +143,58 @@ def call_gemini_api_with_rotation(prompt: str,
         model_name: Primary model to use (default: gemini-2.5-flash)
         images: Optional images to include in the request
         fallback_models: List of fallback models to try if primary fails (default: DEFAULT_FALLBACK_MODELS)
+        cache: Force (True) or skip (False) the cache lookup; None follows LLM_CACHE_* settings.
+            Pass False when re-asking after rejecting a response: the fresh response
+            still replaces the cached one if the site is cached.
     
     Returns:
         Model response text, or empty string if all attempts fail
     """
+    # Label the call site once so the trace log and the response cache agree on it
+    site = get_trace_context()
+    labelled = site is None
+    if labelled:
+        caller = sys._getframe(1)
+        site = f"{caller.f_globals.get('__name__')}.{caller.f_code.co_name}"
+
+    # cache=False skips the lookup but still refreshes the entry of a cached site
+    use_cache = response_cache.site_enabled(site, cache)
+    key = None
+    if use_cache or (cache is False and response_cache.site_enabled(site)):
+        key = response_cache.cache_key(model_name, prompt, images)
+    if use_cache:
+        cached = response_cache.get_cached_response(key, site)
+        if cached is not None:
+            if return_structured:
+                return {
+                    "ok": True,
+                    "code": "CACHE_HIT",
+                    "reason": "",
+                    "model": model_name,
+                    "attempt": 0,
+                    "response": cached,
+                    "usage": None,
+                }
+            return cached
+
+    if labelled:
+        set_trace_context(site)
+    try:
+        result = _call_gemini_api_traced(prompt, model_name, images, fallback_models, return_structured)
+    finally:
+        if labelled:
+            clear_trace_context()
+
+    if key is not None:
+        if isinstance(result, dict):
+            response_cache.store_response(key, model_name, site, result.get("response") if result.get("ok") else None)
+        else:
+            response_cache.store_response(key, model_name, site, result)
+    return result
+
+@trace_api_call(user_id="user1", user_type="student")
+def _call_gemini_api_traced(prompt: str, model_name: str, images, fallback_models: list, return_structured: bool) -> object:
+    """Traced Gemini call (one api_call_log row); cache hits never reach it"""
     # Acquire semaphore to limit global LLM concurrency
     with _llm_semaphore:
         return _call_gemini_api_with_rotation_impl(prompt, model_name, images, fallback_models, return_structured)
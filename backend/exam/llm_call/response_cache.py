@@ -0,0 +1,166 @@
+"""
+Opt-in content-addressed cache for Gemini responses.
+
+Reprocessing a test (answer-key fix, failed dashboard step, reupload) sends the
+same prompts again. With LLM_CACHE_ENABLED, call_gemini_api_with_rotation looks
+responses up by sha256(model, prompt, image digests) in the api_response_cache
+table before calling Gemini.
+
+- Entries expire after LLM_CACHE_TTL seconds.
+- The table is kept to LLM_CACHE_MAX_ENTRIES rows, evicting the least recently used.
+- LLM_CACHE_SITES limits caching to call sites (trace labels, prefix match; '*' = all).
+- Hits and misses per call site and day go to api_cache_day_stats, next to api_call_log.
+  Its calls_saved counter records calls avoided by combined requests (record_calls_saved).
+
+Call sites that re-ask after rejecting a response pass cache=False, so the
+request bypasses the lookup and the fresh response replaces the cached one.
+"""
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from exam.models.gemini_api import Gemini_ResponseCache, Gemini_CacheDayStats
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 200  # stores between TTL/LRU sweeps, per process
+
+_store_lock = threading.Lock()
+_stores_since_prune = 0
+
+
+def site_enabled(site, override=None):
+    """
+    Whether responses of a call site are cached.
+
+    Args:
+        site (str): Trace label of the caller
+        override (bool, optional): Per-call force (True) or skip (False)
+    """
+    if override is not None:
+        return override
+    if not getattr(settings, 'LLM_CACHE_ENABLED', False):
+        return False
+    sites = getattr(settings, 'LLM_CACHE_SITES', ['*'])
+    return any(s == '*' or (site or '').startswith(s) for s in sites)
+
+
+def cache_key(model_name, prompt, images=None):
+    """sha256 over the model, the prompt and a digest of every image."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(prompt.encode('utf-8'))
+    for image in images or []:
+        image.seek(0)
+        digest.update(b'\0')
+        digest.update(hashlib.sha256(image.read()).digest())
+        image.seek(0)
+    return digest.hexdigest()
+
+
+def _record(site, hit):
+    """Increments today's hit or miss counter of a call site."""
+    try:
+        stats, _ = Gemini_CacheDayStats.objects.get_or_create(
+            function_name=(site or 'unknown')[:128], timestamp_day=timezone.now().date()
+        )
+        field = 'hits' if hit else 'misses'
+        Gemini_CacheDayStats.objects.filter(pk=stats.pk).update(**{field: F(field) + 1})
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to record LLM cache {'hit' if hit else 'miss'} for {site}: {e}")
+
+
+def record_calls_saved(site, count):
+    """
+    Adds to today's calls_saved counter of a call site.
+
+    Args:
+        count (int): Net LLM calls avoided by combining requests (negative when the
+            combined call had to be repeated per item)
+    """
+    try:
+        stats, _ = Gemini_CacheDayStats.objects.get_or_create(
+            function_name=(site or 'unknown')[:128], timestamp_day=timezone.now().date()
+        )
+        Gemini_CacheDayStats.objects.filter(pk=stats.pk).update(calls_saved=F('calls_saved') + count)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to record {count} saved LLM calls for {site}: {e}")
+
+
+def get_cached_response(key, site):
+    """
+    Returns the cached response text for a key, or None on a miss.
+    """
+    ttl = getattr(settings, 'LLM_CACHE_TTL', 7 * 24 * 60 * 60)
+    try:
+        entry = Gemini_ResponseCache.objects.filter(
+            key=key, created_at__gte=timezone.now() - timedelta(seconds=ttl)
+        ).only('pk', 'response').first()
+    except Exception as e:
+        logger.warning(f"⚠️ LLM cache lookup failed: {e}")
+        return None
+
+    if entry is None:
+        _record(site, hit=False)
+        return None
+
+    Gemini_ResponseCache.objects.filter(pk=entry.pk).update(last_used_at=timezone.now(), hits=F('hits') + 1)
+    _record(site, hit=True)
+    logger.info(f"♻️ LLM cache hit for {site}")
+    return entry.response
+
+
+def store_response(key, model_name, site, response):
+    """Caches a successful, non-empty response (replacing any previous entry)."""
+    global _stores_since_prune
+    if not response:
+        return
+    try:
+        now = timezone.now()
+        Gemini_ResponseCache.objects.update_or_create(
+            key=key,
+            defaults={
+                'model_name': model_name, 'function_name': (site or '')[:128],
+                'response': response, 'created_at': now, 'last_used_at': now,
+            },
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ LLM cache store failed: {e}")
+        return
+
+    with _store_lock:
+        _stores_since_prune += 1
+        due = _stores_since_prune >= PRUNE_EVERY
+        if due:
+            _stores_since_prune = 0
+    if due:
+        prune_response_cache()
+
+
+def prune_response_cache(ttl=None, max_entries=None):
+    """
+    Deletes expired entries, then the least recently used ones beyond max_entries.
+
+    Returns:
+        int: Number of entries deleted
+    """
+    ttl = ttl if ttl is not None else getattr(settings, 'LLM_CACHE_TTL', 7 * 24 * 60 * 60)
+    max_entries = max_entries if max_entries is not None else getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 50000)
+
+    deleted, _ = Gemini_ResponseCache.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=ttl)
+    ).delete()
+
+    cutoff = Gemini_ResponseCache.objects.order_by('-last_used_at').values_list('last_used_at', flat=True)[max_entries:max_entries + 1]
+    cutoff = list(cutoff)
+    if cutoff:
+        evicted, _ = Gemini_ResponseCache.objects.filter(last_used_at__lte=cutoff[0]).delete()
+        deleted += evicted
+
+    if deleted:
+        logger.info(f"🧹 Pruned {deleted} LLM cache entries")
+    return deleted
@@ -0,0 +1,130 @@
+"""
+Django management command to copy per-student Neo4j databases into the shared graph.
+
+Each student's Test/Subject/CHAPTER/Topic/Subtopic/Question hierarchy (with its
+Misconception and Feedback links) is re-written into NEO4J_SHARED_DATABASE with
+student_id / class_id tenant properties. Writes use MERGE, so re-running is safe.
+
+Usage:
+    python manage.py migrate_graph_to_shared
+    python manage.py migrate_graph_to_shared --class-id A2
+    python manage.py migrate_graph_to_shared --class-id A2 --drop-source
+    python manage.py migrate_graph_to_shared --dry-run
+"""
+
+from collections import OrderedDict
+from django.core.management.base import BaseCommand
+from exam.models.student import Student
+from exam.graph_utils.knowledge_graph_manager import KnowledgeGraphManager
+from exam.graph_utils.graph_tenancy import shared_database_name, is_shared_graph
+from exam.graph_utils.create_graph import write_test_graph
+
+READ_STUDENT_GRAPH_QUERY = """
+MATCH (test:Test)-[:CONTAINS]->(subject:Subject)-[:CONTAINS]->(chapter:CHAPTER)
+      -[:CONTAINS]->(topic:Topic)-[:CONTAINS]->(subtopic:Subtopic)-[:CONTAINS]->(question:Question)
+WHERE question.number IS NOT NULL
+OPTIONAL MATCH (question)-[:HAS_MISCONCEPTION]->(m:Misconception)
+OPTIONAL MATCH (question)-[:HAS_FEEDBACK]->(f:Feedback)
+RETURN test.name AS test_name, test.date AS test_date,
+       subject.name AS subject, chapter.name AS chapter, topic.name AS topic, subtopic.name AS subtopic,
+       question {.*} AS question,
+       [x IN collect(DISTINCT m {.type, .description}) WHERE x IS NOT NULL] AS misconceptions,
+       collect(DISTINCT f.text) AS feedbacks
+ORDER BY test_name, question.number
+"""
+
+
+def _rows_by_test(records):
+    """Groups exported records into {(test_name, test_date): [writer rows]}."""
+    tests = OrderedDict()
+    for record in records:
+        question = record["question"]
+        tests.setdefault((record["test_name"], record["test_date"]), []).append({
+            "subject": record["subject"],
+            "chapter": record["chapter"],
+            "topic": record["topic"],
+            "subtopic": record["subtopic"],
+            "text": question.get("text", "No Text Provided"),
+            "correct_answer": question.get("correctAnswer", "No Correct Answer"),
+            "opted_answer": question.get("optedAnswer"),
+            "is_correct": bool(question.get("isCorrect", False)),
+            "question_type": question.get("type", "Unknown Type"),
+            "number": question["number"],
+            "im_desp": question.get("imdesp", ""),
+            "misconceptions": [
+                {"type": m.get("type") or "NA", "description": m.get("description") or "NA"}
+                for m in record["misconceptions"]
+            ],
+            "feedbacks": [text for text in record["feedbacks"] if text is not None],
+        })
+    return tests
+
+
+class Command(BaseCommand):
+    help = 'Copy per-student Neo4j databases into the shared multi-tenant knowledge graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', help='Only migrate students of this class')
+        parser.add_argument('--student-id', help='Only migrate this student (combine with --class-id)')
+        parser.add_argument(
+            '--drop-source',
+            action='store_true',
+            help='Drop each per-student database after it has been copied',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Read and count source graphs without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        target = shared_database_name()
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Migrating per-student graphs into `{target}`'))
+        if not is_shared_graph():
+            self.stdout.write(self.style.WARNING(
+                '⚠️  NEO4J_GRAPH_MODE is not "shared"; new writes will keep going to per-student databases'
+            ))
+
+        students = Student.objects.all().order_by('class_id', 'student_id')
+        if options['class_id']:
+            students = students.filter(class_id=options['class_id'])
+        if options['student_id']:
+            students = students.filter(student_id=options['student_id'])
+
+        shared = None if options['dry_run'] else KnowledgeGraphManager(database_name=target, create_if_missing=True)
+        migrated = skipped = failed = 0
+
+        for student in students.iterator():
+            source_name = str(student.neo4j_db).lower()
+            source = KnowledgeGraphManager(database_name=source_name)
+            if not source.check_db():
+                skipped += 1
+                continue
+
+            try:
+                with source.get_session() as session:
+                    records = list(session.run(READ_STUDENT_GRAPH_QUERY))
+                tests = _rows_by_test(records)
+                tenant = {"student_id": student.student_id, "class_id": student.class_id}
+
+                if not options['dry_run']:
+                    for (test_name, test_date), rows in tests.items():
+                        write_test_graph(shared, test_name, test_date, rows, tenant)
+                    if options['drop_source']:
+                        source.delete_db()
+
+                migrated += 1
+                self.stdout.write(
+                    f'  {student.class_id}/{student.student_id}: {len(tests)} tests, {len(records)} questions'
+                )
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'  ❌ {student.class_id}/{student.student_id} ({source_name}): {e}'))
+            finally:
+                source.close()
+
+        self.stdout.write('')
+        summary = f'Migrated {migrated} students, skipped {skipped} without a database, {failed} failed'
+        if options['dry_run']:
+            summary += ' (dry run, nothing written)'
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(summary))
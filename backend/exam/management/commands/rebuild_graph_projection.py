@@ -0,0 +1,63 @@
+"""
+Django management command to rebuild the Neo4j knowledge graph from PostgreSQL.
+
+The graph is a projection of StudentResult + QuestionAnalysis + StudentResponse,
+so it can be rebuilt at any time (after a Neo4j outage, a graph-mode switch, or
+with GRAPH_PROJECTION_ON_INGEST disabled during exam weeks).
+
+Usage:
+    python manage.py rebuild_graph_projection --class-id A2
+    python manage.py rebuild_graph_projection --class-id A2 --test-num 7
+    python manage.py rebuild_graph_projection --class-id A2 --async  # queue on Celery
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from exam.services.graph_projection import project_test, project_class_graph, project_test_graph
+from exam.models.result import StudentResult
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Neo4j knowledge graph of a class (or one test) from PostgreSQL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', required=True, help='Class to project')
+        parser.add_argument('--test-num', type=int, help='Only project this test')
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='run_async',
+            help='Queue the projection as a Celery task instead of running it here',
+        )
+
+    def handle(self, *args, **options):
+        class_id = options['class_id']
+        test_num = options['test_num']
+
+        if options['run_async']:
+            if test_num is not None:
+                task = project_test_graph.delay(class_id, test_num)
+            else:
+                task = project_class_graph.delay(class_id)
+            self.stdout.write(self.style.SUCCESS(f'✅ Queued graph projection task {task.id}'))
+            return
+
+        if test_num is not None:
+            test_nums = [test_num]
+        else:
+            test_nums = sorted(set(
+                StudentResult.objects.filter(class_id=class_id).values_list('test_num', flat=True).distinct()
+            ))
+        if not test_nums:
+            raise CommandError(f'No StudentResult rows found for class {class_id}')
+
+        failed = 0
+        for num in test_nums:
+            summary = project_test(class_id, num)
+            failed += len(summary['failed'])
+            self.stdout.write(
+                f"  Test {num}: {summary['students']} students, {summary['questions']} questions"
+                + (f", failed: {', '.join(summary['failed'])}" if summary['failed'] else '')
+            )
+
+        message = f'Projected {len(test_nums)} test(s) for class {class_id}'
+        self.stdout.write(self.style.SUCCESS(message) if not failed else self.style.WARNING(f'{message} ({failed} failures)'))
@@ -0,0 +1,44 @@
+"""
+Django management command to (re)build the StudentTopicStats aggregate table.
+
+New results maintain the table as StudentResult is saved and migration 0027
+backfills earlier tests; run this to repair a class or a test.
+
+Usage:
+    python manage.py rebuild_topic_stats                 # every class
+    python manage.py rebuild_topic_stats --class-id A2
+    python manage.py rebuild_topic_stats --class-id A2 --test-num 7
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from exam.models.result import StudentResult
+from exam.utils.topic_stats import rebuild_topic_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-topic StudentTopicStats aggregates from StudentResult'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', help='Only rebuild this class')
+        parser.add_argument('--test-num', type=int, help='Only rebuild this test (requires --class-id)')
+
+    def handle(self, *args, **options):
+        class_id = options['class_id']
+        test_num = options['test_num']
+        if test_num is not None and not class_id:
+            raise CommandError('--test-num requires --class-id')
+
+        if class_id:
+            class_ids = [class_id]
+        else:
+            class_ids = sorted(set(StudentResult.objects.values_list('class_id', flat=True).distinct()))
+
+        total_rows = 0
+        for cid in class_ids:
+            written = rebuild_topic_stats(cid, test_num)
+            total_rows += sum(written.values())
+            self.stdout.write(f'  {cid}: {len(written)} test(s), {sum(written.values())} rows')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Rebuilt topic stats for {len(class_ids)} class(es): {total_rows} rows'
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-16 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0022_alter_institution_domain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentTopicStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_id', models.CharField(max_length=50)),
+                ('class_id', models.CharField(max_length=255)),
+                ('test_num', models.IntegerField()),
+                ('subject', models.CharField(max_length=50)),
+                ('chapter', models.TextField()),
+                ('topic', models.TextField()),
+                ('question_type', models.TextField(blank=True, default='')),
+                ('total', models.IntegerField(default=0)),
+                ('attempted', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student_id', 'class_id', 'test_num'], name='topicstats_student_test_idx'), models.Index(fields=['class_id', 'test_num'], name='topicstats_class_test_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-16 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0023_studenttopicstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Gemini_ResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model_name', models.CharField(max_length=128)),
+                ('function_name', models.CharField(blank=True, max_length=128)),
+                ('response', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('hits', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'api_response_cache',
+            },
+        ),
+        migrations.CreateModel(
+            name='Gemini_CacheDayStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('function_name', models.CharField(max_length=128)),
+                ('timestamp_day', models.DateField()),
+                ('hits', models.IntegerField(default=0)),
+                ('misses', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'api_cache_day_stats',
+                'ordering': ['-timestamp_day'],
+                'unique_together': {('function_name', 'timestamp_day')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-16 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0024_gemini_response_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionanalysis',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='QuestionPaperFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_id', models.CharField(max_length=50)),
+                ('test_num', models.IntegerField()),
+                ('pdf_hash', models.CharField(db_index=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('class_id', 'test_num')},
+            },
+        ),
+    ]
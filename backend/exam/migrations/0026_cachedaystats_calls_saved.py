@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0025_question_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gemini_cachedaystats',
+            name='calls_saved',
+            field=models.IntegerField(default=0),
+        ),
+    ]
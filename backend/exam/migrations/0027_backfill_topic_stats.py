@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 11:40
+
+from django.db import migrations
+
+
+def backfill_topic_stats(apps, schema_editor):
+    """Aggregates every existing test's StudentResult rows into StudentTopicStats."""
+    from exam.utils.topic_stats import rebuild_test_topic_stats
+
+    StudentResult = apps.get_model('exam', 'StudentResult')
+    StudentTopicStats = apps.get_model('exam', 'StudentTopicStats')
+    QuestionAnalysis = apps.get_model('exam', 'QuestionAnalysis')
+
+    tests = StudentResult.objects.values_list('class_id', 'test_num').distinct()
+    for class_id, test_num in sorted(set(tests)):
+        rebuild_test_topic_stats(
+            class_id, test_num,
+            result_model=StudentResult,
+            stats_model=StudentTopicStats,
+            analysis_model=QuestionAnalysis,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0026_cachedaystats_calls_saved'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_topic_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0027_backfill_topic_stats'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='questionpaperfingerprint',
+            old_name='created_at',
+            new_name='updated_at',
+        ),
+    ]
@@ -8,11 +8,11 @@ from .manager import Manager
 from .teacher import Teacher
 
 
-from .question_paper import QuestionPaper
+from .question_paper import QuestionPaper, QuestionPaperFingerprint
 from .response import StudentResponse
 from .analysis import QuestionAnalysis
 
-from .result import Result, StudentResult
+from .result import Result, StudentResult, StudentTopicStats
 from .checkpoints import Checkpoints
 from .student_report import StudentReport
 
@@ -24,5 +24,5 @@ from .swot import SWOT
 from .feedback import Feedback
 from .notification_log import NotificationLog
 
-from .gemini_api import Gemini_ApiCallLog, Gemini_ApiKeyModelMinuteStats, Gemini_ApiKeyModelDayStats
+from .gemini_api import Gemini_ApiCallLog, Gemini_ApiKeyModelMinuteStats, Gemini_ApiKeyModelDayStats, Gemini_ResponseCache, Gemini_CacheDayStats
 from .institution import Institution
\ No newline at end of file
@@ -28,6 +28,8 @@ class QuestionAnalysis(models.Model):
     option_2_misconception = models.TextField(null=True, blank=True)
     option_3_misconception = models.TextField(null=True, blank=True)
     option_4_misconception = models.TextField(null=True, blank=True)
+    # Normalized question content hash, used to reuse analysis across classes
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
 
     class Meta:
         unique_together = ('class_id', 'test_num', 'question_number')
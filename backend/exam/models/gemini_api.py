@@ -50,3 +50,29 @@ class Gemini_ApiKeyModelDayStats(models.Model):
         unique_together = ("api_key", "model_name", "timestamp_day")
         db_table = "api_key_model_day_stats"
         ordering = ["-timestamp_day"]
+
+class Gemini_ResponseCache(models.Model):
+    """Content-addressed Gemini responses, see exam.llm_call.response_cache."""
+    key = models.CharField(max_length=64, unique=True)  # sha256(model, prompt, image digests)
+    model_name = models.CharField(max_length=128)
+    function_name = models.CharField(max_length=128, blank=True)
+    response = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    hits = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "api_response_cache"
+
+class Gemini_CacheDayStats(models.Model):
+    function_name = models.CharField(max_length=128)
+    timestamp_day = models.DateField()
+    hits = models.IntegerField(default=0)
+    misses = models.IntegerField(default=0)
+    calls_saved = models.IntegerField(default=0)  # net calls avoided by combined (batched) requests
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("function_name", "timestamp_day")
+        db_table = "api_cache_day_stats"
+        ordering = ["-timestamp_day"]
@@ -18,3 +18,17 @@ class QuestionPaper(models.Model):
 
     def __str__(self):
         return f"Q{self.question_number} ({self.subject}) - Test {self.test_num} (Class {self.class_id})"
+
+
+class QuestionPaperFingerprint(models.Model):
+    """Content hash of the question paper PDF a class/test was extracted from."""
+    class_id = models.CharField(max_length=50)
+    test_num = models.IntegerField()
+    pdf_hash = models.CharField(max_length=64, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)  # refreshed on every re-extraction
+
+    class Meta:
+        unique_together = ('class_id', 'test_num')
+
+    def __str__(self):
+        return f"{self.pdf_hash[:12]} - Test {self.test_num} (Class {self.class_id})"
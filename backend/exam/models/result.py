@@ -61,4 +61,30 @@ class StudentResult(models.Model):
             'class_id',
             'test_num',
             'student_id',
-        )
\ No newline at end of file
+        )
+
+class StudentTopicStats(models.Model):
+    """
+    Question counts per student, test, subject/chapter/topic and question type.
+    Derived from StudentResult (see exam.utils.topic_stats) so dashboards can
+    aggregate a handful of rows instead of every question of every test.
+    """
+    student_id = models.CharField(max_length=50)
+    class_id = models.CharField(max_length=255)
+    test_num = models.IntegerField()
+    subject = models.CharField(max_length=50)
+    chapter = models.TextField()
+    topic = models.TextField()
+    question_type = models.TextField(blank=True, default='')
+    total = models.IntegerField(default=0)
+    attempted = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student_id', 'class_id', 'test_num'], name='topicstats_student_test_idx'),
+            models.Index(fields=['class_id', 'test_num'], name='topicstats_class_test_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} | {self.class_id} | Test {self.test_num} | {self.subject} / {self.topic}: {self.correct}/{self.total}"
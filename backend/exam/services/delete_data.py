@@ -1,13 +1,15 @@
 from exam.models import (
     Result, SWOT, Test, TestProcessingStatus,
     Overview, Performance, QuestionPaper, StudentResponse,
-    QuestionAnalysis
+    QuestionAnalysis, QuestionPaperFingerprint
 )
 from django.db import transaction
 from exam.models.student import Student
 from exam.graph_utils.delete_graph import delete_db, delete_test_graph
 from exam.services.update_dashboard import update_student_dashboard
 from exam.models.educator import Educator
+from exam.utils.question_cache import invalidate_question_set
+from exam.utils.topic_stats import delete_topic_stats
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,7 +35,7 @@ def delete_test(class_id, test_num):
         student_dbs = {s.student_id: s.neo4j_db for s in students}
         for student_id in student_ids:
             db_name = str(student_dbs[student_id]).lower()
-            delete_test_graph(db_name, test_num)
+            delete_test_graph(db_name, test_num, student_id=student_id, class_id=class_id)
     except Exception as e:
         logger.error(f"❌ Students not found: {str(e)}")
         #print(f"❌ Students not found: {str(e)}")
@@ -46,9 +48,12 @@ def delete_test(class_id, test_num):
             StudentResponse.objects.filter(class_id=class_id, test_num=test_num).delete()
             SWOT.objects.filter(class_id=class_id, test_num=test_num).delete()
             QuestionPaper.objects.filter(class_id=class_id, test_num=test_num).delete()
+            QuestionPaperFingerprint.objects.filter(class_id=class_id, test_num=test_num).delete()
             Test.objects.filter(class_id=class_id, test_num=test_num).delete()
             TestProcessingStatus.objects.filter(class_id=class_id, test_num=test_num).delete()
             QuestionAnalysis.objects.filter(class_id=class_id, test_num=test_num).delete()
+            invalidate_question_set(class_id, test_num)
+            delete_topic_stats(class_id, test_num)
 
             # These models use only class_id (test_num not used)
             Overview.objects.filter(class_id=class_id).delete()
@@ -81,7 +86,7 @@ def delete_student(class_id):
         student_dbs = {s.student_id: s.neo4j_db for s in students}
         for student_id in student_ids:
             db_name = str(student_dbs[student_id]).lower()
-            delete_db(db_name)
+            delete_db(db_name, student_id=student_id, class_id=class_id)
     except Exception as e:
         logger.error(f"❌ Students not found: {str(e)}")
         #print(f"❌ Students not found: {str(e)}")
@@ -94,9 +99,11 @@ def delete_student(class_id):
             StudentResponse.objects.filter(class_id=class_id).delete()
             SWOT.objects.filter(class_id=class_id).delete()
             QuestionPaper.objects.filter(class_id=class_id).delete()
+            QuestionPaperFingerprint.objects.filter(class_id=class_id).delete()
             Test.objects.filter(class_id=class_id).delete()
             TestProcessingStatus.objects.filter(class_id=class_id).delete()
             QuestionAnalysis.objects.filter(class_id=class_id).delete()
+            delete_topic_stats(class_id)
             Student.objects.filter(class_id=class_id).delete()
 
             # These models use only class_id (test_num not used)
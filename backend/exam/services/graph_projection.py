@@ -0,0 +1,136 @@
+"""
+Celery tasks that project PostgreSQL results into the Neo4j knowledge graph.
+
+The graph is a derived view: every node written here can be rebuilt from
+StudentResult (per-question outcome), QuestionAnalysis (question metadata,
+per-option feedback/misconceptions) and StudentResponse (chosen option).
+Projection runs after student analysis has finished, outside the test
+processing critical path, and can be re-run for one test or a whole class.
+"""
+import itertools
+import logging
+from celery import shared_task
+from exam.models import Student, Test, StudentResult
+from exam.graph_utils.knowledge_graph_manager import KnowledgeGraphManager
+from exam.graph_utils.graph_tenancy import graph_target
+from exam.graph_utils.create_graph import write_test_graph
+from exam.utils.question_cache import get_question_set
+from exam.utils.student_analysis import fetch_test_responses
+
+logger = logging.getLogger(__name__)
+
+# StudentResult rows fetched per database round trip while streaming a test
+PROJECTION_FETCH_SIZE = 5000
+
+
+def _projection_row(result, question, selected):
+    """Builds one graph writer row (see create_graph.write_test_graph) from PG rows."""
+    question_number, is_correct, was_attempted, subject, chapter, topic = result
+    question = question or {}
+    opted_answer = None
+    feedback = error_type = error_desc = "NA"
+    if was_attempted and selected in ('1', '2', '3', '4'):
+        opted_answer = question.get(f"option_{selected}")
+        feedback = question.get(f"option_{selected}_feedback") or "NA"
+        error_type = question.get(f"option_{selected}_type") or "NA"
+        error_desc = question.get(f"option_{selected}_misconception") or "NA"
+
+    return {
+        "subject": subject or "Unknown Subject",
+        "chapter": chapter or "Unknown Chapter",
+        "topic": topic or "Unknown Topic",
+        "subtopic": question.get("subtopic") or "Unknown Subtopic",
+        "text": question.get("question_text") or "No Text Provided",
+        "correct_answer": question.get("correct_answer") or "No Correct Answer",
+        "opted_answer": opted_answer,
+        "is_correct": bool(is_correct),
+        "question_type": question.get("typeOfquestion") or "Unknown Type",
+        "number": question_number,
+        "im_desp": question.get("im_desp") or "",
+        "misconceptions": [{"type": error_type, "description": error_desc}] if opted_answer and not is_correct else [],
+        "feedbacks": [feedback] if opted_answer else [],
+    }
+
+
+def iter_test_projection(class_id, test_num, student_ids=None):
+    """
+    Streams a test's graph rows student by student.
+
+    Loads the question set and responses once per test and walks StudentResult
+    with a server-side cursor, so memory stays bounded by one student's rows.
+
+    Yields:
+        tuple: (student_id, rows)
+    """
+    questions = {q["question_number"]: q for q in get_question_set(class_id, test_num)}
+    responses = fetch_test_responses(class_id, test_num, student_ids)
+
+    results = StudentResult.objects.filter(class_id=class_id, test_num=test_num)
+    if student_ids is not None:
+        results = results.filter(student_id__in=list(student_ids))
+    results = results.order_by("student_id", "question_number").values_list(
+        "student_id", "question_number", "is_correct", "was_attempted", "subject", "chapter", "topic"
+    ).iterator(chunk_size=PROJECTION_FETCH_SIZE)
+
+    for student_id, student_rows in itertools.groupby(results, key=lambda r: r[0]):
+        selected = responses.get(student_id, {})
+        yield student_id, [
+            _projection_row(r[1:], questions.get(r[1]), selected.get(r[1]))
+            for r in student_rows
+        ]
+
+
+def project_test(class_id, test_num, student_ids=None, replace=True):
+    """
+    Writes the graph of one test for every student (or the given students) of a class.
+
+    write_test_graph only MERGEs, so with replace the student's existing subgraph of
+    the test is deleted first, in the same transaction as the write; otherwise stale
+    misconception/feedback edges and old CONTAINS placements would survive.
+
+    Returns:
+        dict: {"students": int, "questions": int, "failed": [student_id, ...]}
+    """
+    test_obj = Test.objects.filter(class_id=class_id, test_num=test_num).first()
+    test_date = test_obj.date if test_obj else "Unknown"
+    test_name = f"Test{test_num}"
+    graph_dbs = dict(Student.objects.filter(class_id=class_id).values_list("student_id", "neo4j_db"))
+
+    summary = {"students": 0, "questions": 0, "failed": []}
+    for student_id, rows in iter_test_projection(class_id, test_num, student_ids):
+        db_name = graph_dbs.get(student_id)
+        if not db_name or not rows:
+            continue
+        try:
+            database, tenant = graph_target(str(db_name).lower(), student_id, class_id)
+            kg_manager = KnowledgeGraphManager(database_name=database, create_if_missing=True)
+            try:
+                write_test_graph(kg_manager, test_name, test_date, rows, tenant, replace=replace)
+            finally:
+                kg_manager.close()
+            summary["students"] += 1
+            summary["questions"] += len(rows)
+        except Exception as e:
+            logger.error(f"❌ Graph projection failed for {student_id}, class {class_id}, test {test_num}: {e}", exc_info=True)
+            summary["failed"].append(student_id)
+
+    logger.info(
+        f"✅ Projected {test_name} of class {class_id}: {summary['students']} students, "
+        f"{summary['questions']} questions, {len(summary['failed'])} failed"
+    )
+    return summary
+
+
+@shared_task
+def project_test_graph(class_id, test_num, student_ids=None):
+    """Rebuilds the knowledge graph of one test from PostgreSQL."""
+    return project_test(class_id, test_num, student_ids)
+
+
+@shared_task
+def project_class_graph(class_id):
+    """Rebuilds the knowledge graph of every test of a class from PostgreSQL."""
+    test_nums = sorted(set(
+        StudentResult.objects.filter(class_id=class_id).values_list("test_num", flat=True).distinct()
+    ))
+    return {test_num: project_test(class_id, test_num) for test_num in test_nums}
@@ -1,9 +1,10 @@
-from exam.utils.csv_processing import get_answer_dict, get_student_response, get_subject_from_answer_key
+from exam.utils.csv_processing import read_answer_key, get_answer_dict, get_student_response, get_subject_from_answer_key
 from exam.utils.pdf_processing import questions_extract, get_subject_from_q_paper, questions_extract_with_metadata
 from exam.ingestions.populate_question import save_questions_bulk 
 from exam.ingestions.populate_response import save_student_response
 from exam.utils.question_analysis import analyse_questions 
 from exam.utils.student_analysis import analyse_students
+from exam.utils.paper_fingerprint import pdf_fingerprint, find_extracted_paper, questions_from_paper, record_paper_fingerprint, reuse_enabled, assign_range_subjects
 from exam.services.update_dashboard import update_student_dashboard, update_educator_dashboard
 from celery import shared_task
 from django.utils.timezone import now
@@ -19,13 +20,14 @@ logger = logging.getLogger(__name__)
 def get_answer_dict_with_retry(path, max_retries=5, delay=0.5):
     """
     Retry wrapper for get_answer_dict to handle S3 eventual consistency issues.
-    Returns answer_dict or raises Exception after retries exhausted.
+    Returns (answer_dict, answer key DataFrame) or raises Exception after retries exhausted.
     """
     for attempt in range(1, max_retries + 1):
-        answer_dict = get_answer_dict(path)
+        answer_key_df = read_answer_key(path)
+        answer_dict = get_answer_dict(path, df=answer_key_df) if answer_key_df is not None else {}
         if answer_dict:
             logger.info(f"✅ Successfully loaded answer key from {path} on attempt {attempt}")
-            return answer_dict
+            return answer_dict, answer_key_df
         logger.warning(f"⚠️ Attempt {attempt}/{max_retries}: Answer key empty or not found at {path}, retrying in {delay}s...")
         if attempt < max_retries:
             time.sleep(delay)
@@ -34,7 +36,7 @@ def get_answer_dict_with_retry(path, max_retries=5, delay=0.5):
     logger.error(error_msg)
     raise Exception(error_msg)
 
-def get_subject(class_id, answer_key_path, question_paper_path):
+def get_subject(class_id, answer_key_path, question_paper_path, answer_key_df=None):
     class_id_lower = class_id.lower()
     if "biology" in class_id_lower:
         return "Biology"
@@ -43,7 +45,7 @@ def get_subject(class_id, answer_key_path, question_paper_path):
     if "zoology" in class_id_lower:
         return "Zoology"
 
-    subject = get_subject_from_answer_key(answer_key_path)
+    subject = get_subject_from_answer_key(answer_key_path, df=answer_key_df)
     if subject:
         return subject
 
@@ -75,13 +77,36 @@ def process_test_data(class_id, test_num):
         metadata = TestMetadata.objects.filter(class_id=class_id, test_num=test_num).first()
         
         # Use retry wrapper for answer_dict to handle S3 timing issues
-        answer_dict = get_answer_dict_with_retry(answer_key_path, max_retries=6, delay=0.5)
+        answer_dict, answer_key_df = get_answer_dict_with_retry(answer_key_path, max_retries=6, delay=0.5)
         logger.info(f"📋 Loaded {len(answer_dict)} answers from answer key")
         
         response_dict = get_student_response(answer_sheet_path, class_id)
         save_student_response(class_id, test_num, response_dict)
 
-        if metadata:
+        # Same question paper already extracted for another class/test: clone its questions
+        pdf_hash = pdf_fingerprint(question_paper_path) if reuse_enabled() else None
+        source_paper = find_extracted_paper(pdf_hash, class_id, test_num)
+
+        if source_paper:
+            source_class, source_test = source_paper
+            logger.info(f"♻️ Question paper matches class {source_class} test {source_test}, skipping OCR and extraction")
+            status_obj.logs += f"\n♻️ Reusing questions extracted for class {source_class}, test {source_test}"
+            status_obj.save()
+
+            questions_list = questions_from_paper(source_class, source_test)
+            if metadata:
+                # Admin metadata decides this test's subjects, not the source test's stamping
+                status_obj.logs += f"\n✅ Using metadata: {metadata.pattern} with {metadata.total_questions} questions"
+                status_obj.save()
+                questions_list = assign_range_subjects(questions_list, metadata.get_subject_ranges())
+            save_questions_bulk(class_id, test_num, questions_list, answer_dict)
+            record_paper_fingerprint(class_id, test_num, pdf_hash)
+
+            # Identical questions reuse their QuestionAnalysis rows inside analyse_questions
+            analyse_questions(class_id, test_num, subject=None)
+            analyse_students(class_id, test_num, subject=None)
+
+        elif metadata:
             # Use admin-provided metadata for subject mapping
             logger.info(f"✅ Using admin-provided metadata for test {test_num}")
             status_obj.logs += f"\n✅ Using metadata: {metadata.pattern} with {metadata.total_questions} questions"
@@ -100,6 +125,7 @@ def process_test_data(class_id, test_num):
             
             if questions_list:
                 save_questions_bulk(class_id, test_num, questions_list, answer_dict)
+                record_paper_fingerprint(class_id, test_num, pdf_hash)
                 
                 # Analyze all subjects at once - analyse_questions will discover subjects from QuestionPaper
                 logger.info(f"🔍 Analyzing all subjects...")
@@ -120,7 +146,7 @@ def process_test_data(class_id, test_num):
             status_obj.logs += "\nℹ️ Using automatic subject detection (fallback)"
             status_obj.save()
             
-            subject = get_subject(class_id, answer_key_path, question_paper_path)
+            subject = get_subject(class_id, answer_key_path, question_paper_path, answer_key_df)
             questions_list = questions_extract(question_paper_path, test_path)
             if not questions_list:
                 logger.warning("⚠️ Automatic extraction failed: no questions returned")
@@ -131,6 +157,7 @@ def process_test_data(class_id, test_num):
             for q in questions_list:
                 q['subject'] = subject
             save_questions_bulk(class_id, test_num, questions_list, answer_dict)
+            record_paper_fingerprint(class_id, test_num, pdf_hash)
             analyse_questions(class_id, test_num, subject)
             analyse_students(class_id, test_num, subject)
 
@@ -5,11 +5,17 @@ from exam.insight.performance_genertor import generate_perfomance_data
 from exam.ingestions.populate_performance import Populate_performance
 from exam.ingestions.populate_swot import save_swot_metric
 from exam.insight.swot_generator import generate_all_test_swot_with_AI, generate_swot_data_with_AI, Generate_SWOT_educator
-from exam.utils.student_analysis import fetch_student_responses
+from exam.utils.student_analysis import fetch_test_attendees
+from exam.graph_utils.question_bank import question_bank_scope
+from exam.graph_utils.calculate_metrics import calculate_class_metrics_pg
 from exam.models.test_status import TestProcessingStatus
 from exam.services.whatsapp_notification import send_whatsapp_notification
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.db import connection
 from django.utils.timezone import now
 from celery import shared_task, chord, group
 from functools import wraps
@@ -135,21 +141,86 @@ def _get_safe_default_for_function(func_name):
     return None
 
 
-def _internal_student_dashboard_update(student_id, class_id, test_num, db_name):
+# ==================== Stage Graph ====================
+
+def _run_stage(name, func):
+    """Runs one stage on a worker thread and releases its DB connection afterwards."""
+    try:
+        return func()
+    finally:
+        # Each worker thread opens its own connection; don't leave it to the GC
+        connection.close()
+
+
+def run_stage_graph(stages, max_workers=None):
+    """
+    Runs stages as a dependency graph: a stage starts as soon as every stage it
+    depends on has finished successfully. Stages that fail are isolated; their
+    dependents are skipped, everything else still runs.
+
+    Args:
+        stages (dict): {name: (callable, tuple of dependency names)}
+        max_workers (int, optional): Thread count; 1 runs the stages one after another
+
+    Returns:
+        tuple: ({name: return value}, {name: exception}) for finished and failed/skipped stages
+    """
+    results, errors = {}, {}
+    pending = dict(stages)
+    running = {}
+    workers = max(1, min(max_workers or len(stages), len(stages) or 1))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for name, (func, deps) in list(pending.items()):
+                failed = [dep for dep in deps if dep in errors or dep not in stages]
+                if failed:
+                    errors[name] = RuntimeError(f"skipped, dependency failed: {', '.join(failed)}")
+                    del pending[name]
+                elif all(dep in results for dep in deps):
+                    running[executor.submit(_run_stage, name, func)] = name
+                    del pending[name]
+
+            if not running:
+                # Only cycles can leave stages pending with nothing running
+                for name in pending:
+                    errors[name] = RuntimeError("skipped, dependency cycle")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Dashboard stage {name} failed: {e}", exc_info=True)
+                    errors[name] = e
+
+    return results, errors
+
+
+def _internal_student_dashboard_update(student_id, class_id, test_num, db_name, metrics=None):
     """
     Internal implementation: Updates dashboard for a single student.
     Pure business logic without error handling (wrapper handles safety).
-    
+
+    The overview, performance, SWOT and report stages each read the analysis
+    tables and write their own dashboard table, so they run concurrently
+    (DASHBOARD_STAGE_WORKERS); LLM calls inside them share the global limiter.
+    A failing stage does not stop the others, but is re-raised once they finish.
+
     Args:
         student_id (str): Student identifier
         class_id (str): Class identifier
         test_num (int): Test number
         db_name (str): Neo4j database name for the student
-    
+        metrics (list, optional): Precomputed (OP, TT, IR, CS) from calculate_class_metrics_pg
+
     Returns:
         dict: Result data with metrics, insights, and status
     """
     status_obj = TestProcessingStatus.objects.filter(class_id=class_id, test_num=test_num).first()
+    status_lock = threading.Lock()
     result = {
         'student_id': student_id,
         'overview': None,
@@ -157,144 +228,158 @@ def _internal_student_dashboard_update(student_id, class_id, test_num, db_name):
         'swot_cumulative': None,
         'swot_test': None
     }
-    
+
+    def log_status(message):
+        # Stages finish on different threads; serialise writes to the shared status row
+        if status_obj:
+            with status_lock:
+                status_obj.logs += message
+                status_obj.save(update_fields=['logs'])
+
     # Generate overview data (PostgreSQL)
     @neo4j_retry(max_attempts=3)
     def fetch_overview():
-        return Generate_overview_data(db_name, student_id, class_id, test_num)
-    
-    metrics, insights, PT, SA, action_plan, checklist, study_tips = fetch_overview()
-    
-    # Validate and ensure dict structure
-    metrics = ensure_dict(metrics, default={})
-    insights = ensure_dict(insights, default={})
-    PT = ensure_dict(PT, default={})
-    SA = ensure_list(SA, default=[])  # SA is a list of test-wise subject score records
-    action_plan = ensure_list(action_plan, default=[])
-    checklist = ensure_list(checklist, default=[])
-    study_tips = ensure_list(study_tips, default=[])
-    logger.info(f"data of SA {SA}")
-    logger.info(f"✅ Overview data generated for {student_id} test {test_num}")
-
-    # Populate overview
-    Populate_Overview(
-        user_id=student_id,
-        class_id=class_id,
-        metrics=metrics,
-        insights=insights,
-        performance_trend=PT,
-        subject_analysis=SA
-    )
-    
-    # Save action plan
-    if action_plan:
-        Save_Overview_Metric(student_id, class_id, "AP", action_plan)
-        logger.info(f"✅ Action plan saved for {student_id} with {len(action_plan)} items")
-    
-    # Save checklist
-    if checklist:
-        Save_Overview_Metric(student_id, class_id, "CL", checklist)
-        logger.info(f"✅ Checklist saved for {student_id} with {len(checklist)} checkpoints")
-    
-    # Save study tips
-    if study_tips:
-        Save_Overview_Metric(student_id, class_id, "ST", study_tips)
-        logger.info(f"✅ Study tips saved for {student_id} with {len(study_tips)} tips")
-    
-    # Generate and save checkpoints (combined checklist + action plan) if feature enabled
-    from django.conf import settings
-    if getattr(settings, 'ENABLE_CHECKPOINTS', False) and test_num:
-        try:
-            from exam.services.checkpoint_task import populate_checkpoints_testwise
-            populate_checkpoints_testwise.delay(student_id, class_id, test_num)
-            logger.info(f"🔍 Triggered checkpoints generation for student {student_id}, test {test_num}")
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to trigger checkpoints generation for {student_id}: {e}")
-    
-    # Generate and save cumulative checkpoints (all tests) if feature enabled
-    # This happens AFTER test-wise checkpoints and analyzes patterns across all tests
-    if getattr(settings, 'ENABLE_CUMULATIVE_CHECKPOINTS', False):
-        try:
-            from exam.services.checkpoint_task import populate_checkpoints_cumulative
-            populate_checkpoints_cumulative.delay(student_id, class_id)
-            logger.info(f"🔍 Triggered cumulative checkpoints generation for student {student_id} (test_num=0)")
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to trigger cumulative checkpoints generation for {student_id}: {e}")
-    
-    result['overview'] = {'metrics': metrics, 'insights': insights, 'PT': PT, 'SA': SA, 'AP': action_plan, 'CL': checklist, 'ST': study_tips}
+        return Generate_overview_data(db_name, student_id, class_id, test_num, metrics=metrics)
+
+    def overview_stage():
+        overview_metrics, insights, PT, SA, action_plan, checklist, study_tips = fetch_overview()
+
+        # Validate and ensure dict structure
+        overview_metrics = ensure_dict(overview_metrics, default={})
+        insights = ensure_dict(insights, default={})
+        PT = ensure_dict(PT, default={})
+        SA = ensure_list(SA, default=[])  # SA is a list of test-wise subject score records
+        action_plan = ensure_list(action_plan, default=[])
+        checklist = ensure_list(checklist, default=[])
+        study_tips = ensure_list(study_tips, default=[])
+        logger.info(f"data of SA {SA}")
+        logger.info(f"✅ Overview data generated for {student_id} test {test_num}")
+
+        # Populate overview
+        Populate_Overview(
+            user_id=student_id,
+            class_id=class_id,
+            metrics=overview_metrics,
+            insights=insights,
+            performance_trend=PT,
+            subject_analysis=SA
+        )
+
+        # Save action plan
+        if action_plan:
+            Save_Overview_Metric(student_id, class_id, "AP", action_plan)
+            logger.info(f"✅ Action plan saved for {student_id} with {len(action_plan)} items")
+
+        # Save checklist
+        if checklist:
+            Save_Overview_Metric(student_id, class_id, "CL", checklist)
+            logger.info(f"✅ Checklist saved for {student_id} with {len(checklist)} checkpoints")
+
+        # Save study tips
+        if study_tips:
+            Save_Overview_Metric(student_id, class_id, "ST", study_tips)
+            logger.info(f"✅ Study tips saved for {student_id} with {len(study_tips)} tips")
+
+        # Generate and save checkpoints (combined checklist + action plan) if feature enabled
+        if getattr(settings, 'ENABLE_CHECKPOINTS', False) and test_num:
+            try:
+                from exam.services.checkpoint_task import populate_checkpoints_testwise
+                populate_checkpoints_testwise.delay(student_id, class_id, test_num)
+                logger.info(f"🔍 Triggered checkpoints generation for student {student_id}, test {test_num}")
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to trigger checkpoints generation for {student_id}: {e}")
+
+        # Generate and save cumulative checkpoints (all tests) if feature enabled
+        # This happens AFTER test-wise checkpoints and analyzes patterns across all tests
+        if getattr(settings, 'ENABLE_CUMULATIVE_CHECKPOINTS', False):
+            try:
+                from exam.services.checkpoint_task import populate_checkpoints_cumulative
+                populate_checkpoints_cumulative.delay(student_id, class_id)
+                logger.info(f"🔍 Triggered cumulative checkpoints generation for student {student_id} (test_num=0)")
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to trigger cumulative checkpoints generation for {student_id}: {e}")
+
+        result['overview'] = {'metrics': overview_metrics, 'insights': insights, 'PT': PT, 'SA': SA, 'AP': action_plan, 'CL': checklist, 'ST': study_tips}
 
     # Generate and populate performance data (PostgreSQL)
     @neo4j_retry(max_attempts=3)
     def fetch_performance():
         return generate_perfomance_data(student_id, class_id)
-    
-    performance_graph, performance_insights = fetch_performance()
-    
-    # Validate structure
-    performance_graph = ensure_dict(performance_graph, default={})
-    performance_insights = ensure_dict(performance_insights, default={})
-    
-    Populate_performance(student_id, class_id, performance_insights, performance_graph)
-    result['performance'] = {'graph': performance_graph, 'insights': performance_insights}
+
+    def performance_stage():
+        performance_graph, performance_insights = fetch_performance()
+
+        # Validate structure
+        performance_graph = ensure_dict(performance_graph, default={})
+        performance_insights = ensure_dict(performance_insights, default={})
+
+        Populate_performance(student_id, class_id, performance_insights, performance_graph)
+        result['performance'] = {'graph': performance_graph, 'insights': performance_insights}
 
     # Generate and save cumulative SWOT (PostgreSQL)
     @neo4j_retry(max_attempts=3)
     def fetch_cumulative_swot():
         return generate_all_test_swot_with_AI(student_id, class_id)
-    
-    overall_swot = fetch_cumulative_swot()
-    overall_swot = ensure_dict(overall_swot, default={})
-    
-    save_swot_metric(student_id, class_id, 0, "swot", overall_swot)
-    result['swot_cumulative'] = overall_swot
-    
-    if status_obj:
-        status_obj.logs += f"✅ Cumulative SWOT saved for {student_id} test {test_num}\n"
-        status_obj.save()
-    logger.info(f"✅ Cumulative SWOT saved for {student_id} test {test_num}")
 
-    # Generate and save test-wise SWOT if test_num provided (PostgreSQL)
-    if test_num:
-        @neo4j_retry(max_attempts=3)
-        def fetch_test_swot():
-            return generate_swot_data_with_AI(student_id, class_id, test_num)
-        
-        test_wise_swot = fetch_test_swot()
-        test_wise_swot = ensure_dict(test_wise_swot, default={})
-        
+    def cumulative_swot_stage():
+        overall_swot = ensure_dict(fetch_cumulative_swot(), default={})
+
+        save_swot_metric(student_id, class_id, 0, "swot", overall_swot)
+        result['swot_cumulative'] = overall_swot
+
+        log_status(f"✅ Cumulative SWOT saved for {student_id} test {test_num}\n")
+        logger.info(f"✅ Cumulative SWOT saved for {student_id} test {test_num}")
+
+    # Generate and save test-wise SWOT (PostgreSQL)
+    @neo4j_retry(max_attempts=3)
+    def fetch_test_swot():
+        return generate_swot_data_with_AI(student_id, class_id, test_num)
+
+    def test_swot_stage():
+        test_wise_swot = ensure_dict(fetch_test_swot(), default={})
+
         save_swot_metric(student_id, class_id, test_num, "swot", test_wise_swot)
         result['swot_test'] = test_wise_swot
-        
-        if status_obj:
-            status_obj.logs += f"✅ Test-wise SWOT saved for {student_id} test {test_num}\n"
-            status_obj.save()
+
+        log_status(f"✅ Test-wise SWOT saved for {student_id} test {test_num}\n")
         logger.info(f"✅ Test-wise SWOT saved for {student_id} test {test_num}")
-    
-    # Generate and save student report data (after all other updates)
-    if test_num:
+
+    # Generate and save student report data (reads results only, never the dashboard tables)
+    def student_report_stage():
         try:
             from exam.services.student_report_service import compute_student_report_data, save_student_report
-            
+
             report_data = compute_student_report_data(student_id, class_id, test_num)
             save_student_report(student_id, class_id, test_num, report_data)
             result['student_report'] = report_data
-            
-            if status_obj:
-                status_obj.logs += f"✅ Student report saved for {student_id} test {test_num}\n"
-                status_obj.save()
+
+            log_status(f"✅ Student report saved for {student_id} test {test_num}\n")
             logger.info(f"✅ Student report saved for {student_id} test {test_num}")
         except Exception as e:
             logger.error(f"⚠️ Failed to save student report for {student_id}: {e}", exc_info=True)
-            if status_obj:
-                status_obj.logs += f"⚠️ Student report error (non-critical): {e}\n"
-                status_obj.save()
-    
+            log_status(f"⚠️ Student report error (non-critical): {e}\n")
+
+    # name -> (stage, stages it depends on); none of the current stages reads another's output
+    stages = {
+        'overview': (overview_stage, ()),
+        'performance': (performance_stage, ()),
+        'swot_cumulative': (cumulative_swot_stage, ()),
+    }
+    if test_num:
+        stages['swot_test'] = (test_swot_stage, ())
+        stages['student_report'] = (student_report_stage, ())
+
+    _, errors = run_stage_graph(stages, getattr(settings, 'DASHBOARD_STAGE_WORKERS', len(stages)))
+    if errors:
+        # Same outcome as before for the wrapper, but only after the other stages are saved
+        raise next(iter(errors.values()))
+
     logger.info(f"✅ Dashboard update completed for student {student_id}")
     return result
 
 
 @shared_task
-def update_single_student_dashboard(student_id, class_id, test_num, db_name):
+def update_single_student_dashboard(student_id, class_id, test_num, db_name, metrics=None):
     """
     Safe wrapper for student dashboard updates. Never raises exceptions.
     
@@ -303,6 +388,7 @@ def update_single_student_dashboard(student_id, class_id, test_num, db_name):
         class_id (str): Class identifier
         test_num (int): Test number
         db_name (str): Neo4j database name for the student
+        metrics (list, optional): Precomputed (OP, TT, IR, CS) from calculate_class_metrics_pg
     
     Returns:
         dict: Result with structure {ok: bool, student: str, data: dict | error: str}
@@ -310,8 +396,9 @@ def update_single_student_dashboard(student_id, class_id, test_num, db_name):
     logger.info(f"🎯 Updating dashboard for student {student_id}, class {class_id}, test {test_num}")
     
     try:
-        # Call internal implementation
-        data = _internal_student_dashboard_update(student_id, class_id, test_num, db_name)
+        # Call internal implementation; all PG fetchers share one question bank
+        with question_bank_scope(student_id, class_id):
+            data = _internal_student_dashboard_update(student_id, class_id, test_num, db_name, metrics=metrics)
         
         return {
             'ok': True,
@@ -362,22 +449,27 @@ def update_student_dashboard(class_id, test_num=None):
         return
 
     # ✅ Build task list for students who attended the test
+    attendees = fetch_test_attendees(class_id, test_num)
+    # OP/TT/IR/CS for the whole class in one query instead of one per student task
+    class_metrics = calculate_class_metrics_pg(class_id, attendees)
     tasks = []
     for student in students:
-        response_map = fetch_student_responses(student.student_id, class_id, test_num)
-
         # ⛔ Skip students with no responses
-        if not response_map:
+        if student.student_id not in attendees:
             if status_obj:
                 status_obj.logs += f"🚫 Student {student.student_id} did not attend test {test_num}. Skipping.\n"
-                status_obj.save()
             logger.info(f"🚫 Student {student.student_id} did not attend test {test_num}. Skipping.")
             continue
         
         db_name = str(student.neo4j_db).lower()
         tasks.append(
-            update_single_student_dashboard.s(student.student_id, class_id, test_num, db_name)
+            update_single_student_dashboard.s(
+                student.student_id, class_id, test_num, db_name,
+                metrics=class_metrics.get(student.student_id)
+            )
         )
+    if status_obj and len(tasks) < len(students):
+        status_obj.save()
     
     if tasks:
         logger.info(f"🔄 Scheduling {len(tasks)} student dashboard update tasks for class {class_id}, test {test_num}...")
@@ -542,10 +634,10 @@ def update_educator_dashboard(class_id, test_num, student_results=None):
 
         # Build student PDF tasks for students who have responses for this test
         student_objs = Student.objects.filter(class_id=class_id)
+        attendees = fetch_test_attendees(class_id, test_num)
         student_tasks = []
         for stud in student_objs:
-            resp_map = fetch_student_responses(stud.student_id, class_id, test_num)
-            if resp_map:
+            if stud.student_id in attendees:
                 student_tasks.append(trigger_student_pdf_generation.s(stud.student_id, test_num, class_id))
 
         # Build teacher tasks (one per educator for the class)
@@ -0,0 +1,45 @@
+"""
+Unit tests for token-budgeted chunk planning.
+Checks balanced packing, heavy questions and the limiter-derived parallelism.
+"""
+from django.test import SimpleTestCase
+
+from exam.utils.chunk_planner import pack_chunks, plan_extraction_ranges, llm_workers
+
+
+class ChunkPlannerTestCase(SimpleTestCase):
+    """Test exam.utils.chunk_planner"""
+
+    def test_packs_balanced_chunks_under_budget(self):
+        chunks = pack_chunks([(i, 100) for i in range(10)], 450)
+
+        self.assertEqual([len(c) for c in chunks], [3, 4, 3])
+        self.assertEqual(pack_chunks([(i, 100) for i in range(10)], 1000), [list(range(10))])
+
+    def test_heavy_question_gets_its_own_chunk(self):
+        self.assertEqual(pack_chunks([(0, 5000), (1, 10), (2, 10)], 1000), [[0], [1, 2]])
+
+    def test_uneven_weights_never_exceed_budget(self):
+        weights = [(0, 400), (1, 700), (2, 950), (3, 950)]
+
+        chunks = pack_chunks(weights, 1000)
+
+        loads = [sum(dict(weights)[key] for key in chunk) for chunk in chunks]
+        self.assertEqual(chunks, [[0], [1], [2], [3]])
+        self.assertTrue(all(load <= 1000 for load in loads))
+
+    def test_diagram_heavy_section_gets_smaller_chunks(self):
+        markdown = {q: "x" * 300 + ("![img](img)" * 2 if 46 <= q <= 90 else "") for q in range(1, 181)}
+
+        ranges = plan_extraction_ranges(markdown, 180, budget=12000)
+
+        self.assertEqual((ranges[0][0], ranges[-1][1]), (1, 180))
+        sizes = {r: r[1] - r[0] + 1 for r in ranges}
+        self.assertLess(min(sizes.values()), max(sizes.values()))
+
+    def test_unplaced_questions_split_evenly(self):
+        self.assertEqual(plan_extraction_ranges({}, 180, budget=12000), [(1, 45), (46, 90), (91, 135), (136, 180)])
+
+    def test_workers_fit_the_limiter(self):
+        self.assertEqual(llm_workers(2, 5), 3)
+        self.assertEqual(llm_workers(3, 1), 1)
@@ -0,0 +1,55 @@
+"""
+Unit tests for combined overview insight generation.
+Checks JSON slicing, per-section validation, re-asking only the failed sections
+and the empty fallback once re-asks run out.
+"""
+import json
+from unittest import mock
+from django.test import SimpleTestCase
+
+from exam.insight.overview_data_generator import extract_insights_combined
+
+
+def _ok(response):
+    return {"ok": True, "response": response}
+
+
+class CombinedInsightsTestCase(SimpleTestCase):
+    """Test extract_insights_combined"""
+
+    def setUp(self):
+        self.categories = {
+            "KS": ({"Physics": 0.8}, "Key strengths prompt"),
+            "AI": ({"Physics": 0.3}, "Areas for improvement prompt"),
+        }
+
+    @mock.patch("exam.insight.overview_data_generator.call_gemini_api_with_rotation")
+    def test_reasks_only_failed_sections(self, call):
+        call.side_effect = [
+            _ok('Here you go: {"KS": ["\\"Strong mechanics\\"", "Good optics", "Fast"], "AI": []} Thanks!'),
+            _ok(json.dumps({"AI": ["Revise thermodynamics", "Practice graphs", "Check units"]})),
+        ]
+
+        insights = extract_insights_combined(self.categories)
+
+        self.assertEqual(insights, {
+            "KS": ["Strong mechanics", "Good optics", "Fast"],
+            "AI": ["Revise thermodynamics", "Practice graphs", "Check units"],
+        })
+        reask_prompt = call.call_args_list[1].args[0]
+        self.assertIn('Task "AI"', reask_prompt)
+        self.assertNotIn('Task "KS"', reask_prompt)
+        self.assertIs(call.call_args_list[1].kwargs["cache"], False)
+
+    @mock.patch("exam.insight.overview_data_generator.call_gemini_api_with_rotation")
+    def test_empty_sections_after_max_reasks(self, call):
+        call.side_effect = [
+            _ok("not json"),
+            {"ok": False, "code": "QUOTA", "reason": "", "model": "m", "attempt": 1},
+            _ok(json.dumps({"KS": ["One", "Two", "Three"], "AI": ["", " "]})),
+        ]
+
+        insights = extract_insights_combined(self.categories, max_reasks=2)
+
+        self.assertEqual(call.call_count, 3)
+        self.assertEqual(insights, {"KS": ["One", "Two", "Three"], "AI": []})
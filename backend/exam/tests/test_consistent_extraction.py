@@ -0,0 +1,45 @@
+"""
+Unit tests for skipping the extraction merge call.
+Checks that only complete, agreeing image and OCR extractions skip the merge.
+"""
+import json
+from django.test import SimpleTestCase
+
+from exam.utils.pdf_processing import consistent_extraction
+
+
+def _extraction(questions):
+    return json.dumps({"questions": [
+        {"question_number": qnum, "question": text, "options": dict(zip("1234", options)), "im_desp": im_desp}
+        for qnum, text, options, im_desp in questions
+    ]})
+
+
+class ConsistentExtractionTestCase(SimpleTestCase):
+    """Test consistent_extraction"""
+
+    def setUp(self):
+        self.questions = [
+            (1, "A ball is thrown up with 10 m/s. Find the height.", ("5 m", "10 m", "15 m", "20 m"), "NULL"),
+            (2, "The SI unit of force is", ("newton", "joule", "watt", "pascal"), "NULL"),
+        ]
+
+    def test_complete_and_agreeing_skips_merge(self):
+        from_content = [(1, "A ball is  thrown up with 10 m/s. Find the height", *self.questions[0][2:3], "Graph of h vs t"),
+                        self.questions[1]]
+
+        merged = consistent_extraction(_extraction(self.questions), _extraction(from_content), 1, 2)
+
+        questions = json.loads(merged)["questions"]
+        self.assertEqual([q["question_number"] for q in questions], [1, 2])
+        self.assertEqual(questions[0]["question"], self.questions[0][1])
+        self.assertEqual(questions[0]["im_desp"], "Graph of h vs t")
+
+    def test_missing_question_needs_merge(self):
+        self.assertIsNone(consistent_extraction(_extraction(self.questions), _extraction(self.questions[:1]), 1, 2))
+        self.assertIsNone(consistent_extraction(_extraction(self.questions), _extraction(self.questions), 1, 3))
+
+    def test_divergent_options_need_merge(self):
+        divergent = [self.questions[0], (2, "The SI unit of force is", ("newton", "joule", "kilogram metre", "pascal"), "NULL")]
+
+        self.assertIsNone(consistent_extraction(_extraction(self.questions), _extraction(divergent), 1, 2))
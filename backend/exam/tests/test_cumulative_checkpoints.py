@@ -7,6 +7,7 @@ from django.test import TestCase
 from unittest.mock import patch, MagicMock
 from exam.models.result import StudentResult
 from exam.models.checkpoints import Checkpoints
+from exam.utils.topic_stats import write_topic_stats
 from exam.graph_utils.retrieve_cumulative_checkpoints_data import (
     get_cumulative_checkpoints_data,
     parse_misconception_field
@@ -67,6 +68,9 @@ class CumulativeCheckpointsTestCase(TestCase):
             is_correct=True,
             was_attempted=True
         )
+        
+        # Topic aggregates are written by bulk_upsert_student_results in production
+        write_topic_stats(StudentResult.objects.filter(student_id=self.student_id, class_id=self.class_id))
     
     def test_parse_misconception_field_json(self):
         """Test parsing misconception from JSON format"""
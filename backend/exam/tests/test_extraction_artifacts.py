@@ -0,0 +1,77 @@
+"""
+Unit tests for stored extraction artifacts.
+Checks that page images and OCR output are reused for the same PDF and render
+settings, and produced again for a new PDF or changed settings.
+"""
+from io import BytesIO
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.test import SimpleTestCase, override_settings
+
+from exam.utils import pdf_processing
+from exam.utils.pdf_processing import load_extraction_artifacts
+
+PDF_PATH = "uploads/A2/TEST_1/qp.pdf"
+TEST_PATH = "uploads/A2/TEST_1/"
+
+
+@override_settings(PDF_RENDER_DPI=72, PDF_RENDER_FORMAT='png', PDF_RENDER_MAX_BYTES=0)
+class ExtractionArtifactsTestCase(SimpleTestCase):
+    """Test load_extraction_artifacts"""
+
+    def setUp(self):
+        self.storage = InMemoryStorage()
+        self.storage.save(PDF_PATH, ContentFile(b"%PDF-1 version one"))
+        patches = {
+            "storage": mock.patch("exam.utils.pdf_processing.default_storage", self.storage),
+            "render": mock.patch("exam.utils.pdf_processing.render_pdf_pages",
+                                 side_effect=lambda pdf, *args: [BytesIO(pdf + b" page0"), BytesIO(pdf + b" page1")]),
+            "ocr": mock.patch("exam.utils.pdf_processing.call_mistrall_ocr_api_with_rotation", return_value='{"pages": []}'),
+        }
+        self.mocks = {name: patcher.start() for name, patcher in patches.items()}
+        for patcher in patches.values():
+            self.addCleanup(patcher.stop)
+
+    def _upload(self, content):
+        self.storage.delete(PDF_PATH)
+        self.storage.save(PDF_PATH, ContentFile(content))
+
+    def test_same_pdf_reuses_pages_and_ocr(self):
+        images, ocr_text = load_extraction_artifacts(PDF_PATH, TEST_PATH)
+
+        again, ocr_again = load_extraction_artifacts(PDF_PATH, TEST_PATH)
+
+        self.assertEqual([i.getvalue() for i in again], [i.getvalue() for i in images])
+        self.assertEqual(ocr_again, ocr_text)
+        self.assertEqual(self.mocks["render"].call_count, 1)
+        self.assertEqual(self.mocks["ocr"].call_count, 1)
+
+    def test_new_pdf_renders_and_ocrs_again(self):
+        load_extraction_artifacts(PDF_PATH, TEST_PATH)
+        self._upload(b"%PDF-1 version two")
+
+        images, _ = load_extraction_artifacts(PDF_PATH, TEST_PATH)
+
+        self.assertEqual(images[0].getvalue(), b"%PDF-1 version two page0")
+        self.assertEqual(self.mocks["render"].call_count, 2)
+        self.assertEqual(self.mocks["ocr"].call_count, 2)
+
+    def test_changed_render_settings_keep_ocr(self):
+        load_extraction_artifacts(PDF_PATH, TEST_PATH)
+
+        with override_settings(PDF_RENDER_FORMAT='jpeg'):
+            load_extraction_artifacts(PDF_PATH, TEST_PATH)
+
+        self.assertEqual(self.mocks["render"].call_count, 2)
+        self.assertEqual(self.mocks["ocr"].call_count, 1)
+
+    def test_first_pass_writes_manifest_once(self):
+        with mock.patch("exam.utils.pdf_processing._save_artifact", wraps=pdf_processing._save_artifact) as save:
+            load_extraction_artifacts(PDF_PATH, TEST_PATH)
+
+        paths = [c.args[0] for c in save.call_args_list]
+        self.assertEqual(sum(p.endswith("manifest.json") for p in paths), 1)
+        self.assertTrue(paths[-1].endswith("manifest.json"))
+        # Pages and OCR go to a new version directory, so no overwrite probe is needed
+        self.assertTrue(all(c.args[2] is False for c in save.call_args_list[:-1]))
@@ -0,0 +1,45 @@
+"""
+Unit tests for gap-filling retries in question extraction.
+Checks missing-number grouping and that accepted questions carry over, so only
+the missing questions are extracted again.
+"""
+from io import BytesIO
+from unittest import mock
+from django.test import SimpleTestCase
+
+from exam.utils.pdf_processing import missing_ranges, questions_extract
+
+
+def _question(qnum):
+    return {"question_number": qnum, "question": f"Q{qnum}", "options": {"1": "a", "2": "b", "3": "c", "4": "d"}, "im_desp": "NULL"}
+
+
+class ExtractionRetryTestCase(SimpleTestCase):
+    """Test missing_ranges and the questions_extract retry loop"""
+
+    def test_missing_ranges_groups_close_numbers(self):
+        self.assertEqual(missing_ranges([57, 58, 100, 102, 103, 150]), [(57, 58), (100, 103), (150, 150)])
+        self.assertEqual(missing_ranges([]), [])
+
+    @mock.patch("exam.utils.pdf_processing.default_storage")
+    @mock.patch("exam.utils.pdf_processing.extract_ranges")
+    def test_retry_extracts_only_missing_questions(self, extract_ranges, _storage):
+        dropped = {57, 58}
+
+        def fake_extract(ocr_text, images, ranges, use_parallel=True, cache=None):
+            results = [
+                {"questions": [_question(q) for q in range(start, end + 1) if q not in dropped]}
+                for start, end in ranges
+            ]
+            dropped.clear()  # the retry finds them
+            return results
+        extract_ranges.side_effect = fake_extract
+
+        questions = questions_extract("qp.pdf", "test/", total_questions=180, artifacts=([BytesIO(b"page")], "not json"))
+
+        self.assertEqual([q["question_number"] for q in questions], list(range(1, 181)))
+        self.assertEqual(extract_ranges.call_count, 2)
+        self.assertEqual(extract_ranges.call_args_list[1].args[2], [(57, 58)])
+        # The retry bypasses the response cache that served the incomplete outputs
+        self.assertIsNone(extract_ranges.call_args_list[0].kwargs["cache"])
+        self.assertIs(extract_ranges.call_args_list[1].kwargs["cache"], False)
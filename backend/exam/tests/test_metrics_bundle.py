@@ -0,0 +1,47 @@
+"""
+Unit tests for the single-query overview metrics.
+Checks OP/TT/IR/CS derived from StudentTopicStats counts and that the
+class-wide variant matches the per-student calculation.
+"""
+from django.test import TestCase
+
+from exam.models import StudentTopicStats
+from exam.graph_utils.calculate_metrics import calculate_metrics_pg, calculate_class_metrics_pg
+
+
+class MetricsBundleTestCase(TestCase):
+    """Test calculate_metrics_pg and calculate_class_metrics_pg"""
+
+    def setUp(self):
+        self.class_id = "METRICS_CLASS"
+        # (student, test, topic, total, attempted, correct)
+        rows = [
+            ("S1", 1, "Kinematics", 10, 8, 5),
+            ("S1", 1, "Optics", 10, 10, 6),
+            ("S1", 2, "Kinematics", 10, 10, 8),
+            ("S1", 2, "Optics", 10, 9, 7),
+            ("S2", 1, "Kinematics", 10, 2, 1),
+        ]
+        for student_id, test_num, topic, total, attempted, correct in rows:
+            StudentTopicStats.objects.create(
+                student_id=student_id, class_id=self.class_id, test_num=test_num,
+                subject="Physics", chapter="ch", topic=topic, question_type="MCQ",
+                total=total, attempted=attempted, correct=correct
+            )
+
+    def test_student_metrics(self):
+        op, tt, ir, cv = calculate_metrics_pg("S1", self.class_id)
+
+        # Test1: 4*11 - 7 = 37, Test2: 4*15 - 4 = 56; overall 93 / 160 = 58.13%, halved over 2 tests
+        self.assertEqual(tt, 2)
+        self.assertAlmostEqual(op, 58.13 / 2)
+        self.assertAlmostEqual(ir, round((56 - 37) / 37 * 100, 2))
+        self.assertGreater(cv, 0)
+
+    def test_class_metrics_match_per_student(self):
+        class_metrics = calculate_class_metrics_pg(self.class_id)
+
+        self.assertEqual(set(class_metrics), {"S1", "S2"})
+        for student_id, metrics in class_metrics.items():
+            self.assertEqual(metrics, calculate_metrics_pg(student_id, self.class_id))
+        self.assertEqual(calculate_metrics_pg("S3", self.class_id), (0.0, 0, 0.0, 0.0))
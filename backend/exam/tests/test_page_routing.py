@@ -0,0 +1,48 @@
+"""
+Unit tests for page-aware image routing in question extraction.
+Checks the question -> page index built from OCR markdown and the pages
+selected for a chunk.
+"""
+import json
+from io import BytesIO
+from django.test import SimpleTestCase
+
+from exam.utils.pdf_processing import build_question_page_index, images_for_questions
+
+
+def _ocr(*pages):
+    return json.dumps({"pages": [{"index": i, "markdown": md} for i, md in enumerate(pages)]})
+
+
+class PageRoutingTestCase(SimpleTestCase):
+    """Test build_question_page_index and images_for_questions"""
+
+    def setUp(self):
+        self.ocr = _ocr(
+            "# Physics\n1. A ball is thrown...\n(1) 2 m\n(2) 4 m\n2. Find the...\n1) 10 N\n2) 20 N",
+            "3. A block...\nQ4. Two charges...",
+            "5. The unit of...\n6) Which of...",
+            "7. Consider...\n8. A lens...",
+        )
+        self.images = [BytesIO(f"page{i}".encode()) for i in range(4)]
+
+    def test_index_ignores_numbered_options(self):
+        index = build_question_page_index(self.ocr)
+
+        self.assertEqual(index, {1: 0, 2: 0, 3: 1, 4: 1, 5: 2, 6: 2, 7: 3, 8: 3})
+
+    def test_chunk_gets_its_pages_and_the_next_question_page(self):
+        pages = images_for_questions(self.ocr, self.images, 3, 5)
+
+        self.assertEqual([p.getvalue() for p in pages], [b"page1", b"page2"])
+
+    def test_unparseable_ocr_sends_every_page(self):
+        self.assertEqual(images_for_questions("not json", self.images, 3, 5), self.images)
+
+    def test_index_ignores_bracket_options_under_first_question(self):
+        ocr = _ocr(
+            "1. Find x\n1) 2\n2) 3\n3) 4\n4) 5\n2. Find y\n1) 6\n2) 7\n3) 8\n4) 9",
+            "3. Find z\n4. Find w\n1) a\n2) b\n3) c\n4) d\n5. Find v",
+        )
+
+        self.assertEqual(build_question_page_index(ocr), {1: 0, 2: 0, 3: 1, 4: 1, 5: 1})
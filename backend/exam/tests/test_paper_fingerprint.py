@@ -0,0 +1,60 @@
+"""
+Unit tests for cross-class question analysis reuse.
+Checks that identical questions clone their analysis and changed ones do not,
+and that reused papers take their subjects from the admin metadata ranges.
+"""
+from django.test import TestCase
+
+from exam.models import QuestionAnalysis
+from exam.utils.paper_fingerprint import question_fingerprint, clone_analysed_questions, assign_range_subjects
+
+
+class PaperFingerprintTestCase(TestCase):
+    """Test question fingerprints and QuestionAnalysis cloning"""
+
+    def setUp(self):
+        self.options = ["2 m/s", "4 m/s", "6 m/s", "8 m/s"]
+        self.hash = question_fingerprint("Physics", "Find the  velocity.", self.options, "4 m/s")
+        QuestionAnalysis.objects.create(
+            class_id="CLASS_A", test_num=1, question_number=7,
+            subject="Physics", chapter="Kinematics", topic="Velocity", subtopic="Average velocity",
+            typeOfquestion="MCQ", question_text="Find the  velocity.", correct_answer="4 m/s",
+            option_1="2 m/s", option_2="4 m/s", option_3="6 m/s", option_4="8 m/s",
+            option_1_feedback="f1", option_2_feedback="f2", option_3_feedback="f3", option_4_feedback="f4",
+            content_hash=self.hash
+        )
+
+    def test_fingerprint_ignores_case_and_spacing(self):
+        self.assertEqual(self.hash, question_fingerprint("physics", "find the velocity. ", self.options, "4 m/s"))
+        self.assertNotEqual(self.hash, question_fingerprint("Physics", "Find the velocity.", self.options, "6 m/s"))
+
+    def test_clone_only_matching_questions(self):
+        other = question_fingerprint("Physics", "Find the acceleration.", self.options, "2 m/s")
+
+        cloned = clone_analysed_questions("CLASS_B", 3, {1: self.hash, 2: other})
+
+        self.assertEqual(cloned, {1})
+        copy = QuestionAnalysis.objects.get(class_id="CLASS_B", test_num=3, question_number=1)
+        self.assertEqual((copy.topic, copy.option_2_feedback, copy.content_hash), ("Velocity", "f2", self.hash))
+        self.assertFalse(QuestionAnalysis.objects.filter(class_id="CLASS_B", question_number=2).exists())
+
+    def test_clone_overwrites_existing_analysis(self):
+        QuestionAnalysis.objects.create(
+            class_id="CLASS_B", test_num=3, question_number=1, subject="Physics", chapter="old",
+            topic="old", subtopic="old", typeOfquestion="MCQ", question_text="old", correct_answer="a",
+            option_1="a", option_2="b", option_3="c", option_4="d",
+            option_1_feedback="", option_2_feedback="", option_3_feedback="", option_4_feedback=""
+        )
+
+        self.assertEqual(clone_analysed_questions("CLASS_B", 3, {1: self.hash}), {1})
+        copy = QuestionAnalysis.objects.get(class_id="CLASS_B", test_num=3, question_number=1)
+        self.assertEqual((copy.chapter, copy.content_hash), ("Kinematics", self.hash))
+
+    def test_assign_range_subjects_restamps_reused_questions(self):
+        reused = [{"question_number": n, "subject": "Biology"} for n in (1, 2, 3, 4)]
+        ranges = [{"subject": "Botany", "start": 1, "end": 2}, {"subject": "Zoology", "start": 3, "end": 3}]
+
+        assigned = assign_range_subjects(reused, ranges)
+
+        self.assertEqual([(q["question_number"], q["subject"]) for q in assigned], [(1, "Botany"), (2, "Botany"), (3, "Zoology")])
+        self.assertEqual(reused[0]["subject"], "Biology")
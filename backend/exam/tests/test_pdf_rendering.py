@@ -0,0 +1,48 @@
+"""
+Unit tests for question paper rasterization.
+Checks page order, output formats and the per-page size limit.
+"""
+import fitz
+from django.test import SimpleTestCase, override_settings
+
+from exam.utils.pdf_processing import render_pdf_pages
+
+
+def _pdf(pages):
+    document = fitz.open()
+    for i in range(pages):
+        document.new_page().insert_text((72, 72), f"Page {i + 1}: " + "text " * 200, fontsize=11)
+    return document.tobytes()
+
+
+@override_settings(PDF_RENDER_DPI=72, PDF_RENDER_FORMAT='png', PDF_RENDER_MAX_BYTES=0)
+class PdfRenderingTestCase(SimpleTestCase):
+    """Test render_pdf_pages"""
+
+    def test_renders_every_page_as_png(self):
+        pages = render_pdf_pages(_pdf(3))
+
+        self.assertEqual(len(pages), 3)
+        self.assertTrue(all(p.getvalue().startswith(b"\x89PNG") for p in pages))
+
+    def test_jpeg_output(self):
+        pages = render_pdf_pages(_pdf(1), fmt="jpeg")
+
+        self.assertTrue(pages[0].getvalue().startswith(b"\xff\xd8\xff"))
+
+    def test_size_limit_lowers_resolution(self):
+        pdf = _pdf(1)
+        full = len(render_pdf_pages(pdf, dpi=200)[0].getvalue())
+
+        limited = len(render_pdf_pages(pdf, dpi=200, max_bytes=full // 2)[0].getvalue())
+
+        self.assertLess(limited, full)
+
+    def test_page_selection(self):
+        pdf = _pdf(3)
+
+        first = render_pdf_pages(pdf, pages=range(1))
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(first[0].getvalue(), render_pdf_pages(pdf)[0].getvalue())
+        self.assertEqual(len(render_pdf_pages(pdf, pages=[2, 7])), 1)
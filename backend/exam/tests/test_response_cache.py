@@ -0,0 +1,77 @@
+"""
+Unit tests for the Gemini response cache.
+Checks hit/miss accounting, explicit bypass on re-asks, TTL expiry and LRU eviction.
+"""
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from exam.models import Gemini_ResponseCache, Gemini_CacheDayStats
+from exam.llm_call import response_cache
+from exam.llm_call.gemini_api import call_gemini_api_with_rotation
+
+
+@override_settings(LLM_CACHE_ENABLED=True, LLM_CACHE_SITES=['exam.insight'], LLM_CACHE_TTL=3600)
+class ResponseCacheTestCase(TestCase):
+    """Test exam.llm_call.response_cache"""
+
+    def setUp(self):
+        self.site = "exam.insight.swot_generator.extract_insights"
+
+    def test_key_covers_model_prompt_and_images(self):
+        key = response_cache.cache_key("gemini-2.5-flash", "prompt", [BytesIO(b"page1")])
+
+        self.assertEqual(key, response_cache.cache_key("gemini-2.5-flash", "prompt", [BytesIO(b"page1")]))
+        self.assertNotEqual(key, response_cache.cache_key("gemini-2.5-flash-lite", "prompt", [BytesIO(b"page1")]))
+        self.assertNotEqual(key, response_cache.cache_key("gemini-2.5-flash", "prompt", [BytesIO(b"page2")]))
+
+    def test_site_flags(self):
+        self.assertTrue(response_cache.site_enabled(self.site))
+        self.assertFalse(response_cache.site_enabled("exam.utils.analysis_generator.analyse"))
+        self.assertTrue(response_cache.site_enabled("exam.utils.analysis_generator.analyse", override=True))
+
+    def test_hit_and_miss(self):
+        key = response_cache.cache_key("gemini-2.5-flash", "prompt")
+
+        self.assertIsNone(response_cache.get_cached_response(key, self.site))
+        response_cache.store_response(key, "gemini-2.5-flash", self.site, "answer")
+
+        # Identical prompts asked back to back (e.g. students with the same data) both hit
+        self.assertEqual(response_cache.get_cached_response(key, self.site), "answer")
+        self.assertEqual(response_cache.get_cached_response(key, self.site), "answer")
+
+        stats = Gemini_CacheDayStats.objects.get(function_name=self.site)
+        self.assertEqual((stats.hits, stats.misses), (2, 1))
+
+    @mock.patch("exam.llm_call.gemini_api.get_trace_context")
+    @mock.patch("exam.llm_call.gemini_api._call_gemini_api_traced")
+    def test_reask_bypasses_lookup_and_replaces_entry(self, traced, trace_context):
+        trace_context.return_value = self.site
+        traced.side_effect = ["bad answer", "good answer"]
+
+        self.assertEqual(call_gemini_api_with_rotation("prompt"), "bad answer")
+        self.assertEqual(call_gemini_api_with_rotation("prompt", cache=False), "good answer")
+        self.assertEqual(call_gemini_api_with_rotation("prompt"), "good answer")
+        self.assertEqual(traced.call_count, 2)
+
+    def test_prune_ttl_and_lru(self):
+        now = timezone.now()
+        for i in range(4):
+            Gemini_ResponseCache.objects.create(key=f"k{i}", model_name="m", response="r")
+        Gemini_ResponseCache.objects.filter(key="k0").update(created_at=now - timedelta(hours=2))
+        for i in range(1, 4):
+            Gemini_ResponseCache.objects.filter(key=f"k{i}").update(last_used_at=now - timedelta(minutes=10 - i))
+
+        deleted = response_cache.prune_response_cache(max_entries=2)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(set(Gemini_ResponseCache.objects.values_list('key', flat=True)), {"k2", "k3"})
+
+    def test_calls_saved_counter(self):
+        response_cache.record_calls_saved(self.site, 3)
+        response_cache.record_calls_saved(self.site, -1)
+
+        stats = Gemini_CacheDayStats.objects.get(function_name=self.site)
+        self.assertEqual((stats.calls_saved, stats.hits, stats.misses), (2, 0, 0))
@@ -0,0 +1,74 @@
+"""
+Unit tests for class-wide result scoring.
+Checks that `score_test_results` reproduces the per-subject
+total/attended/correct/score values and upserts one Result per student.
+"""
+from django.test import TestCase
+
+from exam.models import Student, QuestionAnalysis, StudentResponse, Result
+from exam.utils.result_scoring import score_test_results
+
+
+class ResultScoringTestCase(TestCase):
+    """Test vectorized scoring of a whole test"""
+
+    def setUp(self):
+        self.class_id = "SCORE_CLASS"
+        self.test_num = 3
+
+        for sid in ("S1", "S2", "S3"):
+            Student.objects.create(
+                student_id=sid, name=sid, dob="2008-01-01", class_id=self.class_id,
+                password="x", neo4j_db=f"db{sid}"
+            )
+
+        # Q1-Q2 Physics, Q3 Chemistry; correct options are 1, 2, 3
+        for qnum, subject, correct in ((1, "Physics", 1), (2, "Physics", 2), (3, "Chemistry", 3)):
+            options = {f"option_{i}": f"Q{qnum} opt {i}" for i in range(1, 5)}
+            QuestionAnalysis.objects.create(
+                class_id=self.class_id, test_num=self.test_num, question_number=qnum,
+                subject=subject, chapter="ch", topic="tp", subtopic="st", typeOfquestion="MCQ",
+                question_text=f"Q{qnum}", correct_answer=options[f"option_{correct}"],
+                option_1_feedback="", option_2_feedback="", option_3_feedback="", option_4_feedback="",
+                **options
+            )
+
+        answers = {
+            "S1": {1: "1", 2: "2", 3: "3"},   # all correct
+            "S2": {1: "4", 2: None, 3: "3"},  # one wrong, one skipped, one correct
+        }
+        for sid, per_q in answers.items():
+            for qnum, selected in per_q.items():
+                StudentResponse.objects.create(
+                    student_id=sid, class_id=self.class_id, test_num=self.test_num,
+                    question_number=qnum, selected_answer=selected
+                )
+
+    def test_scores_attending_students(self):
+        """Each attending student gets one Result row with per-subject counts"""
+        written = score_test_results(self.class_id, self.test_num)
+
+        self.assertEqual(written, 2)
+        self.assertFalse(Result.objects.filter(student_id="S3").exists())
+
+        s1 = Result.objects.get(student_id="S1", class_id=self.class_id, test_num=self.test_num)
+        self.assertEqual((s1.phy_total, s1.phy_attended, s1.phy_correct, s1.phy_score), (2, 2, 2, 8))
+        self.assertEqual((s1.chem_total, s1.chem_attended, s1.chem_correct, s1.chem_score), (1, 1, 1, 4))
+        self.assertEqual((s1.total_attended, s1.total_correct, s1.total_score), (3, 3, 12))
+
+        s2 = Result.objects.get(student_id="S2", class_id=self.class_id, test_num=self.test_num)
+        self.assertEqual((s2.phy_attended, s2.phy_correct, s2.phy_score), (1, 0, -1))
+        self.assertEqual((s2.chem_attended, s2.chem_correct, s2.chem_score), (1, 1, 4))
+        self.assertEqual(s2.total_score, 3)
+        self.assertEqual(s2.bio_total, 0)
+
+    def test_rescoring_updates_existing_rows(self):
+        """Re-running after an answer change updates the row instead of duplicating it"""
+        score_test_results(self.class_id, self.test_num)
+        StudentResponse.objects.filter(student_id="S2", question_number=1).update(selected_answer="1")
+
+        score_test_results(self.class_id, self.test_num, student_ids=["S2"])
+
+        self.assertEqual(Result.objects.filter(student_id="S2").count(), 1)
+        s2 = Result.objects.get(student_id="S2")
+        self.assertEqual((s2.phy_attended, s2.phy_correct, s2.phy_score), (1, 1, 4))
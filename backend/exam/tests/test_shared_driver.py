@@ -0,0 +1,32 @@
+"""
+Unit tests for the process-wide Neo4j driver registry.
+Checks that a connection error only replaces the driver that actually failed.
+"""
+from unittest.mock import MagicMock, patch
+from django.test import SimpleTestCase
+
+from exam.graph_utils import knowledge_graph_manager
+from exam.graph_utils.knowledge_graph_manager import get_shared_driver
+
+
+class SharedDriverTestCase(SimpleTestCase):
+    """Test get_shared_driver refreshes"""
+
+    def setUp(self):
+        knowledge_graph_manager._drivers.clear()
+        patcher = patch.object(knowledge_graph_manager.GraphDatabase, "driver", side_effect=lambda *a, **k: MagicMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(knowledge_graph_manager._drivers.clear)
+
+    def test_failed_driver_is_replaced_once(self):
+        failed = get_shared_driver("bolt://neo4j", "user", "pw")
+
+        fresh = get_shared_driver("bolt://neo4j", "user", "pw", failed_driver=failed)
+        # A second thread that saw the same failure gets the replacement, not another one
+        again = get_shared_driver("bolt://neo4j", "user", "pw", failed_driver=failed)
+
+        self.assertIsNot(fresh, failed)
+        self.assertIs(again, fresh)
+        failed.close.assert_called_once()
+        fresh.close.assert_not_called()
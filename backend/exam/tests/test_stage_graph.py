@@ -0,0 +1,41 @@
+"""
+Unit tests for the dashboard stage graph runner.
+Checks dependency ordering and that a failing stage only skips its dependents.
+"""
+from django.test import SimpleTestCase
+
+from exam.services.update_dashboard import run_stage_graph
+
+
+class StageGraphTestCase(SimpleTestCase):
+    """Test run_stage_graph"""
+
+    def test_dependencies_run_first(self):
+        order = []
+        stages = {
+            'report': (lambda: order.append('report'), ('overview', 'swot')),
+            'overview': (lambda: order.append('overview'), ()),
+            'swot': (lambda: order.append('swot'), ()),
+        }
+
+        results, errors = run_stage_graph(stages, max_workers=3)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(set(results), {'report', 'overview', 'swot'})
+        self.assertEqual(order[-1], 'report')
+
+    def test_failure_is_isolated(self):
+        def fail():
+            raise ValueError("boom")
+
+        stages = {
+            'overview': (fail, ()),
+            'plan': (lambda: 'plan', ('overview',)),
+            'performance': (lambda: 'perf', ()),
+        }
+
+        results, errors = run_stage_graph(stages, max_workers=1)
+
+        self.assertEqual(results, {'performance': 'perf'})
+        self.assertIsInstance(errors['overview'], ValueError)
+        self.assertIn('plan', errors)
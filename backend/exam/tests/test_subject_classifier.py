@@ -0,0 +1,61 @@
+"""
+Unit tests for the offline subject classifier.
+Checks batch subjects, confidence and candidate restriction, and that
+batches of one paper never share a subject.
+"""
+from unittest import mock
+from django.test import SimpleTestCase
+
+from exam.utils.analysis_generator import assign_batch_subjects
+from exam.utils.subject_classifier import classify_questions
+
+
+def _q(text, options=("a", "b", "c", "d")):
+    return {"question_text": text, "options": list(options), "im_desp": ""}
+
+
+class SubjectClassifierTestCase(SimpleTestCase):
+    """Test classify_questions"""
+
+    def test_classifies_batches(self):
+        physics = [
+            _q("A ball is projected with velocity 20 m/s at 30 degrees. Find the maximum height."),
+            _q("The equivalent resistance of two resistors of 4 ohm in parallel is"),
+            _q("The dimensional formula of torque is"),
+        ]
+        botany = [
+            _q("Casparian strips are present in the endodermis of the root"),
+            _q("Which hormone promotes cell elongation in plants?", ("Auxin", "Ethylene", "ABA", "Cytokinin")),
+            _q("C4 plants fix CO2 in mesophyll cells"),
+        ]
+
+        self.assertEqual(classify_questions(physics), ("Physics", 1.0))
+        self.assertEqual(classify_questions(botany), ("Botany", 1.0))
+
+    def test_unmatched_questions_lower_confidence(self):
+        subject, confidence = classify_questions([_q("Insulin is secreted by"), _q("Find x"), _q("Pick one")])
+
+        self.assertEqual(subject, "Zoology")
+        self.assertLess(confidence, 0.6)
+
+    def test_candidate_subjects(self):
+        result = classify_questions([_q("Insulin is secreted by")], subjects=["Physics", "Chemistry"])
+
+        self.assertEqual(result, (None, 0.0))
+
+
+class AssignBatchSubjectsTestCase(SimpleTestCase):
+    """Test assign_batch_subjects"""
+
+    @mock.patch("exam.utils.analysis_generator.subject_min_confidence", return_value=0.6)
+    @mock.patch("exam.utils.analysis_generator.infer_subject_with_gemini", return_value="Botany")
+    @mock.patch("exam.utils.analysis_generator.classify_questions")
+    def test_duplicate_confident_subject_goes_to_gemini(self, classify, infer, _threshold):
+        classify.side_effect = [("Physics", 1.0), ("Zoology", 0.7), ("Zoology", 0.9)]
+        batches = [[_q("b1")], [_q("b2")], [_q("b3")]]
+
+        subjects = assign_batch_subjects(batches)
+
+        # The more confident Zoology batch keeps it; the other is re-inferred
+        self.assertEqual(subjects, ["Physics", "Botany", "Zoology"])
+        infer.assert_called_once_with(batches[1], ["Physics", "Zoology"])
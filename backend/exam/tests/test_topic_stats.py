@@ -0,0 +1,99 @@
+"""
+Unit tests for the StudentTopicStats aggregate table.
+Checks that per-topic counts match the StudentResult rows they are built from,
+that re-writing a student-test replaces its previous aggregates and that tests
+without aggregates are backfilled.
+"""
+from django.test import TestCase
+
+from exam.models import QuestionAnalysis, Result, StudentResult, StudentTopicStats
+from exam.utils import topic_stats
+from exam.utils.topic_stats import write_topic_stats, student_topic_stats, rebuild_test_topic_stats, STAT_SUMS
+from exam.graph_utils.calculate_metrics import calculate_consistency_score_pg
+
+
+class TopicStatsTestCase(TestCase):
+    """Test StudentTopicStats maintenance"""
+
+    def setUp(self):
+        self.class_id = "STATS_CLASS"
+        self.student_id = "S1"
+        self.test_num = 2
+        topic_stats._VERIFIED_STUDENTS.clear()
+
+        # Q1-Q2 kinematics MCQ, Q3 kinematics assertion, Q4 optics MCQ
+        for qnum, topic, qtype in ((1, "Kinematics", "MCQ"), (2, "Kinematics", "MCQ"),
+                                   (3, "Kinematics", "Assertion"), (4, "Optics", "MCQ")):
+            QuestionAnalysis.objects.create(
+                class_id=self.class_id, test_num=self.test_num, question_number=qnum,
+                subject="Physics", chapter="ch", topic=topic, subtopic="st", typeOfquestion=qtype,
+                question_text=f"Q{qnum}", correct_answer="a", option_1="a", option_2="b",
+                option_3="c", option_4="d", option_1_feedback="", option_2_feedback="",
+                option_3_feedback="", option_4_feedback=""
+            )
+
+    def _results(self, outcomes):
+        return [
+            StudentResult(
+                student_id=self.student_id, class_id=self.class_id, test_num=self.test_num,
+                question_number=qnum, subject="Physics", chapter="ch",
+                topic="Optics" if qnum == 4 else "Kinematics",
+                is_correct=correct, was_attempted=attempted
+            )
+            for qnum, (correct, attempted) in outcomes.items()
+        ]
+
+    def test_counts_per_topic_and_type(self):
+        # Q1 correct, Q2 wrong, Q3 skipped, Q4 correct
+        write_topic_stats(self._results({1: (True, True), 2: (False, True), 3: (False, False), 4: (True, True)}))
+
+        rows = {
+            (r.topic, r.question_type): (r.total, r.attempted, r.correct)
+            for r in StudentTopicStats.objects.filter(student_id=self.student_id)
+        }
+        self.assertEqual(rows, {
+            ("Kinematics", "MCQ"): (2, 2, 1),
+            ("Kinematics", "Assertion"): (1, 0, 0),
+            ("Optics", "MCQ"): (1, 1, 1),
+        })
+
+    def test_rewrite_replaces_previous_stats(self):
+        write_topic_stats(self._results({1: (True, True), 2: (True, True), 3: (True, True), 4: (True, True)}))
+        write_topic_stats(self._results({1: (False, False), 2: (False, True), 3: (True, True), 4: (False, True)}))
+
+        totals = student_topic_stats(self.student_id, self.class_id, self.test_num).aggregate(**STAT_SUMS)
+        self.assertEqual(totals['total_questions'], 4)
+        self.assertEqual(totals['attempted_questions'], 3)
+        self.assertEqual(totals['correct_questions'], 1)
+
+    def test_consistency_score_sums_question_types(self):
+        def stats(test_num, topic, qtype, total, correct):
+            StudentTopicStats.objects.create(
+                student_id=self.student_id, class_id=self.class_id, test_num=test_num, subject="Physics",
+                chapter="ch", topic=topic, question_type=qtype, total=total, attempted=total, correct=correct
+            )
+        # Kinematics: 1/4 in test 2, 2/2 in test 3; Optics only in one test is ignored
+        stats(2, "Kinematics", "MCQ", 2, 1)
+        stats(2, "Kinematics", "Assertion", 2, 0)
+        stats(3, "Kinematics", "MCQ", 2, 2)
+        stats(2, "Optics", "MCQ", 1, 1)
+
+        # mean 0.625 / (1 + std 0.375)
+        self.assertEqual(calculate_consistency_score_pg(self.student_id, self.class_id), 0.4545)
+
+    def test_rebuild_test_topic_stats_backfills_existing_results(self):
+        StudentResult.objects.bulk_create(self._results({1: (True, True), 2: (False, True), 3: (False, False), 4: (True, True)}))
+        self.assertFalse(StudentTopicStats.objects.exists())
+
+        self.assertEqual(rebuild_test_topic_stats(self.class_id, self.test_num), 3)
+        self.assertEqual(StudentTopicStats.objects.filter(student_id=self.student_id).count(), 3)
+
+    def test_missing_stats_built_on_read(self):
+        # Results saved without bulk_upsert_student_results, e.g. restored from a dump
+        StudentResult.objects.bulk_create(self._results({1: (True, True), 2: (False, True), 3: (False, False), 4: (True, True)}))
+        score_fields = {f.name: 0 for f in Result._meta.fields if f.name not in ("id", "student_id", "class_id", "test_num")}
+        Result.objects.create(student_id=self.student_id, class_id=self.class_id, test_num=self.test_num, **score_fields)
+
+        totals = student_topic_stats(self.student_id, self.class_id).aggregate(**STAT_SUMS)
+        self.assertEqual(totals['total_questions'], 4)
+        self.assertEqual(totals['correct_questions'], 2)
@@ -5,12 +5,15 @@ import logging
 import threading
 from celery import shared_task, group, current_task
 from exam.llm_call.decorators import traceable
+from exam.utils.subject_classifier import classify_questions, min_confidence as subject_min_confidence
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 # Global semaphore to limit concurrent LLM API calls across all threads/workers
 # This prevents overwhelming the API when running multiple batches in parallel
-_llm_semaphore = threading.Semaphore(6)  # Max 6 concurrent LLM calls
+LLM_CONCURRENCY = 6  # Max concurrent LLM calls
+_llm_semaphore = threading.Semaphore(LLM_CONCURRENCY)
 
 
 def _is_running_in_celery_task():
@@ -91,9 +94,11 @@ im_desp: {q['im_desp']}
 """
 
     subject = None
+    cache = None
 
     while not subject:
-        result = call_gemini_api_with_rotation(prompt, model_name="gemini-2.5-flash", return_structured=True)
+        result = call_gemini_api_with_rotation(prompt, model_name="gemini-2.5-flash", return_structured=True, cache=cache)
+        cache = False  # a repeated ask must not be answered from the cache
 
         # Normalize structured result to plain text for backward compatibility
         if isinstance(result, dict):
@@ -211,7 +216,7 @@ im_desp: {q['im_desp']}
         response = result or ""
 
     while not response:
-        result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True)
+        result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True, cache=False)
         if isinstance(result, dict):
             if result.get("ok"):
                 response = result.get("response", "") or ""
@@ -281,7 +286,7 @@ im_desp: {q['im_desp']}
         response = result or ""
 
     while not response:
-        result = call_gemini_api_with_rotation(batched_prompt, return_structured=True)
+        result = call_gemini_api_with_rotation(batched_prompt, return_structured=True, cache=False)
         if isinstance(result, dict):
             if result.get("ok"):
                 response = result.get("response", "") or ""
@@ -386,7 +391,7 @@ im_desp: {q['im_desp']}
         response = result or ""
 
     while not response:
-        result = call_gemini_api_with_rotation(batched_prompt, return_structured=True)
+        result = call_gemini_api_with_rotation(batched_prompt, return_structured=True, cache=False)
         if isinstance(result, dict):
             if result.get("ok"):
                 response = result.get("response", "") or ""
@@ -529,7 +534,44 @@ def process_question_batch_task(batch, excluded_subjects=None, known_subject=Non
     return process_question_batch(batch, excluded_subjects, known_subject)
 
 
-def analyze_questions_in_batches(questions_list, chunk_size, known_subject=None, max_batch_workers=2):
+def assign_batch_subjects(question_batches):
+    """
+    Assigns a subject to each batch with the local classifier, asking Gemini only
+    for batches classified below SUBJECT_CLASSIFIER_MIN_CONFIDENCE.
+
+    Like the sequential mode, every batch gets a different subject: when two batches
+    are confidently classified as the same subject, the more confident one keeps it
+    and the other is inferred by Gemini with every subject assigned so far excluded.
+
+    Returns:
+        list: Subject per batch, in batch order
+    """
+    threshold = subject_min_confidence()
+    classified = [classify_questions(batch) for batch in question_batches]
+
+    # Most confident batch per subject (the earlier batch on ties)
+    owners = {}
+    for idx, (subject, confidence) in enumerate(classified):
+        if subject and confidence >= threshold and (subject not in owners or confidence > classified[owners[subject]][1]):
+            owners[subject] = idx
+    assigned = list(owners)
+
+    batch_subjects = []
+    for idx, (batch, (subject, confidence)) in enumerate(zip(question_batches, classified)):
+        if owners.get(subject) == idx:
+            logger.info(f"📘 Batch {idx + 1}: {subject} (local classifier, confidence {confidence:.2f})")
+        else:
+            if subject and confidence >= threshold:
+                logger.info(f"📘 Batch {idx + 1}: {subject} already taken by batch {owners[subject] + 1}, asking Gemini")
+            else:
+                logger.info(f"📘 Batch {idx + 1}: low confidence ({subject}, {confidence:.2f}), asking Gemini")
+            subject = infer_subject_with_gemini(batch, list(assigned))
+            assigned.append(subject)
+        batch_subjects.append(subject)
+    return batch_subjects
+
+
+def analyze_questions_in_batches(questions_list, chunk_size, known_subject=None, max_batch_workers=2, batches=None):
     """
     Takes a full list of questions (e.g., 180), splits into 45-question chunks,
     and processes each using Celery workers with subject detection, metadata, feedback, and error analysis.
@@ -538,15 +580,21 @@ def analyze_questions_in_batches(questions_list, chunk_size, known_subject=None,
         questions_list: List of question dicts to process
         chunk_size: Number of questions per batch (e.g., 45)
         known_subject: If provided (from admin metadata), batches run in PARALLEL via Celery.
-                      If None, batches run SEQUENTIALLY with subject inference.
+                      If None, each batch's subject comes from assign_batch_subjects and
+                      batches still run in PARALLEL; with LOCAL_SUBJECT_CLASSIFIER off they
+                      run SEQUENTIALLY with subject inference.
         max_batch_workers: Max parallel Celery tasks when known_subject is provided (default: 2)
+        batches: Pre-planned lists of questions (see chunk_planner.plan_analysis_batches);
+                 replaces the fixed chunk_size split when given
     
     Returns:
         List of processed question results with metadata, feedback, and errors
     
     Behavior:
         - known_subject provided: Batches processed in parallel via Celery group (faster)
-        - known_subject=None: Batches processed sequentially to ensure unique subject per batch
+        - known_subject=None: Subjects classified locally, then batches processed in parallel
+        - known_subject=None and LOCAL_SUBJECT_CLASSIFIER off: Batches processed sequentially
+          to ensure unique subject per batch
     """
     # Close any stale DB connections before spawning tasks (Django thread safety)
     try:
@@ -556,23 +604,37 @@ def analyze_questions_in_batches(questions_list, chunk_size, known_subject=None,
         pass  # Not in Django context
 
     results = []
-    question_batches = list(chunk_questions(questions_list, chunk_size))
-    logger.info(f"🔄 Total Batches: {len(question_batches)} (each of {chunk_size} questions)")
+    if batches is not None:
+        question_batches = list(batches)
+        logger.info(f"🔄 Total Batches: {len(question_batches)} (sizes {[len(b) for b in question_batches]})")
+    else:
+        question_batches = list(chunk_questions(questions_list, chunk_size))
+        logger.info(f"🔄 Total Batches: {len(question_batches)} (each of {chunk_size} questions)")
     
     # Check if we're running inside a Celery task
     in_celery_task = _is_running_in_celery_task()
-    
+
+    # Subject of every batch: from metadata, or from the local classifier (LLM only
+    # for low-confidence batches) so the batches can still run in parallel
     if known_subject:
+        batch_subjects = [known_subject] * len(question_batches)
+    elif getattr(settings, 'LOCAL_SUBJECT_CLASSIFIER', True):
+        batch_subjects = assign_batch_subjects(question_batches)
+    else:
+        batch_subjects = None
+
+    if batch_subjects:
+        subjects_label = known_subject or ",".join(batch_subjects)
         if in_celery_task:
             # FALLBACK MODE: We're already in a Celery task, use local ThreadPool to avoid .get() blocking
-            logger.info(f"⚙️ Running inside Celery task - using local ThreadPool for batch processing (subject={known_subject}, workers={max_batch_workers})")
+            logger.info(f"⚙️ Running inside Celery task - using local ThreadPool for batch processing (subject={subjects_label}, workers={max_batch_workers})")
             
             # Process batches locally using ThreadPoolExecutor
             with ThreadPoolExecutor(max_workers=max_batch_workers) as executor:
                 # Submit all batch jobs
                 future_to_batch = {
-                    executor.submit(process_question_batch, batch, None, known_subject): idx
-                    for idx, batch in enumerate(question_batches)
+                    executor.submit(process_question_batch, batch, None, batch_subject): idx
+                    for idx, (batch, batch_subject) in enumerate(zip(question_batches, batch_subjects))
                 }
                 
                 # Collect results as they complete
@@ -596,12 +658,12 @@ def analyze_questions_in_batches(questions_list, chunk_size, known_subject=None,
                         results.extend(batch_result)
         else:
             # PARALLEL MODE: Not in a Celery task, safe to use Celery group
-            logger.info(f"🚀 Celery parallel batch processing enabled (subject={known_subject}, max_workers={max_batch_workers})")
+            logger.info(f"🚀 Celery parallel batch processing enabled (subject={subjects_label}, max_workers={max_batch_workers})")
             
             # Create Celery group with all batch tasks
             batch_tasks = [
-                process_question_batch_task.s(batch, None, known_subject)
-                for batch in question_batches
+                process_question_batch_task.s(batch, None, batch_subject)
+                for batch, batch_subject in zip(question_batches, batch_subjects)
             ]
             
             # Execute all tasks in parallel and collect results
@@ -0,0 +1,163 @@
+"""
+Token-budgeted chunk planning for question extraction and analysis.
+
+Fixed chunk sizes (4 extraction chunks, 45 questions per analysis batch) ignore how
+long the questions are: diagram-heavy physics chunks time out while short sections
+waste round trips. The planner estimates prompt + output tokens per question and
+packs consecutive questions into balanced chunks that stay under a budget:
+
+- EXTRACTION_CHUNK_TOKEN_BUDGET: per extract_chunk_subtask call
+- ANALYSIS_CHUNK_TOKEN_BUDGET: per process_question_batch call
+
+Chunk parallelism is derived from the global LLM limiter (LLM_CONCURRENCY) and the
+number of LLM calls each chunk makes at once.
+"""
+import math
+import re
+from django.conf import settings
+from exam.utils.analysis_generator import LLM_CONCURRENCY
+
+CHARS_PER_TOKEN = 4
+DEFAULT_QUESTION_TOKENS = 250  # used when the OCR output can't place a question
+JSON_OVERHEAD_TOKENS = 30  # keys, quotes and option labels of one extracted question
+DIAGRAM_TOKENS = 150  # im_desp written for each figure of a question
+ANALYSIS_PROMPTS = 3  # metadata, feedback and error prompts each carry the question
+ANALYSIS_OUTPUT_TOKENS = 450  # metadata + 4 option feedbacks + 4 error types
+
+# Markdown image references in Mistral OCR output: ![img-0.jpeg](img-0.jpeg)
+IMAGE_REF_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+
+
+def estimate_tokens(text):
+    """Rough token count of a piece of text (about 4 characters per token)."""
+    return math.ceil(len(str(text or "")) / CHARS_PER_TOKEN)
+
+
+def llm_workers(calls_per_chunk, chunks):
+    """
+    Number of chunks to run at once so the LLM calls they make together fit the limiter.
+
+    Args:
+        calls_per_chunk (int): LLM calls one chunk has in flight at the same time
+        chunks (int): Number of planned chunks
+    """
+    return max(1, min(chunks, LLM_CONCURRENCY // max(1, calls_per_chunk)))
+
+
+def pack_chunks(weights, budget):
+    """
+    Splits weighted items into consecutive, roughly equal chunks under a token budget.
+
+    Uses the fewest chunks the budget allows and balances them, so a paper just over
+    the budget becomes two even halves rather than a full chunk and a tiny tail.
+    An item heavier than the budget gets a chunk of its own. When no balanced split
+    fits, consecutive items are packed greedily instead.
+
+    Args:
+        weights (list): [(key, tokens)] in order
+        budget (int): Token budget per chunk
+
+    Returns:
+        list: Lists of keys, one per chunk
+    """
+    if not weights:
+        return []
+    budget = max(1, budget)
+    total = sum(w for _, w in weights)
+    count = max(1, math.ceil(total / budget))
+
+    while True:
+        target = total / count
+        chunks, loads = [[]], [0]
+        done = 0
+        for key, weight in weights:
+            # Start a new chunk once this item's midpoint passes the next boundary
+            if chunks[-1] and len(chunks) < count and done + weight / 2 > target * len(chunks):
+                chunks.append([])
+                loads.append(0)
+            chunks[-1].append(key)
+            loads[-1] += weight
+            done += weight
+        overfull = any(load > budget and len(chunk) > 1 for chunk, load in zip(chunks, loads))
+        if not overfull:
+            break
+        if count >= len(weights):
+            # Uneven weights defeat balancing: pack greedily so no chunk exceeds the budget
+            chunks, loads = [[]], [0]
+            for key, weight in weights:
+                if chunks[-1] and loads[-1] + weight > budget:
+                    chunks.append([])
+                    loads.append(0)
+                chunks[-1].append(key)
+                loads[-1] += weight
+            break
+        count += 1
+
+    # A heavy item can leave small neighbours in chunks of their own; fold them together
+    merged, merged_loads = [chunks[0]], [loads[0]]
+    for chunk, load in zip(chunks[1:], loads[1:]):
+        if merged_loads[-1] + load <= min(target, budget):
+            merged[-1] = merged[-1] + chunk
+            merged_loads[-1] += load
+        else:
+            merged.append(chunk)
+            merged_loads.append(load)
+    return merged
+
+
+def extraction_question_tokens(markdown):
+    """
+    Prompt + output tokens of extracting one question, from its OCR markdown.
+
+    The question's text is read once (its share of the page) and written back as
+    JSON, and every figure adds an image description.
+    """
+    diagrams = len(IMAGE_REF_RE.findall(markdown or ""))
+    text_tokens = estimate_tokens(IMAGE_REF_RE.sub("", markdown or ""))
+    return 2 * text_tokens + JSON_OVERHEAD_TOKENS + diagrams * DIAGRAM_TOKENS
+
+
+def plan_extraction_ranges(markdown_by_qnum, total_questions, budget=None):
+    """
+    Plans questions_extract chunks over questions 1..total_questions.
+
+    Args:
+        markdown_by_qnum (dict): {question_number: OCR markdown of the question}
+        total_questions (int): Number of questions in the paper
+        budget (int): Tokens per chunk (default: settings.EXTRACTION_CHUNK_TOKEN_BUDGET)
+
+    Returns:
+        list: (start, end) question ranges
+    """
+    budget = budget or getattr(settings, 'EXTRACTION_CHUNK_TOKEN_BUDGET', 12000)
+    known = {q: extraction_question_tokens(md) for q, md in markdown_by_qnum.items() if 1 <= q <= total_questions}
+    # Questions the OCR couldn't place cost as much as a typical placed one
+    fallback = sorted(known.values())[len(known) // 2] if known else DEFAULT_QUESTION_TOKENS
+    weights = [(q, known.get(q, fallback)) for q in range(1, total_questions + 1)]
+    return [(chunk[0], chunk[-1]) for chunk in pack_chunks(weights, budget)]
+
+
+def analysis_question_tokens(question):
+    """Prompt + output tokens of analysing one question dict from analyse_questions."""
+    content = " ".join(str(part or "") for part in (
+        question.get("question_text"), *question.get("options", []),
+        question.get("correct_answer"), question.get("im_desp"),
+    ))
+    return ANALYSIS_PROMPTS * (estimate_tokens(content) + JSON_OVERHEAD_TOKENS) + ANALYSIS_OUTPUT_TOKENS
+
+
+def plan_analysis_batches(questions_list, budget=None):
+    """
+    Plans analyze_questions_in_batches batches in question_number order.
+
+    Args:
+        questions_list (list): Question dicts with question_text, options, correct_answer, im_desp
+        budget (int): Tokens per batch (default: settings.ANALYSIS_CHUNK_TOKEN_BUDGET)
+
+    Returns:
+        list: Lists of question dicts, one per batch
+    """
+    budget = budget or getattr(settings, 'ANALYSIS_CHUNK_TOKEN_BUDGET', 36000)
+    ordered = sorted(questions_list, key=lambda q: int(q["question_number"]))
+    weights = [(idx, analysis_question_tokens(q)) for idx, q in enumerate(ordered)]
+    return [[ordered[idx] for idx in chunk] for chunk in pack_chunks(weights, budget)]
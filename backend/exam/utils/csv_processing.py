@@ -134,16 +134,15 @@ def find_actual_file(base_path):
     return None
 
 
-def get_answer_dict(path):
+def read_answer_key(path):
     """
-    Return {question_number(str): answer(str 1-4)} for CSV/XLS/XLSX with
-    'Question Number' and 'Answer' cols (case/space agnostic).
-    Handles answers as A-D, 1-4, 1.0-4.0.
+    Loads an answer key CSV/XLS/XLSX into a DataFrame with stripped, lower-cased
+    column names. Returns None when no readable file is found.
     """
     actual_path = find_actual_file(path)
     if not actual_path:
-        logger.error(f"[get_answer_dict] ❌ No valid answer key file found for {path}")
-        return {}
+        logger.error(f"[read_answer_key] ❌ No valid answer key file found for {path}")
+        return None
     try:
         ext = os.path.splitext(actual_path)[1].lower()
         reader_map = {
@@ -151,13 +150,30 @@ def get_answer_dict(path):
             ".xls": pd.read_excel,
             ".xlsx": pd.read_excel,
         }
+        if ext not in reader_map:
+            logger.error(f"[read_answer_key] ❌ Unsupported file extension: {ext}")
+            return None
         with default_storage.open(actual_path, "rb") as f:
-            if ext in reader_map:
-                df = reader_map[ext](f)
-            else:
-                logger.error(f"[get_answer_dict] ❌ Unsupported file extension: {ext}")
-                return {}
+            df = reader_map[ext](f)
         df.columns = df.columns.str.strip().str.lower()
+        return df
+    except Exception as e:
+        logger.error(f"[read_answer_key] ❌ {e}")
+        return None
+
+
+def get_answer_dict(path, df=None):
+    """
+    Return {question_number(str): answer(str 1-4)} for CSV/XLS/XLSX with
+    'Question Number' and 'Answer' cols (case/space agnostic).
+    Handles answers as A-D, 1-4, 1.0-4.0.
+    Pass `df` (from read_answer_key) to reuse an answer key that is already loaded.
+    """
+    if df is None:
+        df = read_answer_key(path)
+    if df is None:
+        return {}
+    try:
         if {"question number", "answer"} - set(df.columns):
             raise ValueError("File must contain 'Question Number' and 'Answer' columns")
         df = df.dropna(subset=["question number", "answer"])
@@ -256,28 +272,19 @@ def get_student_response(answer_sheet_path, class_id):
         logger.error(f"❌ Error reading answer sheet: {e}")
     return data
 
-def get_subject_from_answer_key(path: str):
+def get_subject_from_answer_key(path: str, df=None):
     """
     Checks for a 'Subject' column in the answer key and returns the subject.
+    Pass `df` (from read_answer_key) to reuse an answer key that is already loaded.
     """
-    actual_path = find_actual_file(path)
-    if not actual_path:
+    if df is None:
+        df = read_answer_key(path)
+    if df is None:
         return None
     try:
-        ext = os.path.splitext(actual_path)[1].lower()
-        if ext == '.csv':
-            with default_storage.open(actual_path, "rb") as f:
-                df = pd.read_csv(TextIOWrapper(f, encoding="utf-8-sig"))
-        elif ext in ['.xls', '.xlsx']:
-            with default_storage.open(actual_path, "rb") as f:
-                df = pd.read_excel(f)
-        else:
-            return None
-
-        df.columns = df.columns.str.strip().str.lower()
         if "subject" in df.columns:
             return df["subject"].iloc[0]
         return None
     except Exception as e:
         logger.error(f"[get_subject_from_answer_key] ❌ {e}")
-        return None
\ No newline at end of file
+        return None
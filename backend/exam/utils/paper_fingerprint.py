@@ -0,0 +1,178 @@
+"""
+Fingerprints for reusing question extraction and analysis across classes.
+
+Institutions often upload the same question paper for several classes. Two
+fingerprints let a later upload skip the LLM work already done for an earlier one:
+
+- pdf_hash: sha256 of the question paper PDF. A match means the OCR +
+  questions_extract output (QuestionPaper rows) can be cloned.
+- content_hash: sha256 of a question's normalized subject, text, options and
+  correct answer. A match means its QuestionAnalysis (metadata, feedback,
+  error types) can be cloned instead of re-running analyze_questions_in_batches.
+"""
+import hashlib
+import logging
+import re
+from django.conf import settings
+from django.core.files.storage import default_storage
+from exam.models.analysis import QuestionAnalysis
+from exam.models.question_paper import QuestionPaper, QuestionPaperFingerprint
+
+logger = logging.getLogger(__name__)
+
+# QuestionAnalysis fields copied to the new class (everything but identity)
+ANALYSIS_FIELDS = (
+    "subject", "chapter", "topic", "subtopic", "typeOfquestion", "question_text", "im_desp",
+    "option_1", "option_2", "option_3", "option_4", "correct_answer",
+    "option_1_feedback", "option_2_feedback", "option_3_feedback", "option_4_feedback",
+    "option_1_type", "option_2_type", "option_3_type", "option_4_type",
+    "option_1_misconception", "option_2_misconception", "option_3_misconception", "option_4_misconception",
+)
+
+
+def reuse_enabled():
+    return getattr(settings, 'REUSE_QUESTION_ANALYSIS', True)
+
+
+def normalize_text(text):
+    """Lower-cases and collapses whitespace so OCR spacing differences don't change the hash."""
+    return re.sub(r"\s+", " ", str(text or "")).strip().lower()
+
+
+def question_fingerprint(subject, question_text, options, correct_answer):
+    """
+    Content hash of one question.
+
+    Args:
+        subject (str): Subject the question is analysed under
+        question_text (str): Question text
+        options (list): The four option texts
+        correct_answer (str): Correct option text
+    """
+    parts = [subject, question_text, *options, correct_answer]
+    payload = "\x1f".join(normalize_text(p) for p in parts)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def pdf_fingerprint(pdf_path):
+    """sha256 of a stored PDF, or None when it can't be read."""
+    try:
+        digest = hashlib.sha256()
+        with default_storage.open(pdf_path, 'rb') as pdf_file:
+            for chunk in iter(lambda: pdf_file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not fingerprint {pdf_path}: {e}")
+        return None
+
+
+def record_paper_fingerprint(class_id, test_num, pdf_hash):
+    """Remembers which PDF a test's QuestionPaper rows were extracted from."""
+    if pdf_hash:
+        QuestionPaperFingerprint.objects.update_or_create(
+            class_id=class_id, test_num=test_num, defaults={"pdf_hash": pdf_hash}
+        )
+
+
+def find_extracted_paper(pdf_hash, class_id, test_num):
+    """
+    Finds another test already extracted from the same PDF.
+
+    Returns:
+        tuple: (class_id, test_num) of the source test, or None
+    """
+    if not pdf_hash:
+        return None
+    candidates = QuestionPaperFingerprint.objects.filter(pdf_hash=pdf_hash).exclude(
+        class_id=class_id, test_num=test_num
+    ).order_by('-updated_at')
+    for fingerprint in candidates:
+        if QuestionPaper.objects.filter(class_id=fingerprint.class_id, test_num=fingerprint.test_num).exists():
+            return fingerprint.class_id, fingerprint.test_num
+    return None
+
+
+def questions_from_paper(class_id, test_num):
+    """
+    Returns a test's QuestionPaper rows in the questions_extract format that
+    save_questions_bulk expects (correct answers are re-derived from the new key).
+    """
+    return [
+        {
+            "question_number": q.question_number,
+            "question": q.question_text,
+            "options": {"1": q.option_1, "2": q.option_2, "3": q.option_3, "4": q.option_4},
+            "im_desp": q.im_desp,
+            "subject": q.subject,
+        }
+        for q in QuestionPaper.objects.filter(class_id=class_id, test_num=test_num).order_by('question_number')
+    ]
+
+
+def assign_range_subjects(questions_list, subject_ranges):
+    """
+    Re-stamps reused questions with the subjects of admin TestMetadata ranges.
+
+    The source test may have been stamped differently (e.g. "Biology" from its class
+    name where this test's metadata says Botany/Zoology). Questions outside every
+    range are dropped, as in questions_extract_with_metadata.
+
+    Args:
+        questions_list (list): Output of questions_from_paper
+        subject_ranges (list): TestMetadata.get_subject_ranges()
+    """
+    assigned = []
+    for q in questions_list:
+        subject = next(
+            (r["subject"] for r in subject_ranges if r["start"] <= q["question_number"] <= r["end"]), None
+        )
+        if subject is None:
+            logger.warning(f"⚠️ Reused question {q['question_number']} is outside the metadata ranges; skipping")
+            continue
+        assigned.append({**q, "subject": subject})
+    return assigned
+
+
+def clone_analysed_questions(class_id, test_num, hashes_by_qnum):
+    """
+    Copies QuestionAnalysis rows of identical questions analysed for other tests.
+
+    Args:
+        hashes_by_qnum (dict): {question_number: content_hash} of the questions to fill
+
+    Returns:
+        set: Question numbers that were cloned
+    """
+    sources = {}
+    for qa in QuestionAnalysis.objects.filter(
+        content_hash__in=set(hashes_by_qnum.values())
+    ).exclude(class_id=class_id, test_num=test_num).order_by('-id'):
+        sources.setdefault(qa.content_hash, qa)
+
+    rows = [
+        QuestionAnalysis(
+            class_id=class_id, test_num=test_num, question_number=qnum, content_hash=content_hash,
+            **{field: getattr(sources[content_hash], field) for field in ANALYSIS_FIELDS}
+        )
+        for qnum, content_hash in hashes_by_qnum.items()
+        if content_hash in sources
+    ]
+    QuestionAnalysis.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["class_id", "test_num", "question_number"],
+        update_fields=list(ANALYSIS_FIELDS) + ["content_hash"],
+    )
+    return {row.question_number for row in rows}
+
+
+def stamp_content_hashes(class_id, test_num, hashes_by_qnum):
+    """Stores content hashes on freshly analysed QuestionAnalysis rows."""
+    rows = list(QuestionAnalysis.objects.filter(
+        class_id=class_id, test_num=test_num, question_number__in=list(hashes_by_qnum)
+    ))
+    for row in rows:
+        row.content_hash = hashes_by_qnum[row.question_number]
+    QuestionAnalysis.objects.bulk_update(rows, ["content_hash"], batch_size=500)
@@ -1,10 +1,15 @@
 import fitz  # PyMuPDF
+import hashlib
 import json
 import re
 import os
 import time
 from io import BytesIO
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterable, Optional
+from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from celery.exceptions import TimeoutError
@@ -15,9 +20,17 @@ from exam.llm_call.prompts import ocr_image_prompt as ocr_prompt
 from exam.llm_call.gemini_api import call_gemini_api_with_rotation
 from exam.llm_call.decorators import traceable
 from exam.llm_call.mistral_api import call_mistrall_ocr_api_with_rotation
+from exam.utils.chunk_planner import plan_extraction_ranges, llm_workers
 
 logger = logging.getLogger(__name__)
 
+# Pillow is only needed for WebP page images
+try:
+    import PIL  # noqa: F401
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
 class JsonParseError(Exception):
     """Raised when the JSON is malformed or cannot be loaded."""
     pass
@@ -29,18 +42,181 @@ class QuestionFieldError(Exception):
 
 
 # --- PDF to images ---
+# Pages are rasterized in the calling process from one open document (PyMuPDF is not
+# thread-safe, and Celery prefork workers can't start child processes). Resolution,
+# image format and a per-page size limit come from PDF_RENDER_* settings; an oversized
+# page is re-rendered at a lower resolution so memory and request size stay bounded.
+
+IMAGE_FORMATS = {"png": "png", "jpg": "jpeg", "jpeg": "jpeg", "webp": "webp"}
+IMAGE_EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+JPEG_QUALITY = 85
+MIN_RENDER_DPI = 50
+
+def _image_format(name: str) -> str:
+    fmt = IMAGE_FORMATS.get(str(name).lower(), "png")
+    if fmt == "webp" and not PIL_AVAILABLE:
+        logger.warning("⚠️ WebP page images need Pillow; rendering JPEG instead")
+        fmt = "jpeg"
+    return fmt
+
+def render_options():
+    """(dpi, format, max_bytes) from PDF_RENDER_DPI, PDF_RENDER_FORMAT and PDF_RENDER_MAX_BYTES."""
+    return (
+        int(getattr(settings, 'PDF_RENDER_DPI', 72)),
+        _image_format(getattr(settings, 'PDF_RENDER_FORMAT', 'png')),
+        int(getattr(settings, 'PDF_RENDER_MAX_BYTES', 0)),
+    )
+
+def _encode_pixmap(pix, fmt: str) -> bytes:
+    if fmt == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=JPEG_QUALITY)
+    if fmt == "webp":
+        return pix.pil_tobytes(format="WEBP", quality=JPEG_QUALITY)
+    return pix.tobytes("png")
+
+def _render_page(page, dpi: int, fmt: str, max_bytes: int) -> bytes:
+    """Renders one grayscale page, lowering the resolution until it fits max_bytes."""
+    while True:
+        data = _encode_pixmap(page.get_pixmap(colorspace=fitz.csGRAY, dpi=dpi), fmt)
+        if not max_bytes or len(data) <= max_bytes or dpi <= MIN_RENDER_DPI:
+            return data
+        dpi = max(MIN_RENDER_DPI, int(dpi * 0.75))
+
+def render_pdf_pages(pdf_bytes: bytes, dpi: Optional[int] = None, fmt: Optional[str] = None,
+                     max_bytes: Optional[int] = None, pages: Optional[Iterable[int]] = None) -> List[BytesIO]:
+    """
+    Rasterizes the pages of a PDF.
+
+    Args:
+        pdf_bytes: PDF file content
+        dpi, fmt, max_bytes: Override the PDF_RENDER_* settings (see render_options)
+        pages: 0-based page numbers to render (e.g. range(1) for the first page);
+            all pages when omitted, numbers past the last page are skipped
 
-def pdf_to_images(pdf_path: str) -> List[BytesIO]:
-    image_data_list = []
+    Returns:
+        list: One BytesIO per rendered page, in page order
+    """
+    default_dpi, default_fmt, default_max = render_options()
+    dpi = dpi or default_dpi
+    fmt = _image_format(fmt) if fmt else default_fmt
+    max_bytes = default_max if max_bytes is None else max_bytes
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+        page_numbers = range(pdf_document.page_count)
+        if pages is not None:
+            wanted = set(pages)
+            page_numbers = [n for n in page_numbers if n in wanted]
+        rendered = [_render_page(pdf_document.load_page(n), dpi, fmt, max_bytes) for n in page_numbers]
+
+    logger.info(f"🖼️ Rendered {len(rendered)} pages as {fmt} at {dpi} dpi ({sum(map(len, rendered)) // 1024} KB)")
+    return [BytesIO(data) for data in rendered]
+
+def pdf_to_images(pdf_path: str, pages: Optional[Iterable[int]] = None) -> List[BytesIO]:
+    """Renders a stored PDF; `pages` limits it to some 0-based page numbers."""
     with default_storage.open(pdf_path, 'rb') as pdf_file:
-        pdf_bytes = pdf_file.read()
-        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        for page_number in range(pdf_document.page_count):
-            page = pdf_document.load_page(page_number)
-            pix = page.get_pixmap(colorspace=fitz.csGRAY)
-            img_io = BytesIO(pix.tobytes("png"))
-            image_data_list.append(img_io)
-    return image_data_list
+        return render_pdf_pages(pdf_file.read(), pages=pages)
+
+# --- Extraction artifacts ---
+# Page images and the Mistral OCR output of a question paper are stored under the
+# test's upload prefix (artifacts/), in a directory named after the PDF's hash (and,
+# for pages, the render settings). The metadata path, questions_extract, the per-range
+# fallback and task retries all share them, so a test is rasterized and OCR'd once per
+# PDF version. manifest.json points at the current artifacts.
+
+ARTIFACT_DIR = "artifacts"
+
+def _artifact_path(test_path: str, name: str) -> str:
+    return os.path.join(test_path, ARTIFACT_DIR, name)
+
+def _save_artifact(path: str, content, overwrite: bool = True) -> None:
+    """
+    Stores an artifact. With overwrite an existing file is deleted first (FileSystemStorage
+    would otherwise save under a new name); paths under a new version directory skip that probe.
+    """
+    if overwrite and default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(content))
+
+def _read_artifact(path: str) -> bytes:
+    with default_storage.open(path, 'rb') as f:
+        return f.read()
+
+def load_extraction_artifacts(pdf_path: str, test_path: str):
+    """
+    Returns the page images and OCR text of a question paper, reusing stored artifacts.
+
+    Args:
+        pdf_path: Path to the question paper PDF
+        test_path: Upload prefix of the test; artifacts live under <test_path>/artifacts/
+
+    Returns:
+        tuple: (images, ocr_text)
+    """
+    pdf_bytes = _read_artifact(pdf_path)
+    pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    manifest_path = _artifact_path(test_path, "manifest.json")
+
+    manifest = {}
+    try:
+        manifest = json.loads(_read_artifact(manifest_path))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"[ARTIFACTS] ⚠️ Unreadable manifest at {manifest_path}: {e}")
+    if manifest.get("pdf_hash") != pdf_hash:
+        # New or re-uploaded PDF: stored artifacts (if any) belong to another version
+        manifest = {"pdf_hash": pdf_hash}
+    changed = False
+
+    # Pages rendered with other PDF_RENDER_* settings are rendered again
+    dpi, fmt, max_bytes = render_options()
+    render = f"{fmt}-{dpi}dpi-{max_bytes}"
+    pages_dir = f"{pdf_hash[:16]}/{render}"
+    extension = IMAGE_EXTENSIONS[fmt]
+
+    images = None
+    if manifest.get("pages") and manifest.get("render") == render:
+        try:
+            images = [
+                BytesIO(_read_artifact(_artifact_path(test_path, f"{pages_dir}/page_{i:03d}.{extension}")))
+                for i in range(manifest["pages"])
+            ]
+            logger.info(f"[ARTIFACTS] ♻️ Reusing {len(images)} rendered pages from {test_path}")
+        except Exception as e:
+            logger.warning(f"[ARTIFACTS] ⚠️ Stored pages unusable, re-rendering: {e}")
+            images = None
+    if images is None:
+        # The directory is new unless the manifest already pointed at it (unusable pages)
+        overwrite = manifest.get("render") == render
+        images = render_pdf_pages(pdf_bytes, dpi, fmt, max_bytes)
+        for i, img in enumerate(images):
+            _save_artifact(_artifact_path(test_path, f"{pages_dir}/page_{i:03d}.{extension}"), img.getvalue(), overwrite)
+        manifest["pages"] = len(images)
+        manifest["render"] = render
+        changed = True
+
+    ocr_text = None
+    ocr_path = _artifact_path(test_path, f"{pdf_hash[:16]}/ocr.json")
+    if manifest.get("ocr"):
+        try:
+            ocr_text = _read_artifact(ocr_path).decode("utf-8")
+            logger.info(f"[ARTIFACTS] ♻️ Reusing OCR output from {test_path}")
+        except Exception as e:
+            logger.warning(f"[ARTIFACTS] ⚠️ Stored OCR unusable, calling OCR again: {e}")
+    if not ocr_text:
+        ocr_text = call_mistrall_ocr_api_with_rotation(pdf_path)
+        markdown_content = f"# OCR Result\n\n```json\n{ocr_text}\n```"
+        markdown_path = os.path.join(test_path, "ocr_output.md")
+        default_storage.save(markdown_path, ContentFile(markdown_content))
+        logger.info(f"[ARTIFACTS] ✅ OCR data saved as Markdown at: {markdown_path}")
+        if ocr_text:
+            _save_artifact(ocr_path, ocr_text.encode("utf-8"), bool(manifest.get("ocr")))
+            manifest["ocr"] = True
+            changed = True
+
+    if changed:
+        _save_artifact(manifest_path, json.dumps(manifest))
+    return images, ocr_text
 
 # --- Parsing ---
 
@@ -106,9 +282,9 @@ def get_total_questions(images: List[BytesIO]) -> int:
         raise
 
 @traceable()
-def extract_text_from_images(images: List[BytesIO], start: int, end: int) -> str:
+def extract_text_from_images(images: List[BytesIO], start: int, end: int, cache: Optional[bool] = None) -> str:
     prompt = f"extract from question number {start} till {end}" + ocr_prompt
-    result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", images, return_structured=True)
+    result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", images, return_structured=True, cache=cache)
     if isinstance(result, dict):
         if result.get("ok"):
             return result.get("response", "") or ""
@@ -117,9 +293,9 @@ def extract_text_from_images(images: List[BytesIO], start: int, end: int) -> str
     return result or ""
 
 @traceable()
-def extract_text_from_content(ocr: str, start: int, end: int) -> str:
+def extract_text_from_content(ocr: str, start: int, end: int, cache: Optional[bool] = None) -> str:
     prompt = f"extract from question number {start} till {end}" + str(ocr_prompt) + ocr
-    result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True)
+    result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", return_structured=True, cache=cache)
     if isinstance(result, dict):
         if result.get("ok"):
             return result.get("response", "") or ""
@@ -127,10 +303,66 @@ def extract_text_from_content(ocr: str, start: int, end: int) -> str:
         return ""
     return result or ""
 
+def _similar(a, b, threshold: float = 0.9) -> bool:
+    a = re.sub(r"\s+", " ", str(a or "")).strip().lower()
+    b = re.sub(r"\s+", " ", str(b or "")).strip().lower()
+    return a == b or SequenceMatcher(None, a, b).ratio() >= threshold
+
+def consistent_extraction(r1: str, r2: str, start: int, end: int) -> Optional[str]:
+    """
+    Returns the image-based extraction as clean JSON when both sources parse into the
+    complete start..end question set and agree on every question and option text;
+    None when the merge call is still needed.
+    """
+    try:
+        from_images = parse_questions_or_raise(r1)["questions"]
+        from_content = parse_questions_or_raise(r2)["questions"]
+    except (JsonParseError, QuestionFieldError, ValueError, TypeError):
+        return None
+
+    expected = set(range(start, end + 1))
+    by_number = {q["question_number"]: q for q in from_content}
+    if (len(from_images) != len(expected) or {q["question_number"] for q in from_images} != expected
+            or len(from_content) != len(expected) or set(by_number) != expected):
+        return None
+
+    merged = []
+    for q in from_images:
+        other = by_number[q["question_number"]]
+        if not _similar(q["question"], other["question"]):
+            return None
+        if not all(_similar(q["options"][opt], other["options"][opt]) for opt in ("1", "2", "3", "4")):
+            return None
+        if q["im_desp"] == "NULL" and other["im_desp"] != "NULL":
+            q = {**q, "im_desp": other["im_desp"]}
+        merged.append(q)
+    return json.dumps({"questions": merged})
+
 @traceable()
-def extract_text(ocr: str, start: int, end: int, images: List[BytesIO]) -> str:
-    r1 = extract_text_from_images(images, start, end)
-    r2 = extract_text_from_content(ocr, start, end)
+def extract_text(ocr: str, start: int, end: int, images: List[BytesIO], skip_merge: Optional[bool] = None,
+                 cache: Optional[bool] = None) -> str:
+    """
+    Extracts questions start..end from the page images and the OCR text concurrently,
+    then merges both outputs with a third call.
+
+    Args:
+        skip_merge: Return the image extraction directly when both sources are complete
+            and consistent; defaults to settings.EXTRACTION_SKIP_CONSISTENT_MERGE
+        cache: Passed to every LLM call; False when re-asking after a rejected output
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        images_future = executor.submit(extract_text_from_images, images, start, end, cache)
+        content_future = executor.submit(extract_text_from_content, ocr, start, end, cache)
+        r1, r2 = images_future.result(), content_future.result()
+
+    if skip_merge is None:
+        skip_merge = getattr(settings, 'EXTRACTION_SKIP_CONSISTENT_MERGE', False)
+    if skip_merge:
+        agreed = consistent_extraction(r1, r2, start, end)
+        if agreed is not None:
+            logger.info(f"[CHUNK {start}-{end}] ✅ Image and OCR extractions agree, merge call skipped")
+            return agreed
+
     prompt = (
         f"The questions range from number {start} to {end}.\n"
         "I have attached two OCR outputs. Generate a clean JSON with:\n"
@@ -152,7 +384,7 @@ def extract_text(ocr: str, start: int, end: int, images: List[BytesIO]) -> str:
         "}\n"
         + r1 + "\n" + r2
     )
-    result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", images, return_structured=True)
+    result = call_gemini_api_with_rotation(prompt, "gemini-2.5-flash", images, return_structured=True, cache=cache)
     if isinstance(result, dict):
         if result.get("ok"):
             return result.get("response", "") or ""
@@ -177,16 +409,112 @@ def retry_extract_text(response: str, error: Exception) -> str:
         return ""
     return result or ""
 
+# --- Page routing ---
+# Mistral OCR returns markdown per page. Mapping question numbers to pages lets each
+# chunk send only the page images that hold its questions instead of the whole paper.
+
+# "12.", "12)", "Q12.", "Q. 12", "**12.**" at the start of a line
+QUESTION_START_RE = re.compile(r"^\s*(?:\*\*)?(?:Q\.?\s*)?(\d{1,3})\s*[.)]", re.MULTILINE)
+MAX_QUESTION_GAP = 5  # numbering may skip a few questions the OCR missed
+NUMBER_LOOKAHEAD = 6  # later line numbers checked before accepting an ambiguous one
+
+@lru_cache(maxsize=4)
+def question_segments(ocr_text: str) -> Dict[int, tuple]:
+    """
+    Returns {question_number: (page index, markdown)} from Mistral OCR JSON.
+
+    Only numbers that continue the running question sequence are accepted, so
+    numbered options ("1)", "2)") and list items inside questions are ignored:
+
+    - A number at or below the last question restarts a run (options, statements);
+      numbers continuing that run are rejected unless they are the next question
+      and don't come up again within the next few line numbers.
+    - A jump past the next question is only accepted when the next question's
+      number doesn't show up soon after (the OCR missed it).
+
+    Text at the top of a page before its first question belongs to the previous one.
+    """
+    try:
+        pages = json.loads(ocr_text).get("pages", [])
+    except (ValueError, TypeError, AttributeError):
+        return {}
+
+    pages = [(page.get("index", position), page.get("markdown", "") or "") for position, page in enumerate(pages)]
+    candidates = [
+        (page_no, int(match.group(1)), match.start())
+        for page_no, (_, markdown) in enumerate(pages)
+        for match in QUESTION_START_RE.finditer(markdown)
+    ]
+
+    starts = [[] for _ in pages]
+    last, inner = 0, None
+    for i, (page_no, qnum, pos) in enumerate(candidates):
+        upcoming = [c[1] for c in candidates[i + 1:i + 1 + NUMBER_LOOKAHEAD]]
+        if qnum <= last:
+            inner = qnum
+            continue
+        if inner is not None and qnum == inner + 1:
+            inner = qnum
+            if qnum != last + 1 or qnum in upcoming:
+                continue
+        elif qnum > last + MAX_QUESTION_GAP or (qnum > last + 1 and last + 1 in upcoming):
+            continue
+        starts[page_no].append((qnum, pos))
+        last, inner = qnum, None
+
+    segments = {}
+    for (page_idx, markdown), page_starts in zip(pages, starts):
+        head_end = page_starts[0][1] if page_starts else len(markdown)
+        if segments and head_end:
+            prev = max(segments)
+            segments[prev] = (segments[prev][0], segments[prev][1] + "\n" + markdown[:head_end])
+        for i, (qnum, pos) in enumerate(page_starts):
+            end = page_starts[i + 1][1] if i + 1 < len(page_starts) else len(markdown)
+            segments[qnum] = (page_idx, markdown[pos:end])
+    return segments
+
+@lru_cache(maxsize=4)
+def build_question_page_index(ocr_text: str) -> Dict[int, int]:
+    """Returns {question_number: page index} from Mistral OCR JSON."""
+    return {qnum: page_idx for qnum, (page_idx, _) in question_segments(ocr_text).items()}
+
+def images_for_questions(ocr_text: str, images: List[BytesIO], start: int, end: int) -> List[BytesIO]:
+    """
+    Page images covering questions start..end, or every image when the OCR
+    output can't place the range.
+
+    The range runs from the page of the last question at or before `start` to the
+    page of the first question after `end`, since a question can continue onto it.
+    """
+    index = build_question_page_index(ocr_text or "")
+    if not index or not images:
+        return images
+    known = sorted(index)
+
+    before = [q for q in known if q <= start]
+    after = [q for q in known if q > end]
+    first_page = index[before[-1]] if before else 0
+    last_page = index[after[0]] if after else len(images) - 1
+    if first_page > last_page or last_page >= len(images):
+        return images
+
+    selected = images[first_page:last_page + 1]
+    logger.info(f"[PAGE ROUTING] Q{start}-Q{end}: pages {first_page + 1}-{last_page + 1} of {len(images)}")
+    return selected
+
 # --- Chunk extraction (synchronous) ---
 @traceable()
-def extract_chunk_subtask(ocr_text, start, end, images):
+def extract_chunk_subtask(ocr_text, start, end, images, cache=None):
     """
     Synchronous chunk extraction with retry logic.
     Used by the orchestrator for both sequential and parallel execution.
+    Only the pages holding questions start..end are sent with the image requests.
+    Fresh outputs requested after a rejected one bypass the response cache.
     """
     attempt = 0
+    images = images_for_questions(ocr_text, images, start, end)
     
-    extracted_text = extract_text(ocr_text, start, end, images)
+    extracted_text = extract_text(ocr_text, start, end, images, cache=cache)
     questions = []
     while not questions:
         try:
@@ -200,18 +528,18 @@ def extract_chunk_subtask(ocr_text, start, end, images):
                 extracted_text = retry_extract_text(extracted_text, e)
             else:
                 # On final attempt, get a fresh LLM output
-                extracted_text = extract_text(ocr_text, start, end, images)
+                extracted_text = extract_text(ocr_text, start, end, images, cache=False)
                 attempt = 0
         except QuestionFieldError as e:
             logger.error(f"[CHUNK {start}-{end}] Missing fields/text error: {e}")
             # For missing question/options, no point retrying the same text: get fresh LLM output
-            extracted_text = extract_text(ocr_text, start, end, images)
+            extracted_text = extract_text(ocr_text, start, end, images, cache=False)
             attempt = 0
 
 # --- Main orchestrator (not a Celery task) ---
 
 @traceable()
-def questions_extract(pdf_path: str, test_path: str, use_parallel=True, total_questions: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+def questions_extract(pdf_path: str, test_path: str, use_parallel=True, total_questions: Optional[int] = None, artifacts=None) -> Optional[List[Dict[str, Any]]]:
     """
     Extracts questions from PDF using parallel chunk processing.
     
@@ -219,18 +547,14 @@ def questions_extract(pdf_path: str, test_path: str, use_parallel=True, total_qu
         pdf_path: Path to the PDF file
         test_path: Directory for saving outputs
         use_parallel: If True, uses Celery group for parallel extraction; if False, sequential
+        artifacts: (images, ocr_text) already loaded by the caller; loaded via
+            load_extraction_artifacts when omitted
     
     Returns:
         List of question dicts or None on failure
     """
-    # OCR and initial setup
-    all_questions = []
-    images = pdf_to_images(pdf_path)
-    ocr_text = call_mistrall_ocr_api_with_rotation(pdf_path)
-    markdown_content = f"# OCR Result\n\n```json\n{ocr_text}\n```"
-    markdown_path = os.path.join(test_path, "ocr_output.md")
-    default_storage.save(markdown_path, ContentFile(markdown_content))
-    logger.info(f"[QUESTION EXTRACTION] ✅ OCR data saved as Markdown at: {markdown_path}")
+    # OCR and initial setup (shared with the metadata path and retries)
+    images, ocr_text = artifacts or load_extraction_artifacts(pdf_path, test_path)
 
     # Use provided total_questions (from metadata) if available to avoid an LLM call
     if total_questions is not None:
@@ -240,96 +564,101 @@ def questions_extract(pdf_path: str, test_path: str, use_parallel=True, total_qu
         N = get_total_questions(images)
         logger.info(f"[QUESTION EXTRACTION] 📄 Total questions (LLM): {N}")
     
-    # Calculate chunk boundaries
-    chunk_size = int(N / 4)
-    chunks = []
-    for idx in range(4):
-        start = 1 + (idx * chunk_size)
-        # Last chunk takes any remaining questions
-        end = N if idx == 3 else start + chunk_size - 1
-        chunks.append((start, end, idx))
-
-    logger.info(f"[QUESTION EXTRACTION] 📊 Chunk boundaries: {[(s, e) for s, e, _ in chunks]}")
-
-    # We'll attempt extraction up to `max_attempts` times if the exact question count isn't met.
-    max_attempts = 3
-    for attempt in range(1, max_attempts + 1):
-        all_questions = []
-
-        if use_parallel:
-            # Parallel extraction using ThreadPoolExecutor
-            logger.info(f"[QUESTION EXTRACTION] 🚀 Attempt {attempt}/{max_attempts} - Using parallel chunk extraction")
-            from concurrent.futures import ThreadPoolExecutor, as_completed
+    # Chunk boundaries packed up to the extraction token budget
+    segments = question_segments(ocr_text or "")
+    ranges = plan_extraction_ranges({qnum: md for qnum, (_, md) in segments.items()}, N)
 
-            chunk_results = [None] * 4  # Preserve order
+    logger.info(f"[QUESTION EXTRACTION] 📊 Chunk boundaries: {ranges}")
 
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                future_to_chunk = {
-                    executor.submit(extract_chunk_subtask, ocr_text, start, end, images): (start, end, idx)
-                    for start, end, idx in chunks
-                }
-
-                for future in as_completed(future_to_chunk):
-                    start, end, idx = future_to_chunk[future]
-                    try:
-                        questions = future.result()
-                        chunk_results[idx] = questions
-                        logger.info(f"[QUESTION EXTRACTION] ✅ Chunk {idx + 1}/4 completed (Q{start}-Q{end}): {len(questions.get('questions', []))} questions")
-                    except Exception as e:
-                        logger.error(f"[QUESTION EXTRACTION] ❌ Chunk {idx + 1}/4 failed (Q{start}-Q{end}): {e}")
-                        chunk_results[idx] = None
-
-            # Merge results in order
-            for idx, result in enumerate(chunk_results):
-                if result and 'questions' in result:
-                    all_questions.extend(result['questions'])
+    # Questions accepted so far survive across attempts; retries only re-extract the gaps.
+    accepted = {}
+    max_attempts = 3
+    for attempt in range(1, max_attempts + 1):
+        mode = "parallel" if use_parallel else "sequential"
+        logger.info(f"[QUESTION EXTRACTION] 🚀 Attempt {attempt}/{max_attempts} - {mode} extraction of {len(ranges)} range(s): {ranges}")
+
+        # Re-extracted gaps must not be served the cached outputs that dropped them
+        cache = False if attempt > 1 else None
+        for (start, end), result in zip(ranges, extract_ranges(ocr_text, images, ranges, use_parallel, cache=cache)):
+            if not result or 'questions' not in result:
+                logger.error(f"[QUESTION EXTRACTION] ❌ Range Q{start}-Q{end} returned no valid results")
+                continue
+            for q in result['questions']:
+                qnum = q.get('question_number')
+                if not isinstance(qnum, int) or not 1 <= qnum <= N:
+                    logger.warning(f"[QUESTION EXTRACTION] ⚠️ Ignoring out-of-range question number {qnum}")
+                elif qnum in accepted:
+                    logger.debug(f"[QUESTION EXTRACTION] Duplicate question number {qnum}, keeping first occurrence")
                 else:
-                    logger.error(f"[QUESTION EXTRACTION] ❌ Chunk {idx + 1}/4 returned no valid results")
-        else:
-            # Sequential extraction (original behavior)
-            logger.info(f"[QUESTION EXTRACTION] 🔄 Attempt {attempt}/{max_attempts} - Using sequential chunk extraction")
-            for start, end, idx in chunks:
-                questions = extract_chunk_subtask(ocr_text, start, end, images)
-                logger.info(f"[QUESTION EXTRACTION] ✅ Extracted questions from {start} to {end}")
-                if questions and 'questions' in questions:
-                    all_questions.extend(questions["questions"])
-
-        # Deduplicate by question_number (keep first occurrence)
-        seen = set()
-        deduped_questions = []
-        for q in all_questions:
-            qnum = q.get('question_number')
-            if qnum not in seen:
-                seen.add(qnum)
-                deduped_questions.append(q)
-            else:
-                logger.warning(f"[QUESTION EXTRACTION] ⚠️ Duplicate question number {qnum} found, keeping first occurrence")
+                    accepted[qnum] = q
 
-        logger.info(f"[QUESTION EXTRACTION] 📊 Attempt {attempt}/{max_attempts} - Total extracted: {len(all_questions)}, After dedup: {len(deduped_questions)}, Expected: {N}")
+        missing = [qnum for qnum in range(1, N + 1) if qnum not in accepted]
+        logger.info(f"[QUESTION EXTRACTION] 📊 Attempt {attempt}/{max_attempts} - Accepted: {len(accepted)}, Missing: {len(missing)}, Expected: {N}")
 
-        # Require exact match now. If mismatch, retry up to max_attempts.
-        if len(deduped_questions) == N:
+        if not missing:
+            deduped_questions = [accepted[qnum] for qnum in range(1, N + 1)]
             question_paper_json_path = os.path.join(test_path, "qp.json")
             json_data = json.dumps(deduped_questions, indent=4)
             default_storage.save(question_paper_json_path, ContentFile(json_data))
             logger.info(f"[QUESTION EXTRACTION] ✅ Saved {len(deduped_questions)} questions to {question_paper_json_path}")
             return deduped_questions
+
+        if attempt < max_attempts:
+            ranges = missing_ranges(missing)
+            logger.info(f"[QUESTION EXTRACTION] 🔄 Re-extracting only missing questions {missing[:20]}{'...' if len(missing) > 20 else ''}")
         else:
-            logger.warning(f"[QUESTION EXTRACTION] ⚠️ Extraction count mismatch: {len(deduped_questions)}/{N} on attempt {attempt}/{max_attempts}")
-            if attempt < max_attempts:
-                logger.info(f"[QUESTION EXTRACTION] 🔄 Retrying extraction (attempt {attempt + 1}/{max_attempts})")
-                continue
-            else:
-                logger.error(f"[QUESTION EXTRACTION] ❌ Extraction incomplete after {max_attempts} attempts: {len(deduped_questions)}/{N}")
-                return None
+            logger.error(f"[QUESTION EXTRACTION] ❌ Extraction incomplete after {max_attempts} attempts: {len(accepted)}/{N}, missing {missing[:20]}")
+            return None
+
+def missing_ranges(missing: List[int], max_gap: int = 2) -> List[tuple]:
+    """
+    Groups missing question numbers into (start, end) ranges; numbers at most
+    `max_gap` apart share a range so scattered gaps don't become many calls.
+    """
+    ranges = []
+    for qnum in sorted(missing):
+        if ranges and qnum - ranges[-1][1] <= max_gap + 1:
+            ranges[-1][1] = qnum
+        else:
+            ranges.append([qnum, qnum])
+    return [tuple(r) for r in ranges]
+
+def extract_ranges(ocr_text, images, ranges, use_parallel=True, cache=None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Runs extract_chunk_subtask for each (start, end) range.
+    `cache` is passed to its LLM calls (False on retries).
+
+    Returns:
+        list: Parsed {"questions": [...]} per range, in the order of `ranges` (None on failure)
+    """
+    if not use_parallel:
+        return [extract_chunk_subtask(ocr_text, start, end, images, cache) for start, end in ranges]
+
+    results = [None] * len(ranges)
+    # Each chunk makes its image and OCR extraction calls at the same time
+    with ThreadPoolExecutor(max_workers=llm_workers(2, len(ranges))) as executor:
+        future_to_idx = {
+            executor.submit(extract_chunk_subtask, ocr_text, start, end, images, cache): idx
+            for idx, (start, end) in enumerate(ranges)
+        }
+        for future in as_completed(future_to_idx):
+            idx = future_to_idx[future]
+            start, end = ranges[idx]
+            try:
+                results[idx] = future.result()
+                logger.info(f"[QUESTION EXTRACTION] ✅ Range Q{start}-Q{end} completed: {len(results[idx].get('questions', []))} questions")
+            except Exception as e:
+                logger.error(f"[QUESTION EXTRACTION] ❌ Range Q{start}-Q{end} failed: {e}")
+    return results
 
 @traceable()
 def get_subject_from_q_paper(pdf_path: str) -> Optional[str]:
     """
     Extracts the subject from the first page of a question paper using an LLM.
+    Only the first page is rendered.
     """
     try:
-        images = pdf_to_images(pdf_path)
+        images = pdf_to_images(pdf_path, pages=range(1))
         if not images:
             return None
 
@@ -369,14 +698,8 @@ def questions_extract_with_metadata(pdf_path: str, test_path: str, subject_range
     """
     try:
         all_questions = []
-        images = pdf_to_images(pdf_path)
-        ocr_text = call_mistrall_ocr_api_with_rotation(pdf_path)
-        
-        # Save OCR
-        markdown_content = f"# OCR Result\n\n```json\n{ocr_text}\n```"
-        markdown_path = os.path.join(test_path, "ocr_output.md")
-        default_storage.save(markdown_path, ContentFile(markdown_content))
-        logger.info(f"[METADATA EXTRACTION] ✅ OCR data saved at: {markdown_path}")
+        # One rasterization + OCR pass, shared with questions_extract below
+        images, ocr_text = load_extraction_artifacts(pdf_path, test_path)
         
         # First, try extracting the entire paper once and then assign subjects by metadata ranges.
         logger.info("[METADATA EXTRACTION] ℹ️ Attempting full-paper extraction before per-range extraction")
@@ -384,7 +707,7 @@ def questions_extract_with_metadata(pdf_path: str, test_path: str, subject_range
         # Note: do not reference `use_parallel` here (not defined in this scope).
         # Let questions_extract use its default `use_parallel` behavior, but pass
         # through the admin-provided `total_questions` to skip the LLM counting call.
-        whole_questions = questions_extract(pdf_path, test_path, total_questions=total_questions)
+        whole_questions = questions_extract(pdf_path, test_path, total_questions=total_questions, artifacts=(images, ocr_text))
 
         if whole_questions and isinstance(whole_questions, list) and len(whole_questions) > 0:
             logger.info(f"[METADATA EXTRACTION] ✅ Full-paper extraction returned {len(whole_questions)} questions. Assigning to ranges...")
@@ -1,7 +1,10 @@
 from exam.ingestions.populate_analysis import save_analysis
 from exam.models.question_paper import QuestionPaper
 from exam.utils.analysis_generator import analyze_questions_in_batches
+from exam.utils.chunk_planner import plan_analysis_batches, llm_workers, ANALYSIS_PROMPTS
 from exam.models.test_status import TestProcessingStatus
+from exam.utils.paper_fingerprint import question_fingerprint, clone_analysed_questions, stamp_content_hashes, reuse_enabled
+from exam.utils.question_cache import invalidate_question_set
 import logging
 
 logger = logging.getLogger(__name__)
@@ -69,25 +72,52 @@ def analyse_questions(class_id, test_num, subject):
             for q in stored_questions
         ]
 
-        # Process in batches - chunk_size determines how many questions per LLM call
-        # For metadata-driven flow, questions are already correctly split by subject
-        chunk_size = min(45, len(stored_questions))
-        
-        # Pass known_subject so the LLM doesn't re-detect the subject
-        result = analyze_questions_in_batches(questions_list, chunk_size, known_subject=current_subject)
-        
-        # Store metadata, feedback, and errors in DB
-        while True:
-            try:
-                save_analysis(result, class_id, test_num)
-                break  # If no error, break the loop
-            except Exception as e:
-                # Optionally log the error
-                status_obj.status = "Failed"
-                status_obj.logs += f"Save failed for {current_subject}: {e}. Re-analyzing and retrying...\n"
+        # Reuse the analysis of identical questions already analysed for another class/test
+        hashes = {
+            q["question_number"]: question_fingerprint(current_subject, q["question_text"], q["options"], q["correct_answer"])
+            for q in questions_list
+        }
+        if reuse_enabled():
+            cloned = clone_analysed_questions(class_id, test_num, hashes)
+            if cloned:
+                invalidate_question_set(class_id, test_num)
+                questions_list = [q for q in questions_list if q["question_number"] not in cloned]
+                logger.info(f"♻️ Reused analysis for {len(cloned)} {current_subject} questions, {len(questions_list)} left to analyse")
+                status_obj.logs += f"♻️ Reused analysis for {len(cloned)} {current_subject} questions\n"
                 status_obj.save()
-                logger.error(f"Save failed for {current_subject}: {e}. Re-analyzing and retrying...")
-                result = analyze_questions_in_batches(questions_list, chunk_size, known_subject=current_subject)
+
+        if questions_list:
+            # Process in batches packed up to the analysis token budget, so long questions
+            # get smaller batches and short ones fewer round trips.
+            # For metadata-driven flow, questions are already correctly split by subject
+            # Without a subject, batches keep the fixed 45-question split so each stays
+            # within one section and can be classified on its own
+            if current_subject:
+                batches = plan_analysis_batches(questions_list)
+                chunk_size = max(len(batch) for batch in batches)
+            else:
+                batches = None
+                chunk_size = min(45, len(questions_list))
+            workers = llm_workers(ANALYSIS_PROMPTS, len(batches) if batches else -(-len(questions_list) // chunk_size))
+            logger.info(f"📦 Planned {len(batches) if batches else 'fixed'} {current_subject} batches of up to {chunk_size} questions with {workers} workers")
+
+            # Pass known_subject so the LLM doesn't re-detect the subject
+            result = analyze_questions_in_batches(questions_list, chunk_size, known_subject=current_subject, max_batch_workers=workers, batches=batches)
+
+            # Store metadata, feedback, and errors in DB
+            while True:
+                try:
+                    save_analysis(result, class_id, test_num)
+                    break  # If no error, break the loop
+                except Exception as e:
+                    # Optionally log the error
+                    status_obj.status = "Failed"
+                    status_obj.logs += f"Save failed for {current_subject}: {e}. Re-analyzing and retrying...\n"
+                    status_obj.save()
+                    logger.error(f"Save failed for {current_subject}: {e}. Re-analyzing and retrying...")
+                    result = analyze_questions_in_batches(questions_list, chunk_size, known_subject=current_subject, max_batch_workers=workers, batches=batches)
+
+            stamp_content_hashes(class_id, test_num, {q["question_number"]: hashes[q["question_number"]] for q in questions_list})
 
         logger.info(f"✅ Analysis complete for {current_subject}")
         status_obj.logs += f"✅ Analysis complete for {current_subject}\n"
@@ -0,0 +1,79 @@
+import json
+import hashlib
+import logging
+from django.core.cache import cache
+from exam.models import QuestionAnalysis
+
+logger = logging.getLogger(__name__)
+
+QUESTION_SET_TTL = 6 * 60 * 60  # seconds; covers a full analysis + dashboard run
+
+QUESTION_FIELDS = (
+    "question_number", "chapter", "topic", "subtopic", "typeOfquestion", "question_text",
+    "option_1", "option_2", "option_3", "option_4", "correct_answer",
+    "option_1_feedback", "option_2_feedback", "option_3_feedback", "option_4_feedback",
+    "option_1_type", "option_2_type", "option_3_type", "option_4_type",
+    "option_1_misconception", "option_2_misconception", "option_3_misconception", "option_4_misconception",
+    "im_desp", "test_num", "subject"
+)
+
+
+def _cache_key(class_id, test_num):
+    return f"question_set:{class_id}:{test_num}"
+
+
+def _version_of(questions):
+    """Content hash of a question set; changes whenever any analysed field changes."""
+    payload = json.dumps(questions, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+def load_question_set(class_id, test_num):
+    """
+    Loads all QuestionAnalysis rows of a test from the database and caches them.
+
+    Returns:
+        tuple: (questions, version) where questions is a list of dicts ordered by question number
+    """
+    questions = list(
+        QuestionAnalysis.objects.filter(class_id=class_id, test_num=test_num)
+        .order_by("question_number")
+        .values(*QUESTION_FIELDS)
+    )
+    version = _version_of(questions)
+    if questions:
+        cache.set(_cache_key(class_id, test_num), (version, questions), QUESTION_SET_TTL)
+    return questions, version
+
+
+def get_question_set(class_id, test_num, version=None):
+    """
+    Returns the analysed question set of a test, served from the worker-side cache.
+
+    Args:
+        class_id (str): Class identifier
+        test_num (int): Test number
+        version (str, optional): Version stamp issued by load_question_set. A cached
+            entry with a different stamp is treated as stale and reloaded.
+
+    Returns:
+        list: Question dicts ordered by question number
+    """
+    cached = cache.get(_cache_key(class_id, test_num))
+    if cached:
+        cached_version, questions = cached
+        if version is None or cached_version == version:
+            return questions
+
+    questions, loaded_version = load_question_set(class_id, test_num)
+    if version is not None and loaded_version != version:
+        logger.warning(
+            f"⚠️ Question set for class {class_id}, test {test_num} changed since tasks were queued "
+            f"(expected {version[:8]}, loaded {loaded_version[:8]}); using the latest rows."
+        )
+    return questions
+
+
+def invalidate_question_set(class_id, test_num):
+    """Drops the cached question set of a test (e.g. after re-analysis or deletion)."""
+    cache.delete(_cache_key(class_id, test_num))
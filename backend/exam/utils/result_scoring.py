@@ -0,0 +1,173 @@
+import time
+import logging
+import numpy as np
+from exam.models import Student, QuestionAnalysis, StudentResponse, Result
+
+logger = logging.getLogger(__name__)
+
+# Result column prefix for each subject, in matrix column order
+SUBJECT_PREFIXES = {'Physics': 'phy', 'Chemistry': 'chem', 'Botany': 'bot', 'Zoology': 'zoo', 'Biology': 'bio'}
+PREFIX_ORDER = list(SUBJECT_PREFIXES.values())
+
+RESULT_UPDATE_FIELDS = [
+    f'{prefix}_{metric}'
+    for prefix in PREFIX_ORDER
+    for metric in ('total', 'attended', 'correct', 'score')
+] + ['total_attended', 'total_correct', 'total_score']
+
+
+def load_answer_key(class_id, test_num):
+    """
+    Loads the answer key of a test as arrays indexed by question position.
+
+    Returns:
+        tuple: (question_numbers, subject_matrix, valid_options, correct_options)
+            - question_numbers (np.ndarray[int], Q): question numbers in key order
+            - subject_matrix (np.ndarray[int], Q x S): one-hot subject membership, S = len(PREFIX_ORDER)
+            - valid_options (np.ndarray[bool], Q x 4): option text is present (counts as attended)
+            - correct_options (np.ndarray[bool], Q x 4): option text equals the correct answer
+    """
+    rows = list(QuestionAnalysis.objects.filter(class_id=class_id, test_num=test_num).values_list(
+        'question_number', 'subject', 'correct_answer', 'option_1', 'option_2', 'option_3', 'option_4'
+    ))
+    n_questions = len(rows)
+    question_numbers = np.zeros(n_questions, dtype=np.int64)
+    subject_matrix = np.zeros((n_questions, len(PREFIX_ORDER)), dtype=np.int64)
+    valid_options = np.zeros((n_questions, 4), dtype=bool)
+    correct_options = np.zeros((n_questions, 4), dtype=bool)
+
+    for i, (qnum, subject, correct_answer, *options) in enumerate(rows):
+        question_numbers[i] = qnum
+        prefix = SUBJECT_PREFIXES.get(subject)
+        if prefix:
+            subject_matrix[i, PREFIX_ORDER.index(prefix)] = 1
+        for k, option in enumerate(options):
+            # Mirrors StudentAnalyzer.analyze: an answer counts as attended when the
+            # chosen option has text, and as correct when that text equals the key.
+            valid_options[i, k] = option is not None and option != ''
+            correct_options[i, k] = correct_answer == option
+
+    return question_numbers, subject_matrix, valid_options, correct_options
+
+
+def load_response_matrix(class_id, test_num, question_numbers, student_ids=None):
+    """
+    Loads every StudentResponse of a test into a students x questions matrix.
+
+    Cells hold the selected option (1-4) or 0 when the question was skipped or
+    the answer is not a valid option.
+
+    Args:
+        class_id (str): Class identifier
+        test_num (int): Test number
+        question_numbers (np.ndarray): Column order, as returned by load_answer_key
+        student_ids (iterable, optional): Restrict to these students
+
+    Returns:
+        tuple: (student_ids, matrix) where student_ids lists the row order
+    """
+    responses = StudentResponse.objects.filter(class_id=class_id, test_num=test_num)
+    if student_ids is not None:
+        responses = responses.filter(student_id__in=list(student_ids))
+    rows = list(responses.values_list('student_id', 'question_number', 'selected_answer'))
+
+    row_index = {}
+    col_index = {int(qnum): i for i, qnum in enumerate(question_numbers)}
+    cells = []
+    for student_id, qnum, selected in rows:
+        r = row_index.setdefault(student_id, len(row_index))
+        c = col_index.get(qnum)
+        if c is None or selected not in ('1', '2', '3', '4'):
+            continue
+        cells.append((r, c, int(selected)))
+
+    matrix = np.zeros((len(row_index), len(question_numbers)), dtype=np.int8)
+    if cells:
+        r, c, v = np.array(cells, dtype=np.int64).T
+        matrix[r, c] = v
+    return list(row_index), matrix
+
+
+def compute_subject_scores(matrix, subject_matrix, valid_options, correct_options):
+    """
+    Computes per-subject totals for every student with array operations.
+
+    Returns:
+        dict: {'total': (S,), 'attended': (N x S), 'correct': (N x S), 'score': (N x S)}
+    """
+    n_questions = matrix.shape[1]
+    picked = matrix.astype(np.int64)
+    option_idx = np.clip(picked - 1, 0, 3)
+    question_idx = np.broadcast_to(np.arange(n_questions), picked.shape)
+
+    attended = (picked > 0) & valid_options[question_idx, option_idx]
+    correct = attended & correct_options[question_idx, option_idx]
+
+    attended_by_subject = attended.astype(np.int64) @ subject_matrix
+    correct_by_subject = correct.astype(np.int64) @ subject_matrix
+    return {
+        'total': subject_matrix.sum(axis=0),
+        'attended': attended_by_subject,
+        'correct': correct_by_subject,
+        # Score formula: (correct answers × 5) - total attended
+        'score': correct_by_subject * 5 - attended_by_subject,
+    }
+
+
+def score_test_results(class_id, test_num, student_ids=None):
+    """
+    Scores a whole test for a class and bulk-upserts one Result row per student.
+
+    Loads the answer key and all responses once, scores every student with
+    NumPy and writes all rows in a single INSERT ... ON CONFLICT statement.
+    Only students of the class who have responses for the test are scored.
+
+    Args:
+        class_id (str): Class identifier
+        test_num (int): Test number
+        student_ids (iterable, optional): Restrict scoring to these students
+
+    Returns:
+        int: Number of Result rows written
+    """
+    started = time.perf_counter()
+    question_numbers, subject_matrix, valid_options, correct_options = load_answer_key(class_id, test_num)
+    if not len(question_numbers):
+        logger.warning(f"⚠️ No QuestionAnalysis rows for class {class_id}, test {test_num}; skipping scoring.")
+        return 0
+
+    if student_ids is None:
+        student_ids = Student.objects.filter(class_id=class_id).values_list('student_id', flat=True)
+    row_ids, matrix = load_response_matrix(class_id, test_num, question_numbers, student_ids)
+    if not row_ids:
+        logger.warning(f"⚠️ No responses to score for class {class_id}, test {test_num}.")
+        return 0
+
+    scores = compute_subject_scores(matrix, subject_matrix, valid_options, correct_options)
+
+    results = []
+    for i, student_id in enumerate(row_ids):
+        data = {}
+        for j, prefix in enumerate(PREFIX_ORDER):
+            data[f'{prefix}_total'] = int(scores['total'][j])
+            data[f'{prefix}_attended'] = int(scores['attended'][i, j])
+            data[f'{prefix}_correct'] = int(scores['correct'][i, j])
+            data[f'{prefix}_score'] = int(scores['score'][i, j])
+        data['total_attended'] = int(scores['attended'][i].sum())
+        data['total_correct'] = int(scores['correct'][i].sum())
+        data['total_score'] = int(scores['score'][i].sum())
+        results.append(Result(student_id=student_id, class_id=class_id, test_num=test_num, **data))
+
+    Result.objects.bulk_create(
+        results,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['student_id', 'class_id', 'test_num'],
+        update_fields=RESULT_UPDATE_FIELDS,
+    )
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"✅ Scored {len(results)} students x {len(question_numbers)} questions for class {class_id}, "
+        f"test {test_num} in {elapsed:.3f}s"
+    )
+    return len(results)
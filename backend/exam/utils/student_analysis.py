@@ -1,7 +1,8 @@
-import pandas as pd
-from exam.models import Student, QuestionAnalysis, StudentResponse, Test, Result
+from exam.models import Student, QuestionAnalysis, StudentResponse, Test
 from exam.models.result import StudentResult
-from exam.graph_utils.create_graph import create_graph
+from exam.utils.result_scoring import score_test_results
+from exam.utils.topic_stats import write_topic_stats
+from exam.utils.question_cache import QUESTION_FIELDS, load_question_set, get_question_set
 from exam.models.test_status import TestProcessingStatus
 import logging
 from celery import group, shared_task, chord
@@ -9,8 +10,6 @@ from celery import group, shared_task, chord
 logger = logging.getLogger(__name__)
 
 class StudentAnalyzer:
-    subject_map = {'Physics': 'phy', 'Chemistry': 'chem', 'Botany': 'bot', 'Zoology': 'zoo', 'Biology': 'bio'}
-
     def __init__(self, student_id, class_id, test_num, student_db, test_date, questions, response_map):
         self.student_id = student_id
         self.class_id = class_id
@@ -64,140 +63,65 @@ class StudentAnalyzer:
         Note: misconception field is intentionally NOT updated here - it's populated separately by the async inference task.
         """
         try:
+            rows = []
             for item in self.analysis:
                 # Determine if question was attempted
                 opted_answer = item.get('OptedAnswer')
                 was_attempted = opted_answer is not None and str(opted_answer).strip() != ''
-                
-                # Get existing record to preserve misconception if it exists
-                existing = StudentResult.objects.filter(
-                    student_id=self.student_id,
-                    class_id=self.class_id,
-                    test_num=self.test_num,
-                    question_number=item['QuestionNumber']
-                ).first()
-                
-                defaults = {
-                    'is_correct': item['IsCorrect'],
-                    'was_attempted': was_attempted,
-                    'subject': item['Subject'],
-                    'chapter': item['Chapter'],
-                    'topic': item['Topic']
-                }
-                
-                # Preserve existing misconception if present
-                if existing and existing.misconception:
-                    defaults['misconception'] = existing.misconception
-                
-                StudentResult.objects.update_or_create(
+                rows.append(StudentResult(
                     student_id=self.student_id,
                     class_id=self.class_id,
                     test_num=self.test_num,
                     question_number=item['QuestionNumber'],
-                    defaults=defaults
-                )
-            logger.info(f"✅ Saved {len(self.analysis)} question-level results to StudentResult for student {self.student_id}")
+                    is_correct=item['IsCorrect'],
+                    was_attempted=was_attempted,
+                    subject=item['Subject'],
+                    chapter=item['Chapter'],
+                    topic=item['Topic']
+                ))
+            question_types = {
+                (self.class_id, self.test_num, item['QuestionNumber']): item.get('TypeOfQuestion') or ''
+                for item in self.analysis
+            }
+            bulk_upsert_student_results(rows, question_types=question_types)
+            logger.info(f"✅ Saved {len(rows)} question-level results to StudentResult for student {self.student_id}")
         except Exception as e:
             logger.error(f"❌ Error saving StudentResult records for {self.student_id}: {e}", exc_info=True)
 
-    def get_summary(self):
-        # Get unique subjects from the analyzed questions
-        all_subjects = list(set(q.get('subject') for q in self.analysis if q.get('subject')))
-        
-        student_df = pd.DataFrame(self.analysis)
-        
-        # If student_df is empty for any subject, we need to ensure it's represented with zeros
-        for subject in all_subjects:
-            if subject not in student_df['Subject'].unique():
-                # Add empty row for missing subject
-                empty_row = pd.DataFrame([{
-                    'Subject': subject,
-                    'QuestionNumber': None,
-                    'OptedAnswer': None,
-                    'IsCorrect': False
-                }])
-                student_df = pd.concat([student_df, empty_row], ignore_index=True)
-        
-        total_questions = student_df.groupby("Subject")["QuestionNumber"].count().rename("TotalQuestions")
-        attended_questions = student_df[
-            student_df["OptedAnswer"].notnull() & (student_df["OptedAnswer"] != '')
-        ].groupby("Subject")["QuestionNumber"].count().rename("AttendedQuestions")
-        correct_questions = student_df[
-            (student_df["OptedAnswer"].notnull()) &
-            (student_df["OptedAnswer"] != '') &
-            (student_df["IsCorrect"] == True)
-        ].groupby("Subject")["QuestionNumber"].count().rename("CorrectQuestions")
-        
-        summary_df = pd.concat([total_questions, attended_questions, correct_questions], axis=1).fillna(0).astype(int)
-        summary_df.reset_index(inplace=True)
-        return summary_df
+# Utility functions
 
-    def save_results(self, summary_df):
-        # Initialize result data with all fields set to 0
-        result_data = {
-            'student_id': self.student_id,
-            'class_id': self.class_id,
-            'test_num': self.test_num,
-            'phy_total': 0, 'phy_attended': 0, 'phy_correct': 0,
-            'chem_total': 0, 'chem_attended': 0, 'chem_correct': 0,
-            'bot_total': 0, 'bot_attended': 0, 'bot_correct': 0,
-            'zoo_total': 0, 'zoo_attended': 0, 'zoo_correct': 0,
-            'bio_total': 0, 'bio_attended': 0, 'bio_correct': 0,
-            'total_attended': 0, 'total_correct': 0
-        }
+# Columns refreshed on re-analysis. `misconception` is deliberately absent so an
+# existing LLM-inferred value survives the upsert (new rows get NULL).
+STUDENT_RESULT_UPDATE_FIELDS = ['is_correct', 'was_attempted', 'subject', 'chapter', 'topic']
 
-        # Update with current subject data from summary_df
-        for _, row in summary_df.iterrows():
-            subject = row['Subject']
-            sub = self.subject_map.get(subject)
-            if sub:
-                # Update subject-specific data
-                result_data[f'{sub}_total'] = row['TotalQuestions']
-                result_data[f'{sub}_attended'] = row['AttendedQuestions']
-                result_data[f'{sub}_correct'] = row['CorrectQuestions']
-                logger.info(f"Processing {subject} data for student {self.student_id}: {row['CorrectQuestions']}/{row['TotalQuestions']}")
 
-        # Recalculate totals across all subjects
-        for metric in ['attended', 'correct']:
-            total = sum(
-                result_data[f'{sub}_{metric}']
-                for sub in ['phy', 'chem', 'bot', 'zoo', 'bio']
-            )
-            result_data[f'total_{metric}'] = total
+def bulk_upsert_student_results(rows, batch_size=1000, question_types=None):
+    """
+    Insert or update StudentResult rows with a single INSERT ... ON CONFLICT per batch,
+    then rewrite the StudentTopicStats aggregates of the student-tests involved.
 
-        # Calculate scores for all subjects using the standard formula
-        total_score = 0
-        for subject_prefix in ['phy', 'chem', 'bot', 'zoo', 'bio']:
-            # Score formula: (correct answers × 5) - total attended
-            score = (result_data[f'{subject_prefix}_correct'] * 5) - result_data[f'{subject_prefix}_attended']
-            result_data[f'{subject_prefix}_score'] = score
-            total_score += score
-        
-        result_data['total_score'] = total_score
+    Args:
+        rows (list[StudentResult]): Unsaved instances covering every question of each
+            student-test; may span several students of a class
+        batch_size (int): Rows per statement
+        question_types (dict, optional): {(class_id, test_num, question_number): type},
+            see topic_stats.load_question_types
 
-        # Save results and log the operation
-        try:
-            result, created = Result.objects.update_or_create(
-                student_id=self.student_id,
-                class_id=self.class_id,
-                test_num=self.test_num,
-                defaults=result_data
-            )
-            logger.info(f"{'Created' if created else 'Updated'} results for student {self.student_id}, "
-                      f"test {self.test_num} with scores: "
-                      f"Physics: {result_data['phy_score']}, "
-                      f"Chemistry: {result_data['chem_score']}, "
-                      f"Botany: {result_data['bot_score']}, "
-                      f"Zoology: {result_data['zoo_score']}, "
-                      f"Biology: {result_data['bio_score']}, "
-                      f"Total: {total_score}")
-        except Exception as e:
-            logger.error(f"Error saving results for student {self.student_id}: {str(e)}")
-        
-        # NEW: Save question-level results to StudentResult table for PostgreSQL queries
-        self.save_student_results()
+    Returns:
+        int: Number of rows written
+    """
+    if not rows:
+        return 0
+    StudentResult.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['question_number', 'class_id', 'test_num', 'student_id'],
+        update_fields=STUDENT_RESULT_UPDATE_FIELDS,
+    )
+    write_topic_stats(rows, question_types, batch_size=batch_size)
+    return len(rows)
 
-# Utility functions
 
 def fetch_questions(class_id, test_num, subject=None):
     # If subject is provided, filter by it, otherwise get all subjects
@@ -205,14 +129,7 @@ def fetch_questions(class_id, test_num, subject=None):
     if subject:
         query = query.filter(subject=subject)
     
-    return list(query.values(
-        "question_number", "chapter", "topic", "subtopic", "typeOfquestion", "question_text",
-        "option_1", "option_2", "option_3", "option_4", "correct_answer",
-        "option_1_feedback", "option_2_feedback", "option_3_feedback", "option_4_feedback",
-        "option_1_type", "option_2_type", "option_3_type", "option_4_type",
-        "option_1_misconception", "option_2_misconception", "option_3_misconception", "option_4_misconception",
-        "im_desp", "test_num", "subject"
-    ))
+    return list(query.values(*QUESTION_FIELDS))
 
 def fetch_student_responses(student_id, class_id, test_num):
     return {
@@ -224,17 +141,40 @@ def fetch_student_responses(student_id, class_id, test_num):
         ).values("question_number", "selected_answer")
     }
 
+def fetch_test_responses(class_id, test_num, student_ids=None):
+    """
+    Loads the responses of every student of a test in one query.
+
+    Returns:
+        dict: {student_id: {question_number: selected_answer}}
+    """
+    query = StudentResponse.objects.filter(class_id=class_id, test_num=test_num)
+    if student_ids is not None:
+        query = query.filter(student_id__in=list(student_ids))
+
+    responses = {}
+    for student_id, qnum, selected in query.values_list("student_id", "question_number", "selected_answer"):
+        responses.setdefault(student_id, {})[qnum] = selected
+    return responses
+
+def fetch_test_attendees(class_id, test_num):
+    """Returns the set of student_ids with at least one response for the test."""
+    return set(
+        StudentResponse.objects.filter(class_id=class_id, test_num=test_num)
+        .values_list("student_id", flat=True)
+        .distinct()
+    )
+
 @shared_task
-def analyze_single_student(student_id, class_id, student_db, questions, test_date, response_map, test_num):
+def analyze_single_student(student_id, class_id, student_db, test_date, response_map, test_num, question_version=None):
+    # Questions are not shipped in the task message; they come from the worker-side cache
+    questions = get_question_set(class_id, test_num, question_version)
     analyzer = StudentAnalyzer(student_id, class_id, test_num, student_db, test_date, questions, response_map)
     analyzer.analyze()
-    summary_df = analyzer.get_summary()
-    #print(f"📊 Summary for {student_id} in class {class_id}, test {test_num}:\n{summary_df}")
-    analyzer.save_results(summary_df)
-    try:
-        create_graph(student_id, student_db.lower(), pd.DataFrame(analyzer.analysis), test_num)
-    except Exception as e:
-        logger.exception(f"Failed to create Neo4j graph for {student_id}: {e}")
+    # Subject-level Result rows are scored class-wide in analyse_students (see result_scoring)
+    analyzer.save_student_results()
+    # The Neo4j graph is projected from StudentResult once the whole class is done
+    # (see finalize_student_analysis), keeping it off this task's critical path.
     
     # Trigger async misconception inference for wrong answers (non-blocking)
     try:
@@ -246,6 +186,26 @@ def analyze_single_student(student_id, class_id, student_db, questions, test_dat
     except Exception as e:
         logger.warning(f"⚠️ Failed to trigger misconception inference for {student_id}: {e}")
 
+@shared_task
+def finalize_student_analysis(class_id, test_num):
+    """
+    Chord callback once every analyze_single_student task of a test has finished.
+    Starts the dashboard updates and, if enabled, the off-path knowledge graph projection.
+    """
+    from django.conf import settings
+    # Import here to avoid circular dependency
+    from exam.services.update_dashboard import update_student_dashboard
+
+    if getattr(settings, 'GRAPH_PROJECTION_ON_INGEST', True):
+        try:
+            from exam.services.graph_projection import project_test_graph
+            project_test_graph.delay(class_id, test_num)
+            logger.info(f"🕸️ Scheduled knowledge graph projection for class {class_id}, test {test_num}")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to schedule graph projection for class {class_id}, test {test_num}: {e}")
+
+    update_student_dashboard(class_id, test_num)
+
 @shared_task
 def analyse_students(class_id, test_num, subject=None):
     status_obj, _ = TestProcessingStatus.objects.get_or_create(class_id=class_id, test_num=test_num)
@@ -256,58 +216,45 @@ def analyse_students(class_id, test_num, subject=None):
         logger.warning(f"⚠️ No students found for class {class_id}.")
         return
         
-    # Get all unique subjects for this test from QuestionAnalysis
-    subjects = list(QuestionAnalysis.objects.filter(
-        class_id=class_id,
-        test_num=test_num
-    ).values_list('subject', flat=True).distinct())
-    
-    # Get all questions for the test, optionally filtered by subject
-    if not subjects:
-        status_obj.logs += f"⚠️ No subjects found in QuestionAnalysis for class {class_id}, test {test_num}."
+    # Load the question set once per test; tasks only carry its version stamp
+    all_questions, question_version = load_question_set(class_id, test_num)
+    if not all_questions:
+        status_obj.logs += f"⚠️ No questions found in QuestionAnalysis for class {class_id}, test {test_num}."
         status_obj.save()
-        logger.warning(f"⚠️ No subjects found in QuestionAnalysis for class {class_id}, test {test_num}.")
+        logger.warning(f"⚠️ No questions found in QuestionAnalysis for class {class_id}, test {test_num}.")
         return
 
     test_obj = Test.objects.filter(class_id=class_id, test_num=test_num).first()
     test_date = test_obj.date if test_obj else "Unknown"
     
     # Create tasks for each student, processing all subjects
+    responses_by_student = fetch_test_responses(class_id, test_num)
     tasks = []
     for student in students:
-        response_map = fetch_student_responses(student.student_id, class_id, test_num)
+        response_map = responses_by_student.get(student.student_id)
         if not response_map:
+            # Accumulated in memory; status_obj is saved once below
             status_obj.logs += f"🚫 Student {student.student_id} did not attend test {test_num}. Skipping."
-            status_obj.save()
             logger.info(f"🚫 Student {student.student_id} did not attend test {test_num}. Skipping.")
             continue
-            
-        # Get all questions for all subjects
-        all_questions = []
-        for subject in subjects:
-            subject_questions = fetch_questions(class_id, test_num, subject)
-            if subject_questions:
-                all_questions.extend(subject_questions)
-            
-            if not all_questions:
-                status_obj.logs += f"⚠️ No questions found for any subject in class {class_id}, test {test_num}."
-                status_obj.save()
-                continue
-            
+
         tasks.append(analyze_single_student.s(
-            student.student_id, student.class_id, student.neo4j_db, all_questions, test_date, response_map, test_num
+            student.student_id, student.class_id, student.neo4j_db, test_date, response_map, test_num, question_version
         ))
     
     if tasks:
+        # Score every attending student in one pass before fanning out the per-student work
+        scored = score_test_results(class_id, test_num)
+        status_obj.logs += f"✅ Scored {scored} students for test {test_num}."
+        status_obj.save()
+
         logger.info(f"🔄 Scheduling {len(tasks)} student analysis tasks for class {class_id}, test {test_num}...")
-        # Import here to avoid circular dependency
-        from exam.services.update_dashboard import update_student_dashboard
         
         # Use chord: run all student analysis tasks, then update dashboard when all complete
         # Use an immutable signature (.si) so Celery does NOT prepend the header results
         # as the first positional argument to the callback. This keeps the callback
-        # signature as `update_student_dashboard(class_id, test_num)`.
-        chord(tasks)(update_student_dashboard.si(class_id, test_num))
+        # signature as `finalize_student_analysis(class_id, test_num)`.
+        chord(tasks)(finalize_student_analysis.si(class_id, test_num))
         logger.info(f"✅ Student analysis tasks scheduled with dashboard update callback for class {class_id}, test {test_num}.")
     else:
         logger.warning(f"⚠️ No student analysis tasks to schedule for class {class_id}, test {test_num}.")
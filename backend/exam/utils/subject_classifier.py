@@ -0,0 +1,134 @@
+"""
+Offline subject classifier for NEET questions.
+
+Without admin metadata, analyze_questions_in_batches used to ask Gemini for the
+subject of every batch (infer_subject_with_gemini), which forced batches to run one
+after another. This module scores questions locally with TF-IDF weights built from
+the chapter and topic names in NEET_data.chapter_list, plus a few keywords per
+subject that show up in question text but not in syllabus headings.
+
+classify_questions returns the batch's subject and a confidence (share of its
+questions voting for that subject); callers fall back to the LLM below
+SUBJECT_CLASSIFIER_MIN_CONFIDENCE.
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from django.conf import settings
+from exam.llm_call.NEET_data import chapter_list
+
+# Words common in question text that are not syllabus keywords
+SUBJECT_KEYWORDS = {
+    "Physics": (
+        "velocity acceleration displacement newton joule watt volt voltage ampere ohm resistance "
+        "resistor capacitor capacitance inductor current charge coulomb magnetic field lens mirror "
+        "refraction wavelength frequency photon momentum torque pendulum spring kinetic potential "
+        "friction gravitational projectile galvanometer diode transistor"
+    ),
+    "Chemistry": (
+        "mol molar molarity molality reaction compound oxidation reduction acid base salt ion ionic "
+        "bond covalent orbital hybridisation hybridization isomer alkane alkene alkyne alcohol ether "
+        "aldehyde ketone amine ester benzene catalyst enthalpy entropy equilibrium electrode "
+        "valency oxide iupac reagent"
+    ),
+    "Botany": (
+        "plant leaf leaves root stem flower pollen ovule seed fruit chlorophyll chloroplast stomata "
+        "xylem phloem photosynthesis transpiration auxin gibberellin cytokinin angiosperm gymnosperm "
+        "bryophyte pteridophyte algae fungi meristem inflorescence"
+    ),
+    "Zoology": (
+        "animal human blood heart artery vein kidney nephron neuron brain hormone gland insulin "
+        "muscle bone skeletal digestion stomach intestine lung alveoli sperm ovum uterus placenta "
+        "antibody immunity vaccine chordate vertebrate cockroach frog earthworm"
+    ),
+}
+
+STOPWORDS = set(
+    "the and for with its their from some into about which what following given correct incorrect "
+    "statement statements option options one two three four question true false not all only none "
+    "both above below are is has have this that these those types type properties different "
+    "structure function functions classification features concept concepts introduction level "
+    "basic principles general role nature process processes use uses".split()
+)
+
+WORD_RE = re.compile(r"[a-z]{3,}")
+
+
+def _stem(word):
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lower-cased, lightly stemmed words of a text, without stopwords."""
+    return [_stem(w) for w in WORD_RE.findall(str(text or "").lower()) if w not in STOPWORDS]
+
+
+@lru_cache(maxsize=1)
+def subject_weights():
+    """
+    {subject: {term: tf-idf weight}} over one document per subject (chapters, topics
+    and SUBJECT_KEYWORDS). Terms shared by every subject get no weight.
+    """
+    documents = {}
+    for subject, chapters in chapter_list.items():
+        text = [SUBJECT_KEYWORDS.get(subject, "")]
+        for chapter in chapters:
+            text.append(chapter.get("chapter", ""))
+            text.extend(chapter.get("topics", []))
+        documents[subject] = Counter(tokenize(" ".join(text)))
+
+    doc_freq = Counter(term for counts in documents.values() for term in counts)
+    weights = {}
+    for subject, counts in documents.items():
+        vector = {
+            term: (1 + math.log(count)) * math.log(len(documents) / doc_freq[term])
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        weights[subject] = {term: v / norm for term, v in vector.items() if v > 0}
+    return weights
+
+
+def question_scores(question, subjects=None):
+    """TF-IDF score of one question dict (text, options, im_desp) per subject."""
+    terms = tokenize(" ".join(str(part or "") for part in (
+        question.get("question_text"), *question.get("options", []), question.get("im_desp"),
+    )))
+    weights = subject_weights()
+    return {
+        subject: sum(weights[subject].get(term, 0.0) for term in terms)
+        for subject in (subjects or weights)
+        if subject in weights
+    }
+
+
+def classify_questions(questions, subjects=None):
+    """
+    Picks the subject of a batch of questions that belong to one subject.
+
+    Args:
+        questions (list): Question dicts with question_text, options, im_desp
+        subjects (list): Candidate subjects (default: every subject in chapter_list)
+
+    Returns:
+        tuple: (subject, confidence) where confidence is the share of questions whose
+            best-scoring subject it is; (None, 0.0) when nothing matched
+    """
+    votes = Counter()
+    for question in questions:
+        scores = question_scores(question, subjects)
+        if scores and max(scores.values()) > 0:
+            votes[max(scores, key=scores.get)] += 1
+    if not votes or not questions:
+        return None, 0.0
+    subject, count = votes.most_common(1)[0]
+    return subject, count / len(questions)
+
+
+def min_confidence():
+    return getattr(settings, 'SUBJECT_CLASSIFIER_MIN_CONFIDENCE', 0.6)
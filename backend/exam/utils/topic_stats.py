@@ -0,0 +1,194 @@
+"""
+Maintenance of the StudentTopicStats aggregate table.
+
+StudentTopicStats holds, per (student, test, subject, chapter, topic, question type),
+how many questions there were, how many were attempted and how many were correct.
+It is rewritten from StudentResult rows whenever they are saved, so the `_pg`
+retrieval functions read a few rows per test instead of every question. Tests
+scored before the table existed are backfilled by migration 0027.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Sum
+from exam.models.analysis import QuestionAnalysis
+from exam.models.result import Result, StudentResult, StudentTopicStats
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Aggregates shared by the readers. Annotation names must not clash with the
+# model's own total/attempted/correct fields.
+STAT_SUMS = {
+    'total_questions': Sum('total'),
+    'attempted_questions': Sum('attempted'),
+    'correct_questions': Sum('correct'),
+}
+
+# StudentResult columns the aggregation reads
+RESULT_FIELDS = (
+    'student_id', 'class_id', 'test_num', 'question_number',
+    'subject', 'chapter', 'topic', 'is_correct', 'was_attempted',
+)
+
+# (student_id, class_id) pairs whose tests are known to have stats in this process
+_VERIFIED_STUDENTS = set()
+
+
+def load_question_types(pairs, analysis_model=QuestionAnalysis):
+    """
+    Returns {(class_id, test_num, question_number): typeOfquestion} for the given tests.
+
+    Args:
+        pairs (iterable): (class_id, test_num) tuples
+        analysis_model: QuestionAnalysis, or its historical version in a migration
+    """
+    question_types = {}
+    for class_id, test_num in set(pairs):
+        for qnum, qtype in analysis_model.objects.filter(
+            class_id=class_id, test_num=test_num
+        ).values_list('question_number', 'typeOfquestion'):
+            question_types[(class_id, test_num, qnum)] = qtype or ''
+    return question_types
+
+
+def aggregate_topic_stats(results, question_types, stats_model=StudentTopicStats):
+    """
+    Folds StudentResult rows into unsaved StudentTopicStats rows.
+
+    Args:
+        results (iterable[StudentResult]): Saved or unsaved rows
+        question_types (dict): Output of load_question_types
+        stats_model: StudentTopicStats, or its historical version in a migration
+
+    Returns:
+        list[StudentTopicStats]
+    """
+    counts = defaultdict(lambda: [0, 0, 0])
+    for r in results:
+        qtype = question_types.get((r.class_id, r.test_num, r.question_number), '')
+        key = (r.student_id, r.class_id, r.test_num, r.subject, r.chapter, r.topic, qtype)
+        c = counts[key]
+        c[0] += 1
+        c[1] += 1 if r.was_attempted else 0
+        c[2] += 1 if r.is_correct else 0
+
+    return [
+        stats_model(
+            student_id=student_id, class_id=class_id, test_num=test_num,
+            subject=subject, chapter=chapter, topic=topic, question_type=qtype,
+            total=total, attempted=attempted, correct=correct,
+        )
+        for (student_id, class_id, test_num, subject, chapter, topic, qtype), (total, attempted, correct)
+        in counts.items()
+    ]
+
+
+def write_topic_stats(results, question_types=None, batch_size=1000):
+    """
+    Replaces the stats of every (student, class, test) present in `results`.
+
+    Args:
+        results (iterable[StudentResult]): All question rows of each student-test written
+        question_types (dict, optional): {(class_id, test_num, question_number): type};
+            loaded from QuestionAnalysis when omitted
+
+    Returns:
+        int: Number of StudentTopicStats rows written
+    """
+    results = list(results)
+    if not results:
+        return 0
+    if question_types is None:
+        question_types = load_question_types((r.class_id, r.test_num) for r in results)
+
+    stats = aggregate_topic_stats(results, question_types)
+    scopes = defaultdict(set)
+    for r in results:
+        scopes[(r.class_id, r.test_num)].add(r.student_id)
+
+    with transaction.atomic():
+        for (class_id, test_num), student_ids in scopes.items():
+            StudentTopicStats.objects.filter(
+                class_id=class_id, test_num=test_num, student_id__in=list(student_ids)
+            ).delete()
+        StudentTopicStats.objects.bulk_create(stats, batch_size=batch_size)
+    return len(stats)
+
+
+def delete_topic_stats(class_id, test_num=None, student_id=None):
+    """Removes stats alongside the StudentResult rows they were derived from."""
+    stats = StudentTopicStats.objects.filter(class_id=class_id)
+    if test_num is not None:
+        stats = stats.filter(test_num=test_num)
+    if student_id is not None:
+        stats = stats.filter(student_id=student_id)
+    return stats.delete()[0]
+
+
+def rebuild_topic_stats(class_id, test_num=None):
+    """
+    Recomputes stats from StudentResult, one test at a time (backfill / repair).
+
+    Returns:
+        dict: {test_num: rows written}
+    """
+    results = StudentResult.objects.filter(class_id=class_id)
+    if test_num is not None:
+        results = results.filter(test_num=test_num)
+    test_nums = sorted(set(results.values_list('test_num', flat=True).distinct()))
+
+    written = {}
+    for num in test_nums:
+        written[num] = rebuild_test_topic_stats(class_id, num)
+        logger.info(f"✅ Rebuilt topic stats for class {class_id}, test {num}: {written[num]} rows")
+    return written
+
+
+def rebuild_test_topic_stats(class_id, test_num, result_model=StudentResult,
+                             stats_model=StudentTopicStats, analysis_model=QuestionAnalysis):
+    """
+    Replaces one test's stats with a fresh aggregate of its StudentResult rows.
+
+    The model arguments let migrations run it with historical models.
+
+    Returns:
+        int: Number of StudentTopicStats rows written
+    """
+    rows = result_model.objects.filter(class_id=class_id, test_num=test_num).only(*RESULT_FIELDS)
+    question_types = load_question_types([(class_id, test_num)], analysis_model)
+    stats = aggregate_topic_stats(rows, question_types, stats_model)
+    with transaction.atomic():
+        stats_model.objects.filter(class_id=class_id, test_num=test_num).delete()
+        stats_model.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+def ensure_topic_stats(student_id, class_id):
+    """
+    Builds stats for the student's tests that have results but no stats rows yet.
+
+    Covers results restored or imported without bulk_upsert_student_results after
+    the migration backfill ran. Each student is checked once per process.
+    """
+    key = (student_id, class_id)
+    if key in _VERIFIED_STUDENTS:
+        return
+    with_stats = StudentTopicStats.objects.filter(student_id=student_id, class_id=class_id).values('test_num')
+    missing = Result.objects.filter(student_id=student_id, class_id=class_id).exclude(
+        test_num__in=with_stats
+    ).values_list('test_num', flat=True)
+    for num in sorted(set(missing)):
+        written = write_topic_stats(StudentResult.objects.filter(
+            student_id=student_id, class_id=class_id, test_num=num
+        ).only(*RESULT_FIELDS))
+        logger.info(f"✅ Built missing topic stats for {student_id}, class {class_id}, test {num}: {written} rows")
+    _VERIFIED_STUDENTS.add(key)
+
+
+def student_topic_stats(student_id, class_id, test_num=None):
+    """Base queryset of a student's stats, optionally for one test."""
+    ensure_topic_stats(student_id, class_id)
+    stats = StudentTopicStats.objects.filter(student_id=student_id, class_id=class_id)
+    if test_num is not None:
+        stats = stats.filter(test_num=test_num)
+    return stats
@@ -8,6 +8,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.http import JsonResponse
 from django.db import transaction
+from django.conf import settings
 from exam.models import Educator, Student, Overview, Result, SWOT, Manager, Institution
 import json
 import logging
@@ -18,7 +19,9 @@ from exam.models import StudentResponse, Performance, StudentResult, QuestionAna
 from exam.services.update_dashboard import update_single_student_dashboard
 from exam.services.institution_reports import get_test_student_performance
 from exam.utils.student_analysis import analyze_single_student, fetch_student_responses
-from exam.graph_utils.create_graph import create_graph
+from exam.utils.result_scoring import score_test_results
+from exam.utils.topic_stats import delete_topic_stats
+from exam.services.graph_projection import project_test_graph
 import pandas as pd
 import csv
 from io import TextIOWrapper
@@ -974,7 +977,7 @@ def manage_institution_student(request, educator_id, student_id):
                 db_name = str(student.neo4j_db).lower()
                 if db_name:
                     logger.info(f"[DELETE_STUDENT] Attempting to delete Neo4j DB: {db_name}")
-                    delete_db(db_name)
+                    delete_db(db_name, student_id=student_id, class_id=class_id)
                     logger.info(f"[DELETE_STUDENT] Neo4j DB deleted successfully")
             except Exception as e:
                 logger.exception(f"[DELETE_STUDENT] Failed to delete student's neo4j db: {str(e)}")
@@ -1103,7 +1106,7 @@ def delete_institution_student_test(request, educator_id, student_id, test_num):
         try:
             if db_name:
                 logger.info(f"[DELETE_TEST] Attempting to delete Neo4j Test{test_num} from database: {db_name}")
-                delete_test_graph(db_name, test_num)
+                delete_test_graph(db_name, test_num, student_id=student_id, class_id=class_id)
                 logger.info(f"[DELETE_TEST] Neo4j test nodes deleted successfully")
         except Exception as e:
             neo4j_status = "failed"
@@ -1120,6 +1123,8 @@ def delete_institution_student_test(request, educator_id, student_id, test_num):
                 
                 deleted_student_results = StudentResult.objects.filter(student_id=student_id, class_id=class_id, test_num=test_num).delete()
                 logger.info(f"[DELETE_TEST] Deleted StudentResult records: {deleted_student_results}")
+                deleted_topic_stats = delete_topic_stats(class_id, test_num, student_id=student_id)
+                logger.info(f"[DELETE_TEST] Deleted StudentTopicStats records: {deleted_topic_stats}")
                 
                 deleted_responses = StudentResponse.objects.filter(student_id=student_id, class_id=class_id, test_num=test_num).delete()
                 logger.info(f"[DELETE_TEST] Deleted StudentResponse records: {deleted_responses}")
@@ -1423,7 +1428,7 @@ def reupload_institution_student_responses(request, educator_id):
                     
                     # Delete existing Neo4j test data first
                     try:
-                        delete_test_graph(db_name, test_num)
+                        delete_test_graph(db_name, test_num, student_id=student_id, class_id=class_id)
                         logger.info(f"[REUPLOAD_STUDENT] Deleted old Neo4j Test{test_num} from {db_name}")
                     except Exception as e:
                         logger.warning(f"[REUPLOAD_STUDENT] Failed to delete old Neo4j data: {str(e)}")
@@ -1431,6 +1436,7 @@ def reupload_institution_student_responses(request, educator_id):
                     # Delete existing Result and StudentResult rows
                     result_delete_count = Result.objects.filter(student_id=student_id, class_id=class_id, test_num=test_num).delete()
                     student_result_delete_count = StudentResult.objects.filter(student_id=student_id, class_id=class_id, test_num=test_num).delete()
+                    delete_topic_stats(class_id, test_num, student_id=student_id)
                     logger.info(f"[REUPLOAD_STUDENT] Deleted {result_delete_count[0]} Result rows and {student_result_delete_count[0]} StudentResult rows")
                     
                     # Run synchronous analysis (not as Celery task since this is immediate)
@@ -1448,16 +1454,14 @@ def reupload_institution_student_responses(request, educator_id):
                     logger.info(f"[REUPLOAD_STUDENT] Analysis summary: {correct_count} correct, {attempted_count} attempted out of {len(analysis_result)} total")
                     logger.debug(f"[REUPLOAD_STUDENT] Sample analysis: {analysis_result[:2]}")
                     
-                    summary_df = analyzer.get_summary()
-                    logger.info(f"[REUPLOAD_STUDENT] Summary DataFrame:\n{summary_df.to_string()}")
+                    scored = score_test_results(class_id, test_num, student_ids=[student_id])
+                    analyzer.save_student_results()
+                    logger.info(f"[REUPLOAD_STUDENT] Results saved to Result table ({scored} row)")
                     
-                    analyzer.save_results(summary_df)
-                    logger.info(f"[REUPLOAD_STUDENT] Results saved to Result table")
-                    
-                    # Create knowledge graph
-                    analysis_df = pd.DataFrame(analyzer.analysis)
-                    create_graph(student_id, db_name, analysis_df, test_num)
-                    logger.info(f"[REUPLOAD_STUDENT] Neo4j graph created with {len(analysis_df)} questions")
+                    # Re-project the knowledge graph from PostgreSQL, off the request path
+                    if getattr(settings, 'GRAPH_PROJECTION_ON_INGEST', True):
+                        project_test_graph.delay(class_id, test_num, student_ids=[student_id])
+                        logger.info(f"[REUPLOAD_STUDENT] Neo4j graph projection scheduled for {len(analysis_result)} questions")
                     
                     logger.info(f"[REUPLOAD_STUDENT] Analysis completed for student {student_id}, test {test_num}")
                     
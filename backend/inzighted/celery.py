@@ -2,6 +2,7 @@ import os
 import socket
 from urllib.parse import urlparse
 from celery import Celery
+from celery.signals import worker_process_shutdown
 
 
 # Determine Redis host/port from environment (supports docker setup)
@@ -67,6 +68,13 @@ def setup_periodic_tasks(sender, **kwargs):
     import exam.services.update_dashboard  # noqa
     import exam.services.save_students  # noqa
     import exam.services.debug  # noqa
+    import exam.services.graph_projection  # noqa
     import exam.utils.email_tasks  # noqa
     import exam.utils.analysis_generator  # noqa
-    import exam.utils.student_analysis  # noqa
\ No newline at end of file
+    import exam.utils.student_analysis  # noqa
+
+@worker_process_shutdown.connect
+def close_neo4j_drivers(**kwargs):
+    """Release the pooled Neo4j driver held by this worker process."""
+    from exam.graph_utils.knowledge_graph_manager import close_shared_drivers
+    close_shared_drivers()
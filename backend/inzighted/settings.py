@@ -189,6 +189,25 @@ CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:63
 if os.getenv('USE_DJANGO_CELERY_RESULTS', '').lower() in ('1', 'true', 'yes'):
     CELERY_RESULT_BACKEND = 'django-db'
 
+# === Cache ===
+# Worker-side caches (e.g. per-test question sets) go through Django's cache framework.
+# Set DJANGO_CACHE_URL (e.g. redis://broker:6379/2) to share entries across Celery workers;
+# otherwise each process keeps its own in-memory cache.
+DJANGO_CACHE_URL = os.getenv('DJANGO_CACHE_URL', '')
+if DJANGO_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': DJANGO_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # === REST Framework ===
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -215,6 +234,68 @@ ENABLE_CHECKPOINTS = os.getenv('ENABLE_CHECKPOINTS', 'false').lower() in ('true'
 # Enable/disable cumulative (all-tests) checkpoint generation stored with test_num=0
 ENABLE_CUMULATIVE_CHECKPOINTS = os.getenv('ENABLE_CUMULATIVE_CHECKPOINTS', 'false').lower() in ('true', '1', 'yes')
 
+# === Knowledge Graph Projection Flag ===
+# Project StudentResult/QuestionAnalysis into Neo4j after each test's analysis completes.
+# The graph is derived data; disable to skip Neo4j entirely and rebuild later with
+# `python manage.py rebuild_graph_projection`.
+GRAPH_PROJECTION_ON_INGEST = os.getenv('GRAPH_PROJECTION_ON_INGEST', 'true').lower() in ('true', '1', 'yes')
+
+# === Student Dashboard Stage Concurrency ===
+# Threads used to run the independent stages of one student's dashboard update
+# (overview, performance, SWOTs, report). LLM calls stay bounded by the global limiter.
+# Set to 1 to run the stages one after another.
+DASHBOARD_STAGE_WORKERS = int(os.getenv('DASHBOARD_STAGE_WORKERS', '5'))
+
+# === Combined Overview Insights ===
+# Ask for KS/AI/QR/CV overview insights in one Gemini request (JSON keyed by category)
+# instead of one request per category. Sections failing validation are re-asked alone.
+OVERVIEW_COMBINED_INSIGHTS = os.getenv('OVERVIEW_COMBINED_INSIGHTS', 'false').lower() in ('true', '1', 'yes')
+# Threads per worker process shared by the overview insight calls of every dashboard update
+OVERVIEW_INSIGHT_WORKERS = int(os.getenv('OVERVIEW_INSIGHT_WORKERS', '6'))
+
+# === Combined SWOT Insights ===
+# Ask for every non-empty SWOT metric of a student-test in one Gemini request;
+# metrics failing validation fall back to their own request.
+SWOT_COMBINED_INSIGHTS = os.getenv('SWOT_COMBINED_INSIGHTS', 'false').lower() in ('true', '1', 'yes')
+
+# === LLM Response Cache ===
+# Serve repeated Gemini prompts (same model, prompt and images) from the api_response_cache table.
+# LLM_CACHE_SITES lists trace labels to cache (prefix match, e.g. exam.insight.swot_generator); '*' = all.
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'false').lower() in ('true', '1', 'yes')
+LLM_CACHE_SITES = _parse_env_list('LLM_CACHE_SITES') or ['*']
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 60 * 60)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '50000'))
+
+# === Question Analysis Reuse ===
+# Clone QuestionPaper/QuestionAnalysis rows when the same question paper (PDF hash) or the
+# same question (normalized content hash) was already processed for another class/test.
+REUSE_QUESTION_ANALYSIS = os.getenv('REUSE_QUESTION_ANALYSIS', 'true').lower() in ('true', '1', 'yes')
+
+# === Question Extraction Merge ===
+# Skip the merge LLM call of a chunk when the image-based and OCR-based extractions
+# both contain every question of the chunk and agree on question/option text.
+EXTRACTION_SKIP_CONSISTENT_MERGE = os.getenv('EXTRACTION_SKIP_CONSISTENT_MERGE', 'false').lower() in ('true', '1', 'yes')
+
+# === Local Subject Classifier ===
+# Without admin metadata, batch subjects come from a local TF-IDF classifier over the
+# NEET syllabus; Gemini is asked only below SUBJECT_CLASSIFIER_MIN_CONFIDENCE (share
+# of a batch's questions voting for its subject). Off: the old sequential LLM inference.
+LOCAL_SUBJECT_CLASSIFIER = os.getenv('LOCAL_SUBJECT_CLASSIFIER', 'true').lower() in ('true', '1', 'yes')
+SUBJECT_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv('SUBJECT_CLASSIFIER_MIN_CONFIDENCE', '0.6'))
+
+# === PDF Page Rendering ===
+# PDF_RENDER_FORMAT: png, jpeg or webp (webp needs Pillow). A page larger than
+# PDF_RENDER_MAX_BYTES (0 = no limit) is re-rendered at a lower resolution.
+PDF_RENDER_DPI = int(os.getenv('PDF_RENDER_DPI', '72'))
+PDF_RENDER_FORMAT = os.getenv('PDF_RENDER_FORMAT', 'png').lower()
+PDF_RENDER_MAX_BYTES = int(os.getenv('PDF_RENDER_MAX_BYTES', '0'))
+
+# === Token-budgeted Chunking ===
+# Estimated prompt + output tokens per question extraction chunk / analysis batch.
+# Chunks are packed up to these budgets, so diagram-heavy sections get smaller chunks.
+EXTRACTION_CHUNK_TOKEN_BUDGET = int(os.getenv('EXTRACTION_CHUNK_TOKEN_BUDGET', '12000'))
+ANALYSIS_CHUNK_TOKEN_BUDGET = int(os.getenv('ANALYSIS_CHUNK_TOKEN_BUDGET', '36000'))
+
 # === Sentry Error Logging ===
 SENTRY_DSN = os.getenv("SENTRY_DSN", "")  # Optional env var
 if SENTRY_DSN: